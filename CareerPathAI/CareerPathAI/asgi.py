@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CareerPathAI.settings')
+# Route GenAI-bound views to their async variants so in-flight calls don't pin threads.
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
+
+# Optional in-process recycle bin purge (RECYCLE_BIN_PURGE_INTERVAL seconds; 0 = off).
+from recommender.purge import start_purge_runner  # noqa: E402
+
+start_purge_runner()
@@ -46,11 +46,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'recommender.metrics.MetricsMiddleware',
+    'recommender.db_router.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'recommender.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,13 +81,44 @@ WSGI_APPLICATION = 'CareerPathAI.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# SQLite is tuned by recommender.db_tuning (SQLITE_* settings below).
+# Write transactions start with BEGIN IMMEDIATE so they queue on busy_timeout instead
+# of failing with "database is locked"; connections are reused for DB_CONN_MAX_AGE seconds.
+
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "True") == "True"
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv("SQLITE_PATH") or BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "60")) if SQLITE_TUNING else 0,
+        'CONN_HEALTH_CHECKS': SQLITE_TUNING,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if SQLITE_TUNING else {},
     }
 }
 
+# Read replicas (recommender.db_router): the dashboard, recommendation detail and
+# admin lists read from them; writes and everything else use the primary. Locally,
+# REPLICA_SQLITE_PATHS lists SQLite files kept in sync by `manage.py simulate_replication`.
+# After a write the user reads from the primary for REPLICA_STICKY_SECONDS.
+DATABASE_REPLICAS = []
+for _index, _path in enumerate(os.getenv("REPLICA_SQLITE_PATHS", "").split(), start=1):
+    DATABASES[f'replica{_index}'] = {**DATABASES['default'], 'NAME': _path, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{_index}')
+DATABASE_ROUTERS = ['recommender.db_router.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+
+# The journal mode is stored in the database file itself, so it is set once by
+# `migrate` (recommender migration 0017) rather than on every connection.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_PRAGMAS = {
+    'synchronous': os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    'busy_timeout': int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+    'mmap_size': int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024))),
+    'cache_size': int(os.getenv("SQLITE_CACHE_SIZE", "-20000")),
+    'temp_store': os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -129,3 +163,92 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 GENAI_API_KEY = os.getenv("GENAI_API_KEY")
 GENAI_MODEL = os.getenv("GENAI_MODEL", "gemini-1.5-flash")
+
+# When True, questionnaire submissions only enqueue a job; run
+# `python manage.py run_recommendation_worker` to process them.
+ASYNC_RECOMMENDATIONS = os.getenv("ASYNC_RECOMMENDATIONS", "False") == "True"
+
+# Serve the questionnaire/detail views as native async views (set by asgi.py).
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False") == "True"
+
+# Latency budget (seconds) for a questionnaire submission: the 3s p99 target. The
+# GenAI call's timeouts come from what is left of it, so the heuristic fallback still
+# fits; stage timings go out as Server-Timing.
+QUESTIONNAIRE_BUDGET = float(os.getenv("QUESTIONNAIRE_BUDGET", "3"))
+
+# Recycle bin: items are purged this many days after deletion, in small batches
+# (`python manage.py purge_recycle_bin`). A non-zero RECYCLE_BIN_PURGE_INTERVAL
+# also runs the purge every that many seconds inside each web process.
+RECYCLE_BIN_RETENTION_DAYS = int(os.getenv("RECYCLE_BIN_RETENTION_DAYS", "30"))
+RECYCLE_BIN_PURGE_BATCH_SIZE = int(os.getenv("RECYCLE_BIN_PURGE_BATCH_SIZE", "500"))
+RECYCLE_BIN_PURGE_PAUSE = float(os.getenv("RECYCLE_BIN_PURGE_PAUSE", "0.1"))
+RECYCLE_BIN_PURGE_INTERVAL = float(os.getenv("RECYCLE_BIN_PURGE_INTERVAL", "0"))
+
+# Rendered dashboard lists are cached per user and invalidated on every change
+# (recommender.dashboard_cache). Invalidations come from every process (job worker,
+# purge, other web workers), so the alias must be a cache they all share, and it must
+# not live in the app's database, or loading the dashboard would write to it. The
+# "dashboard" alias is Redis with DASHBOARD_CACHE_REDIS_URL, else files in
+# DASHBOARD_CACHE_DIR (one host); with neither, the cache is off.
+DASHBOARD_CACHE_ENABLED = os.getenv("DASHBOARD_CACHE_ENABLED", "True") == "True"
+DASHBOARD_CACHE_ALIAS = os.getenv("DASHBOARD_CACHE_ALIAS", "dashboard")
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+DASHBOARD_CACHE_REDIS_URL = os.getenv("DASHBOARD_CACHE_REDIS_URL", "")
+DASHBOARD_CACHE_DIR = os.getenv("DASHBOARD_CACHE_DIR", "")
+
+# Prometheus metrics at /metrics (recommender.metrics). With several worker
+# processes, point METRICS_DIR at a directory they share: each one writes its
+# values there every METRICS_FLUSH_INTERVAL seconds and a scrape sums them.
+# Scrapers send METRICS_TOKEN as "Authorization: Bearer <token>"; otherwise only
+# logged-in staff can read /metrics.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Opt-in request profiling (recommender.profiling): a PROFILING_SAMPLE_RATE
+# fraction of requests, plus staff requests sending the PROFILING_HEADER header,
+# are profiled into a ring buffer of PROFILING_MAX_PROFILES files under
+# PROFILING_DIR, browsable at /admin/profiles/.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False") == "True"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+PROFILING_MODE = os.getenv("PROFILING_MODE", "cprofile")  # cprofile | sample
+PROFILING_SAMPLE_INTERVAL = float(os.getenv("PROFILING_SAMPLE_INTERVAL", "0.001"))
+PROFILING_SLOW_QUERY_MS = float(os.getenv("PROFILING_SLOW_QUERY_MS", "10"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", str(BASE_DIR / "profiles"))
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "100"))
+
+
+# Caches
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# The "genai" alias backs the shared GenAI response cache (GENAI_CACHE_BACKEND=django);
+# `migrate` creates its table. "dashboard" holds the dashboard fragments (see above).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'genai': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'genai_response_cache',
+        'TIMEOUT': int(os.getenv("GENAI_CACHE_TTL", "3600")),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv("GENAI_CACHE_MAX_ENTRIES", "512")),
+        },
+    },
+}
+if DASHBOARD_CACHE_REDIS_URL:
+    CACHES['dashboard'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': DASHBOARD_CACHE_REDIS_URL,
+        'TIMEOUT': DASHBOARD_CACHE_TTL,
+    }
+elif DASHBOARD_CACHE_DIR:
+    CACHES['dashboard'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': DASHBOARD_CACHE_DIR,
+        'TIMEOUT': DASHBOARD_CACHE_TTL,
+    }
+else:
+    CACHES['dashboard'] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
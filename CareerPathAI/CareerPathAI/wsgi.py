@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CareerPathAI.settings')
 
 application = get_wsgi_application()
+
+# Optional in-process recycle bin purge (RECYCLE_BIN_PURGE_INTERVAL seconds; 0 = off).
+from recommender.purge import start_purge_runner  # noqa: E402
+
+start_purge_runner()
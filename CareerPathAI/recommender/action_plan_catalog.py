@@ -0,0 +1,154 @@
+"""
+Catalog of default action plans (used for heuristic results and to fill GenAI gaps).
+
+The catalog lives in a JSON file (ACTION_PLAN_CATALOG, default data/action_plans.json)
+and is loaded once into frozen structures: tuples for lists, read-only mappings for
+dicts. Lookups go through an exact-name index first and fall back to the ordered
+alias rules ("all" substrings must occur, plus at least one of "any"); resolved
+names are remembered, so repeat lookups are a dict hit.
+
+The file's mtime is checked at most every ACTION_PLAN_CATALOG_CHECK_INTERVAL
+seconds and the catalog is swapped in whole when it changes. A file that fails to
+load leaves the previous catalog in place.
+"""
+
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), "data", "action_plans.json")
+ACTION_PLAN_CATALOG = os.getenv("ACTION_PLAN_CATALOG", DEFAULT_CATALOG_PATH)
+ACTION_PLAN_CATALOG_CHECK_INTERVAL = float(os.getenv("ACTION_PLAN_CATALOG_CHECK_INTERVAL", "5"))
+
+PLAN_FIELDS = ("getting_started", "resources", "interview_prep", "how_to_apply")
+_RESOLVED_LIMIT = 4096
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _copy_template(plan: dict) -> tuple:
+    # Plans are one level deep (lists of strings or of flat {"title", "url"} dicts), so a
+    # copy is one list() per field plus one dict.copy() per resource, nothing recursive.
+    return tuple(
+        (field, tuple(plan.get(field, [])), any(isinstance(item, dict) for item in plan.get(field, [])))
+        for field in PLAN_FIELDS
+    )
+
+
+class ActionPlanCatalog:
+    """One loaded, immutable version of the catalog."""
+
+    def __init__(self, data: dict):
+        self.plans = MappingProxyType(
+            {key: _freeze({field: plan.get(field, []) for field in PLAN_FIELDS}) for key, plan in data["plans"].items()}
+        )
+        self._templates = {key: _copy_template(plan) for key, plan in data["plans"].items()}
+        self.default = data["default"]
+        # Exact (case-insensitive) career name -> plan key.
+        self.names = MappingProxyType({name.lower(): key for name, key in data.get("names", {}).items()})
+        self.aliases = tuple(
+            (
+                tuple(term.lower() for term in rule.get("all", ())),
+                tuple(term.lower() for term in rule.get("any", ())),
+                rule["plan"],
+            )
+            for rule in data.get("aliases", ())
+        )
+        unknown = {self.default, *self.names.values(), *(rule[2] for rule in self.aliases)} - set(self.plans)
+        if unknown:
+            raise KeyError(f"unknown action plan(s): {', '.join(sorted(unknown))}")
+        self._resolved = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "ActionPlanCatalog":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _match_alias(self, name: str) -> str:
+        for all_terms, any_terms, key in self.aliases:
+            if all(term in name for term in all_terms) and (not any_terms or any(term in name for term in any_terms)):
+                return key
+        return self.default
+
+    def resolve(self, career_name: str) -> str:
+        """Key of the plan for a career name."""
+
+        name = (career_name or "").lower()
+        key = self.names.get(name) or self._resolved.get(name)
+        if key is None:
+            key = self._match_alias(name)
+            if len(self._resolved) >= _RESOLVED_LIMIT:
+                # Free-form GenAI names are unbounded; start over rather than grow forever.
+                self._resolved.clear()
+            self._resolved[name] = key
+        return key
+
+    def lookup(self, career_name: str):
+        """Read-only plan for a career name (tuples and read-only mappings)."""
+
+        return self.plans[self.resolve(career_name)]
+
+    def copy(self, career_name: str) -> dict:
+        """Mutable copy of the plan for a career name (plain dicts and lists)."""
+
+        return {
+            field: [item.copy() for item in items] if nested else list(items)
+            for field, items, nested in self._templates[self.resolve(career_name)]
+        }
+
+
+_lock = threading.Lock()
+_catalog = None
+_catalog_mtime = None
+_next_check = 0.0
+
+
+def _load(path: str):
+    global _catalog, _catalog_mtime
+    mtime = os.stat(path).st_mtime_ns
+    if _catalog is not None and mtime == _catalog_mtime:
+        return
+    try:
+        catalog = ActionPlanCatalog.from_file(path)
+    except (OSError, ValueError, KeyError, TypeError):
+        if _catalog is None:
+            raise
+        return  # keep serving the last good catalog
+    _catalog, _catalog_mtime = catalog, mtime
+
+
+def get_catalog() -> ActionPlanCatalog:
+    """The current catalog, reloaded if the file changed since the last check."""
+
+    global _next_check
+    now = time.monotonic()
+    if _catalog is None or now >= _next_check:
+        with _lock:
+            if _catalog is None or now >= _next_check:
+                try:
+                    _load(ACTION_PLAN_CATALOG)
+                except OSError:
+                    if _catalog is None:
+                        raise
+                _next_check = now + ACTION_PLAN_CATALOG_CHECK_INTERVAL
+    return _catalog
+
+
+def action_plan_view(career_name: str):
+    """Read-only plan for career_name; share it freely, it can't be modified."""
+
+    return get_catalog().lookup(career_name)
+
+
+def action_plan_for(career_name: str) -> dict:
+    """Mutable copy of the plan for career_name (plain dicts and lists)."""
+
+    return get_catalog().copy(career_name)
@@ -1,20 +1,137 @@
+from django.conf import settings
 from django.contrib import admin
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import render
+from django.urls import path
 
-from .models import Questionnaire, Recommendation, UserProfile
+from . import profiling
+from .db_router import replica_scope
+from .models import ActionPlan, BatchScoringRun, Questionnaire, Recommendation, RecommendationJob, UserProfile
+
+
+class ReplicaReadsAdmin(admin.ModelAdmin):
+    """Change lists read from a replica (see recommender.db_router); edits stay on the primary."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != "GET":
+            # Bulk actions select the rows they change; those reads stay on the primary.
+            return super().changelist_view(request, extra_context)
+        with replica_scope():
+            response = super().changelist_view(request, extra_context)
+            # Render inside the scope: the list's queryset is evaluated lazily by the template.
+            if hasattr(response, "render"):
+                response.render()
+        return response
 
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(ReplicaReadsAdmin):
     list_display = ("user", "headline")
 
 
 @admin.register(Questionnaire)
-class QuestionnaireAdmin(admin.ModelAdmin):
+class QuestionnaireAdmin(ReplicaReadsAdmin):
     list_display = ("user", "preferred_work_style", "created_at")
     search_fields = ("user__username", "skills", "interests")
 
 
 @admin.register(Recommendation)
-class RecommendationAdmin(admin.ModelAdmin):
-    list_display = ("career_name", "score", "created_at")
-    list_filter = ("score",)
+class RecommendationAdmin(ReplicaReadsAdmin):
+    list_display = ("career_name", "score", "status", "generation_source", "created_at")
+    list_filter = ("score", "status", "generation_source")
+
+
+@admin.register(RecommendationJob)
+class RecommendationJobAdmin(ReplicaReadsAdmin):
+    list_display = ("id", "recommendation", "status", "attempts", "created_at", "finished_at")
+    list_filter = ("status",)
+
+
+@admin.register(ActionPlan)
+class ActionPlanAdmin(ReplicaReadsAdmin):
+    list_display = ("id", "content_hash", "created_at")
+    search_fields = ("content_hash",)
+
+    # Plans are shared and addressed by their content hash, so they are read-only here.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BatchScoringRun)
+class BatchScoringRunAdmin(ReplicaReadsAdmin):
+    list_display = ("source_name", "rows_done", "rows_skipped", "questionnaires_created", "started_at", "finished_at")
+    readonly_fields = ("source_hash",)
+
+
+# Request profiles live in files (recommender.profiling), not in the database, so
+# they get plain admin views instead of a ModelAdmin. CareerPathAI/urls.py mounts
+# profile_urls under admin/profiles/.
+
+
+def request_profiles_view(request):
+    context = {
+        **admin.site.each_context(request),
+        "title": "Request profiles",
+        "enabled": settings.PROFILING_ENABLED,
+        "sample_rate": settings.PROFILING_SAMPLE_RATE,
+        "header": settings.PROFILING_HEADER,
+        "profiles": profiling.list_profiles(),
+    }
+    return render(request, "admin/recommender/request_profiles.html", context)
+
+
+def _profile_or_404(profile_id: str) -> dict:
+    profile = profiling.load_profile(profile_id)
+    if profile is None:
+        raise Http404("No such profile; it may have been pushed out of the ring buffer.")
+    return profile
+
+
+def request_profile_view(request, profile_id):
+    profile = _profile_or_404(profile_id)
+    context = {
+        **admin.site.each_context(request),
+        "title": f"{profile['method']} {profile['path']}",
+        "profile": profile,
+        "has_pstats": profiling.pstats_path(profile_id) is not None,
+    }
+    return render(request, "admin/recommender/request_profile.html", context)
+
+
+def request_profile_stacks_view(request, profile_id):
+    """Collapsed stacks, for flamegraph.pl, speedscope or inferno."""
+
+    response = HttpResponse(profiling.collapsed_stacks(_profile_or_404(profile_id)), content_type="text/plain")
+    response["Content-Disposition"] = f'attachment; filename="{profile_id}.folded"'
+    return response
+
+
+def request_profile_pstats_view(request, profile_id):
+    """The raw cProfile dump, for pstats or snakeviz."""
+
+    dump = profiling.pstats_path(profile_id)
+    if dump is None:
+        raise Http404("Only cProfile runs have a .prof file.")
+    return FileResponse(open(dump, "rb"), as_attachment=True, filename=f"{profile_id}.prof")
+
+
+profile_urls = [
+    path("", admin.site.admin_view(request_profiles_view), name="request_profiles"),
+    path("<str:profile_id>/", admin.site.admin_view(request_profile_view), name="request_profile"),
+    path(
+        "<str:profile_id>/stacks.folded",
+        admin.site.admin_view(request_profile_stacks_view),
+        name="request_profile_stacks",
+    ),
+    path(
+        "<str:profile_id>/profile.prof",
+        admin.site.admin_view(request_profile_pstats_view),
+        name="request_profile_pstats",
+    ),
+]
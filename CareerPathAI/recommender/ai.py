@@ -1,165 +1,278 @@
+import asyncio
+import copy
+import hashlib
 import json
+import logging
 import os
-import re
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import Mapping
 from typing import Optional
 
 import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+
+from .action_plan_catalog import action_plan_for, action_plan_view
+from .breaker import CircuitBreaker, CircuitOpenError
+from . import metrics, profiling
+from .deadline import stage, timeout_for
+from .matching import PhraseMatcher
+from .ratelimit import FileBucketStore, MemoryBucketStore, RateLimiter, backoff_delay, parse_retry_after
+from .singleflight import AsyncSingleFlight, FileLockSingleFlight, SingleFlight
+
+logger = logging.getLogger(__name__)
 
 GENAI_API_KEY = os.getenv("GENAI_API_KEY")
 GENAI_MODEL = os.getenv("GENAI_MODEL", "gemini-1.5-flash")
-GENAI_ENDPOINT = f"https://generativelanguage.googleapis.com/v1beta/models/{GENAI_MODEL}:generateContent"
+# Point this at a local stub (see recommender/genai_stub.py) to test/benchmark offline.
+GENAI_BASE_URL = os.getenv("GENAI_BASE_URL", "https://generativelanguage.googleapis.com")
+GENAI_ENDPOINT = f"{GENAI_BASE_URL.rstrip('/')}/v1beta/models/{GENAI_MODEL}:generateContent"
+
+# HTTP connection pool shared by all threads of a worker process.
+GENAI_POOL_SIZE = int(os.getenv("GENAI_POOL_SIZE", "10"))
+GENAI_CONNECT_TIMEOUT = float(os.getenv("GENAI_CONNECT_TIMEOUT", "5"))
+GENAI_READ_TIMEOUT = float(os.getenv("GENAI_READ_TIMEOUT", "30"))
+# Upper bound on concurrent in-flight calls per event loop for the async client.
+GENAI_ASYNC_MAX_CONNECTIONS = int(os.getenv("GENAI_ASYNC_MAX_CONNECTIONS", "200"))
+
+# Client-side quota (0 disables a limit). "file" shares the buckets between worker
+# processes on this host. Calls that can't get quota within GENAI_RATE_LIMIT_MAX_WAIT
+# seconds skip the network and fall back to the heuristic (0 = never wait).
+GENAI_RATE_LIMIT_RPM = float(os.getenv("GENAI_RATE_LIMIT_RPM", "0"))
+GENAI_RATE_LIMIT_TPM = float(os.getenv("GENAI_RATE_LIMIT_TPM", "0"))
+GENAI_RATE_LIMIT_BACKEND = os.getenv("GENAI_RATE_LIMIT_BACKEND", "memory")
+GENAI_RATE_LIMIT_FILE = os.getenv(
+    "GENAI_RATE_LIMIT_FILE", os.path.join(tempfile.gettempdir(), "careerpathai-ratelimit.json")
+)
+GENAI_RATE_LIMIT_MAX_WAIT = float(os.getenv("GENAI_RATE_LIMIT_MAX_WAIT", "2"))
+# Rough output budget per call, used with the prompt length to estimate tokens/min usage.
+GENAI_EXPECTED_OUTPUT_TOKENS = int(os.getenv("GENAI_EXPECTED_OUTPUT_TOKENS", "800"))
+
+# Retries for 429/5xx responses: jittered exponential backoff that honors Retry-After.
+GENAI_MAX_RETRIES = int(os.getenv("GENAI_MAX_RETRIES", "2"))
+GENAI_RETRY_BASE_DELAY = float(os.getenv("GENAI_RETRY_BASE_DELAY", "0.5"))
+GENAI_RETRY_MAX_DELAY = float(os.getenv("GENAI_RETRY_MAX_DELAY", "8"))
+GENAI_RETRYABLE_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+# Circuit breaker: opens when, over the last GENAI_BREAKER_WINDOW seconds (and at least
+# GENAI_BREAKER_MIN_CALLS calls), the error rate or p95 latency crosses its threshold.
+# While open, recommendations come straight from the heuristic without a network call.
+GENAI_BREAKER_ENABLED = os.getenv("GENAI_BREAKER_ENABLED", "True") == "True"
+GENAI_BREAKER_WINDOW = float(os.getenv("GENAI_BREAKER_WINDOW", "60"))
+GENAI_BREAKER_MIN_CALLS = int(os.getenv("GENAI_BREAKER_MIN_CALLS", "5"))
+GENAI_BREAKER_ERROR_RATE = float(os.getenv("GENAI_BREAKER_ERROR_RATE", "0.5"))
+GENAI_BREAKER_SLOW_CALL = float(os.getenv("GENAI_BREAKER_SLOW_CALL", "10"))
+GENAI_BREAKER_COOLDOWN = float(os.getenv("GENAI_BREAKER_COOLDOWN", "30"))
+
+# Seconds of a request's latency budget kept back when cutting off a GenAI call, so the
+# heuristic fallback and the DB writes still fit; attempts with less time than
+# GENAI_MIN_ATTEMPT_SECONDS left are not started at all.
+GENAI_DEADLINE_RESERVE = float(os.getenv("GENAI_DEADLINE_RESERVE", "0.25"))
+GENAI_MIN_ATTEMPT_SECONDS = float(os.getenv("GENAI_MIN_ATTEMPT_SECONDS", "0.2"))
+
+# Collapse identical concurrent prompts into one API call: "memory" (threads of one
+# process), "file" (also across worker processes on this host, via lock files) or "none".
+GENAI_SINGLEFLIGHT = os.getenv("GENAI_SINGLEFLIGHT", "memory")
+GENAI_SINGLEFLIGHT_DIR = os.getenv(
+    "GENAI_SINGLEFLIGHT_DIR", os.path.join(tempfile.gettempdir(), "careerpathai-singleflight")
+)
 
 # Bump this when you change the shape/intent of the prompt.
+# It is part of the response cache key, so bumping it also invalidates cached results.
 PROMPT_VERSION = "v2-action-plan-1"
 
+# Response cache: "memory" (per process), "django" (shared via a Django cache alias) or "none".
+GENAI_CACHE_BACKEND = os.getenv("GENAI_CACHE_BACKEND", "memory")
+GENAI_CACHE_ALIAS = os.getenv("GENAI_CACHE_ALIAS", "genai")
+GENAI_CACHE_TTL = int(os.getenv("GENAI_CACHE_TTL", "3600"))
+GENAI_CACHE_MAX_ENTRIES = int(os.getenv("GENAI_CACHE_MAX_ENTRIES", "512"))
 
-def _default_action_plan_for(career_name: str) -> dict:
-    """Reasonable, curated defaults (used for fallback and to fill AI gaps)."""
+# generation_source for heuristic results served because the circuit breaker was open.
+GENERATION_SOURCE_BREAKER = "heuristic_breaker"
 
-    name = (career_name or "").lower()
+_QUESTIONNAIRE_FIELDS = ("skills", "interests", "strengths", "preferred_work_style", "long_term_goal")
+# Order the heuristic tokenizer joins answers in.
+_HEURISTIC_FIELDS = ("skills", "interests", "strengths", "long_term_goal", "preferred_work_style")
 
-    # NOTE: keep URLs fairly stable / broadly useful.
-    if "data scientist" in name:
-        return {
-            "getting_started": [
-                "Refresh Python + NumPy/Pandas and basic statistics.",
-                "Learn SQL for analytics (joins, aggregations, window functions).",
-                "Build 1–2 small end-to-end projects (EDA → model → write-up).",
-                "Publish your work (GitHub + short portfolio page).",
-            ],
-            "resources": [
-                {"title": "Kaggle Learn (Python / ML / SQL)", "url": "https://www.kaggle.com/learn"},
-                {"title": "scikit-learn User Guide", "url": "https://scikit-learn.org/stable/user_guide.html"},
-                {"title": "Pandas Documentation", "url": "https://pandas.pydata.org/docs/"},
-                {"title": "SQLBolt (SQL basics)", "url": "https://sqlbolt.com/"},
-            ],
-            "interview_prep": [
-                "Practice SQL questions (joins, CTEs, window functions) and explain tradeoffs.",
-                "Review statistics (distributions, bias/variance, A/B testing basics).",
-                "Prepare 2–3 project stories: problem → approach → result → what you'd improve.",
-            ],
-            "how_to_apply": [
-                "Tailor your resume to highlight measurable impact and relevant tools.",
-                "Apply to roles that match your current level (intern/junior/associate) and iterate weekly.",
-                "Network: ask for referrals + informational chats; share one project post.",
-            ],
-        }
 
-    if "machine learning engineer" in name or ("ml" in name and "engineer" in name):
-        return {
-            "getting_started": [
-                "Pick a core stack: Python + PyTorch or TensorFlow.",
-                "Practice training + evaluating models (metrics, overfitting, data leakage).",
-                "Learn deployment basics (Docker, REST APIs) and CI for ML.",
-                "Build a small "
-                "model-serving demo (API + simple UI) and document it well.",
-            ],
-            "resources": [
-                {"title": "Google ML Crash Course", "url": "https://developers.google.com/machine-learning/crash-course"},
-                {"title": "PyTorch Tutorials", "url": "https://pytorch.org/tutorials/"},
-                {"title": "TensorFlow Tutorials", "url": "https://www.tensorflow.org/tutorials"},
-                {"title": "Docker Getting Started", "url": "https://docs.docker.com/get-started/"},
-            ],
-            "interview_prep": [
-                "Brush up on fundamentals: bias/variance, regularization, metrics, leakage.",
-                "Practice coding (arrays/strings, data structures) and basic system design.",
-                "Be ready to discuss how you'd debug a model in production (data drift, monitoring).",
-            ],
-            "how_to_apply": [
-                "Show evidence of shipping: a repo with tests, Dockerfile, and a working demo.",
-                "Target teams that need applied ML (recommendations, NLP, forecasting) and match your projects.",
-                "Write a short 'model card' / README to stand out.",
-            ],
-        }
+def recommendation_cache_key(data: dict) -> str:
+    """Content hash of the normalized answers plus the model and prompt version."""
 
-    if "mlops" in name:
-        return {
-            "getting_started": [
-                "Learn Docker + basic Linux + CI/CD concepts.",
-                "Understand experiment tracking and model registries.",
-                "Practice serving/monitoring models (logging, metrics, drift).",
-                "Build a minimal pipeline: train → package → deploy → monitor.",
-            ],
-            "resources": [
-                {"title": "Docker Getting Started", "url": "https://docs.docker.com/get-started/"},
-                {"title": "Kubernetes Basics", "url": "https://kubernetes.io/docs/tutorials/kubernetes-basics/"},
-                {"title": "MLflow", "url": "https://mlflow.org/"},
-            ],
-            "interview_prep": [
-                "Know reliability basics: SLOs, incidents, rollbacks, capacity planning.",
-                "Explain an end-to-end ML system and where failures happen.",
-                "Be ready for infra questions (containers, networking basics, observability).",
-            ],
-            "how_to_apply": [
-                "Highlight infrastructure wins (automation, cost, reliability) and tooling.",
-                "Contribute to an open-source MLOps tool or write a deployment tutorial.",
-            ],
-        }
+    normalized = {
+        field: " ".join((data.get(field, "") or "").lower().split())
+        for field in _QUESTIONNAIRE_FIELDS
+    }
+    payload = json.dumps(
+        {"answers": normalized, "model": GENAI_MODEL, "prompt_version": PROMPT_VERSION},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-    if "product" in name and ("pm" in name or "manager" in name):
-        return {
-            "getting_started": [
-                "Learn the AI product lifecycle (data → model → evaluation → launch).",
-                "Practice writing PRDs and defining success metrics.",
-                "Study common AI constraints (latency, cost, safety, evaluation).",
-                "Build a simple demo product and write a one-page strategy.",
-            ],
-            "resources": [
-                {"title": "Google: Product Management resources", "url": "https://grow.google/certificates/project-management/"},
-                {"title": "OpenAI Cookbook (prompting/examples)", "url": "https://cookbook.openai.com/"},
-            ],
-            "interview_prep": [
-                "Practice product sense: user pain → solution → tradeoffs → success metrics.",
-                "Prepare stories about alignment, prioritization, and stakeholder management.",
-                "Know AI evaluation concepts (quality metrics, human eval, guardrails).",
-            ],
-            "how_to_apply": [
-                "Build a portfolio: 2–3 mock PRDs + one shipped demo.",
-                "Tailor your resume around impact, leadership, and decision-making.",
-            ],
-        }
 
-    if "writer" in name:
+class RecommendationCache:
+    """
+    Base class for response caches; subclasses implement _get/_set/clear.
+    A backend error is logged and treated as a miss: the cache only ever saves work.
+    """
+
+    # True when get/set do blocking I/O and must not run directly on an event loop.
+    blocking = False
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            value = self._get(key)
+        except Exception:
+            logger.exception("Recommendation cache read failed")
+            value = None
+            with self._stats_lock:
+                self.errors += 1
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: dict) -> None:
+        try:
+            self._set(key, value)
+        except Exception:
+            logger.exception("Recommendation cache write failed")
+            with self._stats_lock:
+                self.errors += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            hits, misses, errors = self.hits, self.misses, self.errors
+        total = hits + misses
         return {
-            "getting_started": [
-                "Write 3–5 short technical articles explaining AI concepts clearly.",
-                "Practice docs structure: quickstart, reference, troubleshooting.",
-                "Build a small sample docs site (Markdown + static generator).",
-            ],
-            "resources": [
-                {"title": "Google Developer Documentation Style Guide", "url": "https://developers.google.com/style"},
-                {"title": "Write the Docs (community)", "url": "https://www.writethedocs.org/"},
-            ],
-            "interview_prep": [
-                "Expect a writing test: clarity, structure, correctness.",
-                "Be ready to talk about information architecture and audience analysis.",
-            ],
-            "how_to_apply": [
-                "Create a portfolio page with writing samples and before/after doc edits.",
-                "Apply to roles in DevRel/docs teams and emphasize collaboration with engineers.",
-            ],
+            "hits": hits,
+            "misses": misses,
+            "errors": errors,
+            "hit_ratio": (hits / total) if total else 0.0,
         }
 
-    # Generic fallback
-    return {
-        "getting_started": [
-            "Pick one role-specific skill to improve this week and schedule 3 focused sessions.",
-            "Build a small project that demonstrates the skill and publish it.",
-            "Update your resume/LinkedIn with the project and measurable outcomes.",
-        ],
-        "resources": [
-            {"title": "LinkedIn Jobs", "url": "https://www.linkedin.com/jobs/"},
-            {"title": "GitHub", "url": "https://github.com/"},
-        ],
-        "interview_prep": [
-            "Prepare 3 strong stories using the STAR format (Situation, Task, Action, Result).",
-            "Practice explaining your projects in 2 minutes and 10 minutes.",
-        ],
-        "how_to_apply": [
-            "Tailor your resume to each role and apply consistently (quality + volume).",
-            "Ask for referrals and feedback; iterate every week.",
-        ],
-    }
+    def _get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: dict) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class InMemoryRecommendationCache(RecommendationCache):
+    """Per-process LRU cache with a TTL. Safe to share between threads."""
+
+    def __init__(self, ttl: int = GENAI_CACHE_TTL, max_entries: int = GENAI_CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Callers get their own copy so they can't mutate the cached result.
+        return copy.deepcopy(value)
+
+    def _set(self, key, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoRecommendationCache(RecommendationCache):
+    """
+    Stores results in a Django cache alias so every worker shares them.
+    Expiry and culling (MAX_ENTRIES) are handled by the configured cache backend.
+    """
+
+    key_prefix = "genai-rec:"
+    blocking = True
+
+    def __init__(self, alias: str = GENAI_CACHE_ALIAS, ttl: int = GENAI_CACHE_TTL):
+        super().__init__()
+        self.alias = alias
+        self.ttl = ttl
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+
+        return caches[self.alias]
+
+    def _get(self, key):
+        return self._cache.get(self.key_prefix + key)
+
+    def _set(self, key, value):
+        self._cache.set(self.key_prefix + key, value, timeout=self.ttl)
+
+    def clear(self):
+        self._cache.clear()
+
+
+_recommendation_cache = None
+_recommendation_cache_lock = threading.Lock()
+
+
+def get_recommendation_cache() -> Optional[RecommendationCache]:
+    """Returns the configured response cache (built lazily), or None when disabled."""
+
+    global _recommendation_cache
+    if GENAI_CACHE_BACKEND == "none":
+        return None
+    if _recommendation_cache is None:
+        with _recommendation_cache_lock:
+            if _recommendation_cache is None:
+                if GENAI_CACHE_BACKEND == "django":
+                    _recommendation_cache = DjangoRecommendationCache()
+                else:
+                    _recommendation_cache = InMemoryRecommendationCache()
+    return _recommendation_cache
+
+
+def set_recommendation_cache(cache: Optional[RecommendationCache]) -> None:
+    """Swap the response cache (e.g. a custom backend, or None to rebuild from settings)."""
+
+    global _recommendation_cache
+    with _recommendation_cache_lock:
+        _recommendation_cache = cache
+
+
+def _default_action_plan_for(career_name: str) -> dict:
+    """Reasonable, curated defaults (used for fallback and to fill AI gaps); a fresh copy."""
+
+    return action_plan_for(career_name)
 
 
 def _ensure_list(value):
@@ -176,7 +289,7 @@ def _normalize_resources(resources):
     resources = _ensure_list(resources)
     normalized = []
     for r in resources:
-        if isinstance(r, dict):
+        if isinstance(r, Mapping):
             title = (r.get("title") or r.get("name") or "Resource").strip() or "Resource"
             url = (r.get("url") or "").strip()
             normalized.append({"title": title, "url": url})
@@ -185,68 +298,489 @@ def _normalize_resources(resources):
     return normalized
 
 
-def _call_genai(prompt: str) -> Optional[str]:
+_call_counters = {"throttled": 0, "rate_limited": 0, "retried": 0, "fallen_back": 0, "deadline_exceeded": 0}
+_call_counters_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _call_counters_lock:
+        _call_counters[name] += 1
+
+
+def genai_call_stats() -> dict:
+    """
+    throttled: calls the local rate limiter delayed or refused.
+    rate_limited: 429 responses from the API.
+    retried: retries after a 429/5xx.
+    fallen_back: calls given up on quota grounds (the user got the heuristic result).
+    deadline_exceeded: calls skipped or abandoned because the request's latency budget ran out.
+    """
+
+    with _call_counters_lock:
+        return dict(_call_counters)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Returns the configured limiter (built lazily), or None when no limits are set."""
+
+    global _rate_limiter
+    if not (GENAI_RATE_LIMIT_RPM or GENAI_RATE_LIMIT_TPM):
+        return None
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                if GENAI_RATE_LIMIT_BACKEND == "file":
+                    store = FileBucketStore(GENAI_RATE_LIMIT_FILE)
+                else:
+                    store = MemoryBucketStore()
+                _rate_limiter = RateLimiter(GENAI_RATE_LIMIT_RPM, GENAI_RATE_LIMIT_TPM, store)
+    return _rate_limiter
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]) -> None:
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = limiter
+
+
+genai_breaker = CircuitBreaker(
+    window=GENAI_BREAKER_WINDOW,
+    min_calls=GENAI_BREAKER_MIN_CALLS,
+    error_rate=GENAI_BREAKER_ERROR_RATE,
+    slow_call_seconds=GENAI_BREAKER_SLOW_CALL,
+    cooldown=GENAI_BREAKER_COOLDOWN,
+    probe_timeout=GENAI_CONNECT_TIMEOUT + GENAI_READ_TIMEOUT,
+)
+
+
+def _record_outcome(status_code: Optional[int], started: float) -> None:
+    """Feeds one HTTP attempt into the breaker. None means the request itself failed."""
+
+    if status_code == 429:
+        return  # quota, not an outage; the rate limiter handles it (and _call_genai frees a probe's slot)
+    ok = status_code is not None and status_code < 500
+    genai_breaker.record(ok, time.monotonic() - started)
+
+
+def _estimate_tokens(prompt: str) -> int:
+    # ~4 characters per token is close enough for quota planning.
+    return len(prompt) // 4 + GENAI_EXPECTED_OUTPUT_TOKENS
+
+
+def _attempt_timeouts(timeout: tuple, deadline) -> Optional[tuple]:
+    """(connect, read) timeouts for the next attempt within the deadline, or None if there is no time left."""
+
+    connect, read = timeout
+    read = timeout_for(deadline, read, GENAI_DEADLINE_RESERVE)
+    if read < GENAI_MIN_ATTEMPT_SECONDS:
+        _count("deadline_exceeded")
+        return None
+    return min(connect, read), read
+
+
+def _retry_delay(status_code: int, headers, attempt: int, deadline=None) -> Optional[float]:
+    """Seconds to wait before retrying this response, or None to stop."""
+
+    if status_code not in GENAI_RETRYABLE_STATUSES:
+        return None
+    retry_after = parse_retry_after(headers.get("Retry-After"))
+    if status_code == 429:
+        _count("rate_limited")
+        limiter = get_rate_limiter()
+        if limiter is not None and retry_after:
+            limiter.pause(retry_after)
+    if attempt >= GENAI_MAX_RETRIES:
+        return None
+    delay = backoff_delay(attempt, GENAI_RETRY_BASE_DELAY, GENAI_RETRY_MAX_DELAY, retry_after)
+    if delay > GENAI_RETRY_MAX_DELAY:
+        # The server wants us gone for longer than a user should wait.
+        return None
+    if deadline is not None and deadline.remaining() - GENAI_DEADLINE_RESERVE < delay + GENAI_MIN_ATTEMPT_SECONDS:
+        # No room left in the request's budget for another attempt.
+        return None
+    return delay
+
+
+def _response_text(status_code: int, read_json) -> tuple:
+    """(text, outcome) for the final response of a call; outcome is a genai_call_duration_seconds label."""
+
+    if status_code >= 400:
+        return None, "http_error"
+    try:
+        text = _extract_genai_text(read_json())
+    except Exception:
+        return None, "json_error"
+    return (text, "success") if text else (None, "empty")
+
+
+def _observe_genai_call(outcome: str, started: float) -> None:
+    seconds = time.monotonic() - started
+    metrics.observe_genai_call(outcome, seconds)
+    profiling.record_span("genai_call", started, seconds, outcome=outcome)
+
+
+def _observe_failure(outcome: str, started: float) -> None:
+    # Calls that return text are recorded by the caller, once the text has been parsed.
+    if outcome != "success":
+        _observe_genai_call(outcome, started)
+
+
+def _extract_genai_text(data: dict) -> Optional[str]:
+    candidates = data.get("candidates") or []
+    if candidates and "content" in candidates[0]:
+        parts = candidates[0]["content"].get("parts") or []
+        if parts and "text" in parts[0]:
+            return parts[0]["text"]
+    return None
+
+
+class GenAIClient:
+    """
+    Gemini REST client that reuses keep-alive connections.
+
+    One HTTPAdapter (and so one urllib3 connection pool) is shared by the whole
+    process; each thread gets its own lightweight Session on top of it, so the
+    client is safe to share between the threads of a WSGI worker.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        endpoint: str = GENAI_ENDPOINT,
+        pool_size: int = GENAI_POOL_SIZE,
+        connect_timeout: float = GENAI_CONNECT_TIMEOUT,
+        read_timeout: float = GENAI_READ_TIMEOUT,
+    ):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.timeout = (connect_timeout, read_timeout)
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self._adapter)
+            session.mount("http://", self._adapter)
+            session.headers["Connection"] = "keep-alive"
+            self._local.session = session
+        return session
+
+    def generate(self, prompt: str, deadline=None) -> Optional[str]:
+        """
+        Returns generated text, or None on failure, when quota is exhausted or when
+        the deadline leaves no time for a call. Timeouts shrink to fit the deadline.
+        """
+
+        started = time.monotonic()
+        text, outcome = self._generate(prompt, deadline)
+        _observe_failure(outcome, started)
+        return text
+
+    def _generate(self, prompt: str, deadline) -> tuple:
+        limiter = get_rate_limiter()
+        cost = _estimate_tokens(prompt)
+        for attempt in range(GENAI_MAX_RETRIES + 1):
+            if limiter is not None:
+                max_wait = timeout_for(deadline, GENAI_RATE_LIMIT_MAX_WAIT, GENAI_DEADLINE_RESERVE)
+                acquired, throttled = limiter.acquire(cost, max_wait=max_wait)
+                if throttled:
+                    _count("throttled")
+                if not acquired:
+                    _count("fallen_back")
+                    return None, "throttled"
+
+            timeouts = _attempt_timeouts(self.timeout, deadline)
+            if timeouts is None:
+                return None, "timeout"
+            started = time.monotonic()
+            try:
+                resp = self.session.post(
+                    self.endpoint,
+                    params={"key": self.api_key or GENAI_API_KEY},
+                    json={"contents": [{"parts": [{"text": prompt}]}]},
+                    timeout=timeouts,
+                )
+            except requests.RequestException as exc:
+                _record_outcome(None, started)
+                return None, "timeout" if isinstance(exc, requests.Timeout) else "http_error"
+            _record_outcome(resp.status_code, started)
+
+            delay = _retry_delay(resp.status_code, resp.headers, attempt, deadline)
+            if delay is None:
+                break
+            _count("retried")
+            time.sleep(delay)
+
+        if resp.status_code in GENAI_RETRYABLE_STATUSES:
+            _count("fallen_back")
+            return None, "http_error"
+        return _response_text(resp.status_code, resp.json)
+
+    def close(self) -> None:
+        self._adapter.close()
+
+
+_genai_client = None
+_genai_client_lock = threading.Lock()
+
+
+def get_genai_client() -> GenAIClient:
+    """Returns the process-wide GenAI client, creating it on first use."""
+
+    global _genai_client
+    if _genai_client is None:
+        with _genai_client_lock:
+            if _genai_client is None:
+                _genai_client = GenAIClient()
+    return _genai_client
+
+
+def set_genai_client(client: Optional[GenAIClient]) -> None:
+    """Swap the process-wide client (e.g. one pointed at a local stub), or None to reset."""
+
+    global _genai_client
+    with _genai_client_lock:
+        _genai_client = client
+
+
+_singleflight = SingleFlight()
+_file_singleflight = None
+_file_singleflight_lock = threading.Lock()
+
+
+def _prompt_key(prompt: str) -> str:
+    return hashlib.sha256(f"{GENAI_MODEL}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def _get_file_singleflight() -> FileLockSingleFlight:
+    global _file_singleflight
+    if _file_singleflight is None:
+        with _file_singleflight_lock:
+            if _file_singleflight is None:
+                _file_singleflight = FileLockSingleFlight(
+                    GENAI_SINGLEFLIGHT_DIR,
+                    timeout=GENAI_CONNECT_TIMEOUT + GENAI_READ_TIMEOUT,
+                )
+    return _file_singleflight
+
+
+def singleflight_stats() -> dict:
+    """How many GenAI calls ran vs. were coalesced into another caller's call."""
+
+    stats = {"threads": _singleflight.stats()}
+    if _file_singleflight is not None:
+        stats["processes"] = _file_singleflight.stats()
+    stats["async"] = {"executed": 0, "coalesced": 0}
+    for flight in list(_async_singleflights.values()):
+        stats["async"]["executed"] += flight.executed
+        stats["async"]["coalesced"] += flight.coalesced
+    return stats
+
+
+def _call_genai(prompt: str, deadline=None) -> Optional[str]:
     """
     Calls Google GenAI (Gemini) via REST when GENAI_API_KEY is set.
     Returns generated text or None on failure.
+    Raises CircuitOpenError without touching the network while the breaker is open.
+    With a deadline, the call (including waiting on an identical in-flight call) is
+    cut off in time for the heuristic fallback to fit the remaining budget.
     """
     if not GENAI_API_KEY:
         return None
+    probe = GENAI_BREAKER_ENABLED and genai_breaker.check()
+    try:
+        return _coalesced_call(prompt, deadline)
+    finally:
+        if probe:
+            # Only a success or a failure settles a probe; anything else frees the slot for the next call.
+            genai_breaker.release()
+
 
+def _coalesced_call(prompt: str, deadline) -> Optional[str]:
+    def call():
+        return get_genai_client().generate(prompt, deadline)
+
+    if GENAI_SINGLEFLIGHT == "none":
+        return call()
+    key = _prompt_key(prompt)
+    wait = None if deadline is None else timeout_for(deadline, deadline.budget, GENAI_DEADLINE_RESERVE)
     try:
-        resp = requests.post(
-            GENAI_ENDPOINT,
-            params={"key": GENAI_API_KEY},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
-            timeout=30,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        candidates = data.get("candidates") or []
-        if candidates and "content" in candidates[0]:
-            parts = candidates[0]["content"].get("parts") or []
-            if parts and "text" in parts[0]:
-                return parts[0]["text"]
-    except Exception:
+        if GENAI_SINGLEFLIGHT == "file":
+            # Threads coalesce in memory first, so only one of them touches the lock file.
+            return _singleflight.do(key, lambda: _get_file_singleflight().do(key, call, timeout=wait), timeout=wait)
+        return _singleflight.do(key, call, timeout=wait)
+    except TimeoutError:
+        _count("deadline_exceeded")
         return None
-    return None
 
 
-def generate_career_recommendation(data: dict) -> dict:
-    """Uses GenAI when configured; falls back to a local heuristic otherwise."""
+class AsyncGenAIClient:
+    """
+    httpx-based async counterpart of GenAIClient for ASGI deployments.
+
+    httpx connections are bound to the event loop that opened them, so use
+    get_async_genai_client() to get the instance for the running loop.
+    """
 
-    skills = (data.get("skills", "") or "").lower()
-    interests = (data.get("interests", "") or "").lower()
-    strengths = (data.get("strengths", "") or "").lower()
-    long_term_goal = (data.get("long_term_goal", "") or "").lower()
-    preferred_work_style = (data.get("preferred_work_style", "") or "").lower()
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        endpoint: str = GENAI_ENDPOINT,
+        max_connections: int = GENAI_ASYNC_MAX_CONNECTIONS,
+        max_keepalive: int = GENAI_POOL_SIZE,
+        connect_timeout: float = GENAI_CONNECT_TIMEOUT,
+        read_timeout: float = GENAI_READ_TIMEOUT,
+    ):
+        # Imported lazily so WSGI-only deployments don't need httpx installed.
+        import httpx
 
-    # Tokenize responses to reduce accidental matches (e.g., "candidate" vs "data")
-    tokens = set(
-        re.findall(
-            r"[a-zA-Z]+",
-            " ".join([skills, interests, strengths, long_term_goal, preferred_work_style]),
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.timeout = (connect_timeout, read_timeout)
+        self._httpx = httpx
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
         )
-    )
 
-    def any_token(*candidates):
-        return any(tok in tokens for tok in candidates)
+    async def generate(self, prompt: str, deadline=None) -> Optional[str]:
+        """Async variant of GenAIClient.generate."""
+
+        started = time.monotonic()
+        text, outcome = await self._generate(prompt, deadline)
+        _observe_failure(outcome, started)
+        return text
+
+    async def _generate(self, prompt: str, deadline) -> tuple:
+        limiter = get_rate_limiter()
+        cost = _estimate_tokens(prompt)
+        for attempt in range(GENAI_MAX_RETRIES + 1):
+            if limiter is not None:
+                max_wait = timeout_for(deadline, GENAI_RATE_LIMIT_MAX_WAIT, GENAI_DEADLINE_RESERVE)
+                acquired, throttled = await limiter.aacquire(cost, max_wait=max_wait)
+                if throttled:
+                    _count("throttled")
+                if not acquired:
+                    _count("fallen_back")
+                    return None, "throttled"
+
+            timeouts = _attempt_timeouts(self.timeout, deadline)
+            if timeouts is None:
+                return None, "timeout"
+            started = time.monotonic()
+            try:
+                resp = await self._client.post(
+                    self.endpoint,
+                    params={"key": self.api_key or GENAI_API_KEY},
+                    json={"contents": [{"parts": [{"text": prompt}]}]},
+                    timeout=self._httpx.Timeout(timeouts[1], connect=timeouts[0]),
+                )
+            except Exception as exc:
+                _record_outcome(None, started)
+                return None, "timeout" if isinstance(exc, self._httpx.TimeoutException) else "http_error"
+            _record_outcome(resp.status_code, started)
+
+            delay = _retry_delay(resp.status_code, resp.headers, attempt, deadline)
+            if delay is None:
+                break
+            _count("retried")
+            await asyncio.sleep(delay)
+
+        if resp.status_code in GENAI_RETRYABLE_STATUSES:
+            _count("fallen_back")
+            return None, "http_error"
+        return _response_text(resp.status_code, resp.json)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_async_genai_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_genai_client() -> AsyncGenAIClient:
+    """Returns the async GenAI client for the running event loop, creating it on first use."""
+
+    loop = asyncio.get_running_loop()
+    client = _async_genai_clients.get(loop)
+    if client is None:
+        client = _async_genai_clients[loop] = AsyncGenAIClient()
+    return client
+
 
-    # Technical intent: require explicit tech/coding signals, not just "data" or "analytics"
-    tech_signals = any_token(
+def set_async_genai_client(client: Optional[AsyncGenAIClient]) -> None:
+    """Swap the async client for the running event loop, or None to reset it."""
+
+    loop = asyncio.get_running_loop()
+    if client is None:
+        _async_genai_clients.pop(loop, None)
+    else:
+        _async_genai_clients[loop] = client
+
+
+_async_singleflights = weakref.WeakKeyDictionary()
+
+
+async def _acall_genai(prompt: str, deadline=None) -> Optional[str]:
+    """Async variant of _call_genai; identical prompts on one event loop share a call."""
+    if not GENAI_API_KEY:
+        return None
+    probe = GENAI_BREAKER_ENABLED and genai_breaker.check()
+    try:
+        return await _acoalesced_call(prompt, deadline)
+    finally:
+        if probe:
+            genai_breaker.release()
+
+
+async def _acoalesced_call(prompt: str, deadline) -> Optional[str]:
+    client = get_async_genai_client()
+    if GENAI_SINGLEFLIGHT == "none":
+        return await client.generate(prompt, deadline)
+    loop = asyncio.get_running_loop()
+    flight = _async_singleflights.get(loop)
+    if flight is None:
+        flight = _async_singleflights[loop] = AsyncSingleFlight()
+    wait = None if deadline is None else timeout_for(deadline, deadline.budget, GENAI_DEADLINE_RESERVE)
+    try:
+        return await flight.do(_prompt_key(prompt), lambda: client.generate(prompt, deadline), timeout=wait)
+    except TimeoutError:
+        _count("deadline_exceeded")
+        return None
+
+
+def _normalize_answers(data: dict) -> dict:
+    return {field: (data.get(field, "") or "").lower() for field in _QUESTIONNAIRE_FIELDS}
+
+
+# Keywords may be multi-word phrases; matching is case-insensitive and stem-based
+# ("models" matches "model"), see recommender/matching.py.
+# Explicit tech/coding signals. Roles marked "requires_tech" only fire when one of
+# these is present, so "data" or "analytics" alone doesn't suggest an engineering role.
+TECH_KEYWORDS = frozenset(
+    (
         "python",
         "sql",
         "javascript",
         "java",
         "c++",
+        "c#",
         "c",
         "go",
         "rust",
         "model",
-        "models",
         "ml",
         "machine",
+        "machine learning",
         "deep",
+        "deep learning",
         "ai",
         "engineer",
         "developer",
@@ -257,206 +791,232 @@ def generate_career_recommendation(data: dict) -> dict:
         "azure",
         "gcp",
     )
+)
 
-    base = []
-
-    if any_token("data", "analytics", "analyst", "analysis", "bi") and tech_signals:
-        base.append(
-            {
-                "career": "Data Scientist",
-                "score": 9,
-                "reason": "Strong data interest detected.",
-                "benefits": "High demand, versatile across industries, strong pay.",
-                "opportunities": "Tech, finance, healthcare, product analytics roles.",
-                "sub_careers": ["ML Engineer", "Data Analyst"],
-                "generation_source": "heuristic",
-                "model_name": "local",
-                "prompt_version": PROMPT_VERSION,
-                **_default_action_plan_for("Data Scientist"),
-            }
-        )
-    if any_token("ml", "machine", "ai", "model", "models", "mlops") and tech_signals:
-        base.append(
-            {
-                "career": "Machine Learning Engineer",
-                "score": 8,
-                "reason": "Machine learning keywords found.",
-                "benefits": "Impactful model deployment, work with modern stacks.",
-                "opportunities": "Platform teams, product ML features, AI startups.",
-                "sub_careers": ["Applied Scientist", "ML Platform Engineer"],
-                "generation_source": "heuristic",
-                "model_name": "local",
-                "prompt_version": PROMPT_VERSION,
-                **_default_action_plan_for("Machine Learning Engineer"),
-            }
-        )
-    if any_token("product", "pm", "roadmap"):
-        base.append(
-            {
-                "career": "AI Product Manager",
-                "score": 8,
-                "reason": "Product focus noted.",
-                "benefits": "Blend of strategy and AI, cross-functional leadership.",
-                "opportunities": "AI feature ownership, roadmap planning, GTM roles.",
-                "sub_careers": ["AI Product Owner", "Technical Program Manager"],
-                "generation_source": "heuristic",
-                "model_name": "local",
-                "prompt_version": PROMPT_VERSION,
-                **_default_action_plan_for("AI Product Manager"),
-            }
-        )
-    if any_token("ops", "mlops", "devops", "platform") and tech_signals:
-        base.append(
-            {
-                "career": "MLOps Engineer",
-                "score": 7,
-                "reason": "Ops/MLops inclination detected.",
-                "benefits": "Own reliability and scalability of AI systems.",
-                "opportunities": "Infra teams, platform engineering, observability roles.",
-                "sub_careers": ["Model Reliability Engineer", "Data Platform Engineer"],
-                "generation_source": "heuristic",
-                "model_name": "local",
-                "prompt_version": PROMPT_VERSION,
-                **_default_action_plan_for("MLOps Engineer"),
-            }
-        )
+# Keyword rules, in priority order. "action_plan" names the _default_action_plan_for entry.
+HEURISTIC_RULES = (
+    {
+        "keywords": ("data", "data science", "analytics", "analyst", "analysis", "bi"),
+        "requires_tech": True,
+        "career": "Data Scientist",
+        "score": 9,
+        "reason": "Strong data interest detected.",
+        "benefits": "High demand, versatile across industries, strong pay.",
+        "opportunities": "Tech, finance, healthcare, product analytics roles.",
+        "sub_careers": ("ML Engineer", "Data Analyst"),
+        "action_plan": "Data Scientist",
+    },
+    {
+        "keywords": ("ml", "machine", "machine learning", "deep learning", "ai", "model", "mlops"),
+        "requires_tech": True,
+        "career": "Machine Learning Engineer",
+        "score": 8,
+        "reason": "Machine learning keywords found.",
+        "benefits": "Impactful model deployment, work with modern stacks.",
+        "opportunities": "Platform teams, product ML features, AI startups.",
+        "sub_careers": ("Applied Scientist", "ML Platform Engineer"),
+        "action_plan": "Machine Learning Engineer",
+    },
+    {
+        "keywords": ("product", "product management", "pm", "roadmap"),
+        "requires_tech": False,
+        "career": "AI Product Manager",
+        "score": 8,
+        "reason": "Product focus noted.",
+        "benefits": "Blend of strategy and AI, cross-functional leadership.",
+        "opportunities": "AI feature ownership, roadmap planning, GTM roles.",
+        "sub_careers": ("AI Product Owner", "Technical Program Manager"),
+        "action_plan": "AI Product Manager",
+    },
+    {
+        "keywords": ("ops", "mlops", "devops", "platform"),
+        "requires_tech": True,
+        "career": "MLOps Engineer",
+        "score": 7,
+        "reason": "Ops/MLops inclination detected.",
+        "benefits": "Own reliability and scalability of AI systems.",
+        "opportunities": "Infra teams, platform engineering, observability roles.",
+        "sub_careers": ("Model Reliability Engineer", "Data Platform Engineer"),
+        "action_plan": "MLOps Engineer",
+    },
     # Non-technical leaning roles
-    if any_token("marketing", "growth", "sales", "business", "partnerships"):
-        base.append(
-            {
-                "career": "AI Solutions / Sales Engineer",
-                "score": 7,
-                "reason": "Business/market-facing interest detected.",
-                "benefits": "Bridge customers and product; strong earning potential.",
-                "opportunities": "SaaS presales, partner engineering, enterprise enablement.",
-                "sub_careers": ["Customer Engineer", "Partner Engineer"],
-                "generation_source": "heuristic",
-                "model_name": "local",
-                "prompt_version": PROMPT_VERSION,
-                **_default_action_plan_for("AI Solutions / Sales Engineer"),
-            }
-        )
+    {
+        "keywords": ("marketing", "growth", "sales", "business", "partnerships"),
+        "requires_tech": False,
+        "career": "AI Solutions / Sales Engineer",
+        "score": 7,
+        "reason": "Business/market-facing interest detected.",
+        "benefits": "Bridge customers and product; strong earning potential.",
+        "opportunities": "SaaS presales, partner engineering, enterprise enablement.",
+        "sub_careers": ("Customer Engineer", "Partner Engineer"),
+        "action_plan": "AI Solutions / Sales Engineer",
+    },
+    {
+        "keywords": ("business", "analysis", "analyst", "strategy", "consulting", "operations", "process"),
+        "requires_tech": False,
+        "career": "Business Analyst / Strategy Analyst",
+        "score": 7,
+        "reason": "Business/strategy focus detected.",
+        "benefits": "Influence decisions with insights; cross-functional impact.",
+        "opportunities": "Operations, strategy, PMO, transformation teams.",
+        "sub_careers": ("Strategy Associate", "Operations Analyst"),
+        "action_plan": "Business Analyst",
+    },
+    {
+        "keywords": ("project", "project management", "program", "coordination", "delivery", "management"),
+        "requires_tech": False,
+        "career": "Project / Program Coordinator",
+        "score": 7,
+        "reason": "Project coordination interest detected.",
+        "benefits": "Own delivery timelines; cross-functional exposure.",
+        "opportunities": "Implementation teams, PMOs, delivery offices.",
+        "sub_careers": ("Program Manager", "Implementation Lead"),
+        "action_plan": "Project Coordinator",
+    },
+    {
+        "keywords": ("design", "ux", "ui", "research", "prototype"),
+        "requires_tech": False,
+        "career": "AI UX Designer / Researcher",
+        "score": 7,
+        "reason": "Design/UX inclination detected.",
+        "benefits": "Shape AI experiences and user trust.",
+        "opportunities": "Product design teams, research labs, design systems.",
+        "sub_careers": ("UX Researcher", "Conversation Designer"),
+        "action_plan": "AI UX Designer",
+    },
+    {
+        "keywords": ("writing", "content", "communication", "docs", "documentation"),
+        "requires_tech": False,
+        "career": "Technical Writer (AI)",
+        "score": 7,
+        "reason": "Writing/communication strength detected.",
+        "benefits": "Explain complex AI topics clearly; flexible work setups.",
+        "opportunities": "Product documentation, developer relations content.",
+        "sub_careers": ("Developer Advocate (content)", "Docs Specialist"),
+        "action_plan": "Technical Writer",
+    },
+)
 
-    if any_token("business", "analysis", "analyst", "strategy", "consulting", "operations", "process"):
-        base.append(
-            {
-                "career": "Business Analyst / Strategy Analyst",
-                "score": 7,
-                "reason": "Business/strategy focus detected.",
-                "benefits": "Influence decisions with insights; cross-functional impact.",
-                "opportunities": "Operations, strategy, PMO, transformation teams.",
-                "sub_careers": ["Strategy Associate", "Operations Analyst"],
-                "generation_source": "heuristic",
-                "model_name": "local",
-                "prompt_version": PROMPT_VERSION,
-                **_default_action_plan_for("Business Analyst"),
-            }
-        )
+# A diverse, non-technical set appended when nothing matched or there is no tech signal.
+FALLBACK_RULES = (
+    {
+        "career": "AI Product Specialist",
+        "score": 7,
+        "reason": "General AI interest assumed.",
+        "benefits": "Customer-facing, broad exposure to AI use-cases.",
+        "opportunities": "Solutions engineering, customer success, sales enablement.",
+        "sub_careers": ("Solutions Architect", "AI Implementation Consultant"),
+        "action_plan": "AI Product Specialist",
+    },
+    {
+        "career": "Technical Writer (AI)",
+        "score": 7,
+        "reason": "Communication focus assumed.",
+        "benefits": "Explain complex ideas; flexible/remote friendly.",
+        "opportunities": "Docs teams, DevRel content, education.",
+        "sub_careers": ("Docs Specialist", "Content Strategist"),
+        "action_plan": "Technical Writer",
+    },
+    {
+        "career": "AI Project Coordinator",
+        "score": 7,
+        "reason": "Coordination and delivery focus assumed.",
+        "benefits": "Plan and ship; cross-team collaboration.",
+        "opportunities": "Implementation projects, PMO roles.",
+        "sub_careers": ("Program Coordinator", "Implementation Lead"),
+        "action_plan": "Project Coordinator",
+    },
+    {
+        "career": "Business Analyst",
+        "score": 7,
+        "reason": "Business/operations focus assumed.",
+        "benefits": "Improve processes and decisions; stakeholder-facing.",
+        "opportunities": "Operations, strategy, transformation teams.",
+        "sub_careers": ("Operations Analyst", "Strategy Analyst"),
+        "action_plan": "Business Analyst",
+    },
+)
 
-    if any_token("project", "program", "coordination", "delivery", "management"):
-        base.append(
-            {
-                "career": "Project / Program Coordinator",
-                "score": 7,
-                "reason": "Project coordination interest detected.",
-                "benefits": "Own delivery timelines; cross-functional exposure.",
-                "opportunities": "Implementation teams, PMOs, delivery offices.",
-                "sub_careers": ["Program Manager", "Implementation Lead"],
-                "generation_source": "heuristic",
-                "model_name": "local",
-                "prompt_version": PROMPT_VERSION,
-                **_default_action_plan_for("Project Coordinator"),
-            }
-        )
+HEURISTIC_LIMIT = 3
 
-    if any_token("design", "ux", "ui", "research", "prototype"):
-        base.append(
-            {
-                "career": "AI UX Designer / Researcher",
-                "score": 7,
-                "reason": "Design/UX inclination detected.",
-                "benefits": "Shape AI experiences and user trust.",
-                "opportunities": "Product design teams, research labs, design systems.",
-                "sub_careers": ["UX Researcher", "Conversation Designer"],
-                "generation_source": "heuristic",
-                "model_name": "local",
-                "prompt_version": PROMPT_VERSION,
-                **_default_action_plan_for("AI UX Designer"),
-            }
-        )
 
-    if any_token("writing", "content", "communication", "docs", "documentation"):
-        base.append(
-            {
-                "career": "Technical Writer (AI)",
-                "score": 7,
-                "reason": "Writing/communication strength detected.",
-                "benefits": "Explain complex AI topics clearly; flexible work setups.",
-                "opportunities": "Product documentation, developer relations content.",
-                "sub_careers": ["Developer Advocate (content)", "Docs Specialist"],
-                "generation_source": "heuristic",
-                "model_name": "local",
-                "prompt_version": PROMPT_VERSION,
-                **_default_action_plan_for("Technical Writer"),
-            }
-        )
+def _compile_rule_index(rules) -> dict:
+    """Inverted index: keyword -> positions of the rules it triggers."""
+
+    index = {}
+    for position, rule in enumerate(rules):
+        for keyword in rule["keywords"]:
+            index.setdefault(keyword, []).append(position)
+    return {keyword: tuple(positions) for keyword, positions in index.items()}
+
+
+_RULE_INDEX = _compile_rule_index(HEURISTIC_RULES)
+
+# Built once per process; matches every rule keyword and tech signal in one pass.
+_SIGNAL_MATCHER = PhraseMatcher(sorted(TECH_KEYWORDS | set(_RULE_INDEX)))
+
+_FIELD_LABELS = {
+    "skills": "skills",
+    "interests": "interests",
+    "strengths": "strengths",
+    "long_term_goal": "long-term goal",
+    "preferred_work_style": "work style",
+}
 
-    # If still empty, provide a diverse, non-technical set
-    if not base or not tech_signals:
-        base.extend(
-            [
-                {
-                    "career": "AI Product Specialist",
-                    "score": 7,
-                    "reason": "General AI interest assumed.",
-                    "benefits": "Customer-facing, broad exposure to AI use-cases.",
-                    "opportunities": "Solutions engineering, customer success, sales enablement.",
-                    "sub_careers": ["Solutions Architect", "AI Implementation Consultant"],
-                    "generation_source": "heuristic",
-                    "model_name": "local",
-                    "prompt_version": PROMPT_VERSION,
-                    **_default_action_plan_for("AI Product Specialist"),
-                },
-                {
-                    "career": "Technical Writer (AI)",
-                    "score": 7,
-                    "reason": "Communication focus assumed.",
-                    "benefits": "Explain complex ideas; flexible/remote friendly.",
-                    "opportunities": "Docs teams, DevRel content, education.",
-                    "sub_careers": ["Docs Specialist", "Content Strategist"],
-                    "generation_source": "heuristic",
-                    "model_name": "local",
-                    "prompt_version": PROMPT_VERSION,
-                    **_default_action_plan_for("Technical Writer"),
-                },
-                {
-                    "career": "AI Project Coordinator",
-                    "score": 7,
-                    "reason": "Coordination and delivery focus assumed.",
-                    "benefits": "Plan and ship; cross-team collaboration.",
-                    "opportunities": "Implementation projects, PMO roles.",
-                    "sub_careers": ["Program Coordinator", "Implementation Lead"],
-                    "generation_source": "heuristic",
-                    "model_name": "local",
-                    "prompt_version": PROMPT_VERSION,
-                    **_default_action_plan_for("Project Coordinator"),
-                },
-                {
-                    "career": "Business Analyst",
-                    "score": 7,
-                    "reason": "Business/operations focus assumed.",
-                    "benefits": "Improve processes and decisions; stakeholder-facing.",
-                    "opportunities": "Operations, strategy, transformation teams.",
-                    "sub_careers": ["Operations Analyst", "Strategy Analyst"],
-                    "generation_source": "heuristic",
-                    "model_name": "local",
-                    "prompt_version": PROMPT_VERSION,
-                    **_default_action_plan_for("Business Analyst"),
-                },
-            ]
-        )
 
-    prompt = (
+def _heuristic_recommendations(answers: dict):
+    """
+    Keyword-based candidates. Returns (candidates, tech_signals) where candidates
+    are the top HEURISTIC_LIMIT (rule, match) pairs from HEURISTIC_RULES/FALLBACK_RULES;
+    match is the answer text that triggered the rule (None for fallbacks).
+    Turn them into recommendations with _heuristic_result.
+    """
+
+    matches = _SIGNAL_MATCHER.first_matches({field: answers[field] for field in _HEURISTIC_FIELDS})
+    tech_signals = any(keyword in TECH_KEYWORDS for keyword in matches)
+
+    # Matches arrive in answer order, so each rule keeps its earliest trigger.
+    fired = {}
+    for keyword, match in matches.items():
+        for position in _RULE_INDEX.get(keyword, ()):
+            fired.setdefault(position, match)
+
+    candidates = [
+        (HEURISTIC_RULES[position], fired[position])
+        for position in sorted(fired)
+        if tech_signals or not HEURISTIC_RULES[position]["requires_tech"]
+    ]
+    if not candidates or not tech_signals:
+        candidates.extend((rule, None) for rule in FALLBACK_RULES)
+    return candidates[:HEURISTIC_LIMIT], tech_signals
+
+
+def _recommendation_from_rule(rule: dict, match=None) -> dict:
+    reason = rule["reason"]
+    if match is not None:
+        reason = f'{reason} Based on "{match.text}" in your {_FIELD_LABELS[match.field]}.'
+    return {
+        "career": rule["career"],
+        "score": rule["score"],
+        "reason": reason,
+        "benefits": rule["benefits"],
+        "opportunities": rule["opportunities"],
+        "sub_careers": list(rule["sub_careers"]),
+        "generation_source": "heuristic",
+        "model_name": "local",
+        "prompt_version": PROMPT_VERSION,
+        **_default_action_plan_for(rule["action_plan"]),
+    }
+
+
+def _build_prompt(answers: dict) -> str:
+    skills = answers["skills"]
+    interests = answers["interests"]
+    strengths = answers["strengths"]
+    long_term_goal = answers["long_term_goal"]
+    preferred_work_style = answers["preferred_work_style"]
+
+    return (
         "Given this user's background, suggest 3 careers as strict JSON with the shape "
         '{"recommendations":[{"career":"...","score":int,"reason":"...","benefits":"...","opportunities":"...",'
         '"sub_careers":["..."],'
@@ -469,12 +1029,19 @@ def generate_career_recommendation(data: dict) -> dict:
         f"Work style: {preferred_work_style}. Long-term goal: {long_term_goal}."
     )
 
-    ai_text = _call_genai(prompt)
-    if ai_text:
-        try:
+
+def _recommendations_from_genai(ai_text: str, tech_signals: bool, deadline=None) -> tuple:
+    """
+    Parses and normalizes a GenAI response: (result, "success"), or (None, "json_error")
+    or (None, "empty") when it is unusable.
+    """
+
+    try:
+        with stage(deadline, "json_parse"):
             parsed = json.loads(ai_text)
             recs = parsed.get("recommendations")
-            if isinstance(recs, list) and recs:
+        if isinstance(recs, list) and recs:
+            with stage(deadline, "normalization"):
                 if not tech_signals:
                     tech_terms = ("engineer", "scientist", "developer", "ml", "ai", "data")
                     filtered = []
@@ -488,7 +1055,8 @@ def generate_career_recommendation(data: dict) -> dict:
                 normalized_recs = []
                 for r in recs:
                     career_name = r.get("career") or "Career"
-                    defaults = _default_action_plan_for(career_name)
+                    # Read-only view: the defaults are only copied where they are used.
+                    defaults = action_plan_view(career_name)
 
                     normalized_recs.append(
                         {
@@ -508,22 +1076,127 @@ def generate_career_recommendation(data: dict) -> dict:
                         }
                     )
 
-                if normalized_recs:
-                    return {"recommendations": normalized_recs[:3]}
-        except Exception:
-            # Fallback to heuristic if parsing fails
-            pass
+            if normalized_recs:
+                return {"recommendations": normalized_recs[:3]}, "success"
+    except Exception:
+        # Fallback to heuristic if parsing fails
+        return None, "json_error"
+    return None, "empty"
 
+
+def _heuristic_result(candidates: list, generation_source: str = "heuristic") -> dict:
+    # Action plans are only built for the rules that are actually returned.
     # Ensure base recommendations always contain metadata, even if new roles were added without it.
     normalized_base = []
-    for r in base[:3]:
+    for r in (_recommendation_from_rule(rule, match) for rule, match in candidates[:HEURISTIC_LIMIT]):
         normalized_base.append(
             {
                 **r,
-                "generation_source": r.get("generation_source") or "heuristic",
+                "generation_source": generation_source,
                 "model_name": r.get("model_name") or "local",
                 "prompt_version": r.get("prompt_version") or PROMPT_VERSION,
             }
         )
 
     return {"recommendations": normalized_base}
+
+
+def heuristic_recommendation(data: dict) -> dict:
+    """The local heuristic's result for the answers, without trying GenAI."""
+
+    candidates, _ = _heuristic_recommendations(_normalize_answers(data))
+    return _heuristic_result(candidates)
+
+
+def generate_career_recommendation(data: dict, deadline=None) -> dict:
+    """
+    Uses GenAI when configured; falls back to a local heuristic otherwise.
+    With a Deadline, the GenAI call gives up in time for the fallback to fit the budget
+    and each stage's duration is recorded on it.
+    """
+
+    result = _generate_career_recommendation(data, deadline)
+    metrics.count_recommendation(result)
+    return result
+
+
+def _generate_career_recommendation(data: dict, deadline) -> dict:
+    # Only GenAI results are cached; the heuristic is cheap and should recover as soon as the API does.
+    cache = get_recommendation_cache() if GENAI_API_KEY else None
+    cache_key = None
+    if cache is not None:
+        cache_key = recommendation_cache_key(data)
+        with stage(deadline, "cache_lookup"):
+            cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    with stage(deadline, "heuristic"):
+        answers = _normalize_answers(data)
+        candidates, tech_signals = _heuristic_recommendations(answers)
+
+    started = time.monotonic()
+    try:
+        with stage(deadline, "llm_call"):
+            ai_text = _call_genai(_build_prompt(answers), deadline)
+    except CircuitOpenError:
+        _observe_genai_call("circuit_open", started)
+        return _heuristic_result(candidates, generation_source=GENERATION_SOURCE_BREAKER)
+    result = None
+    if ai_text:
+        result, outcome = _recommendations_from_genai(ai_text, tech_signals, deadline)
+        _observe_genai_call(outcome, started)
+    if result is not None:
+        if cache is not None:
+            cache.set(cache_key, result)
+        return result
+
+    return _heuristic_result(candidates)
+
+
+async def _cache_call(cache: RecommendationCache, method: str, *args):
+    func = getattr(cache, method)
+    if cache.blocking:
+        return await sync_to_async(func)(*args)
+    return func(*args)
+
+
+async def agenerate_career_recommendation(data: dict, deadline=None) -> dict:
+    """Async variant of generate_career_recommendation; the GenAI call doesn't hold a thread."""
+
+    result = await _agenerate_career_recommendation(data, deadline)
+    metrics.count_recommendation(result)
+    return result
+
+
+async def _agenerate_career_recommendation(data: dict, deadline) -> dict:
+    cache = get_recommendation_cache() if GENAI_API_KEY else None
+    cache_key = None
+    if cache is not None:
+        cache_key = recommendation_cache_key(data)
+        with stage(deadline, "cache_lookup"):
+            cached = await _cache_call(cache, "get", cache_key)
+        if cached is not None:
+            return cached
+
+    with stage(deadline, "heuristic"):
+        answers = _normalize_answers(data)
+        candidates, tech_signals = _heuristic_recommendations(answers)
+
+    started = time.monotonic()
+    try:
+        with stage(deadline, "llm_call"):
+            ai_text = await _acall_genai(_build_prompt(answers), deadline)
+    except CircuitOpenError:
+        _observe_genai_call("circuit_open", started)
+        return _heuristic_result(candidates, generation_source=GENERATION_SOURCE_BREAKER)
+    result = None
+    if ai_text:
+        result, outcome = _recommendations_from_genai(ai_text, tech_signals, deadline)
+        _observe_genai_call(outcome, started)
+    if result is not None:
+        if cache is not None:
+            await _cache_call(cache, "set", cache_key, result)
+        return result
+
+    return _heuristic_result(candidates)
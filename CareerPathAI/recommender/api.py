@@ -0,0 +1,358 @@
+"""
+JSON API (v1) for the mobile client, under /api/v1/.
+
+    GET    recommendations/                 list (keyset pages; ?deleted=1 for the recycle bin)
+    GET    recommendations/<id>/            fetch
+    DELETE recommendations/<id>/            move to the recycle bin
+    POST   recommendations/<id>/restore/    restore from the recycle bin
+    POST   recommendations/<id>/rating/     {"rating": 1 | -1, "note": "..."}
+    POST   questionnaires/                  submit a questionnaire (JSON or form body)
+
+Requests use the browser session (send the CSRF token as X-CSRFToken on writes).
+`?fields=id,score,...` limits a response to those fields, and only their columns
+are read.
+
+Every recommendation and list page has a strong ETag computed from the rows'
+version columns (created_at, deleted_at, user_rating and the rating note, status),
+so it is known as soon as the rows are read. An If-None-Match that still matches
+gets 304 Not Modified before anything is serialized. If-Match on the write
+endpoints guards against overwriting a change made elsewhere (412); the tag covers
+the selected fields, so a write names the same `?fields=` as the GET it follows.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.urls import reverse
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_http_methods
+
+from . import dashboard_cache
+from .db_router import replica_reads, replica_scope
+from .deadline import Deadline
+from .forms import QuestionnaireForm
+from .jobs import asubmit_recommendation, submit_recommendation
+from .models import Recommendation
+from .pagination import decode_cursor, keyset_page
+from .views import _parse_explanation
+
+API_VERSION = "v1"
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Columns always read. All but "user" (which saves and cache invalidation need)
+# go into the ETag, so a change to any of them is a new version.
+VERSION_COLUMNS = ("id", "user", "created_at", "deleted_at", "user_rating", "user_rating_note", "status")
+
+
+def _action_plan(rec) -> dict:
+    plan = rec.action_plan_cached
+    if plan is None:
+        return {}
+    return {
+        "getting_started": plan.getting_started,
+        "resources": plan.resources,
+        "interview_prep": plan.interview_prep,
+        "how_to_apply": plan.how_to_apply,
+    }
+
+
+# name -> (model fields it reads, value for a recommendation)
+FIELDS = {
+    "id": ((), lambda rec: rec.pk),
+    "career_name": (("career_name",), lambda rec: rec.career_name),
+    "score": (("score",), lambda rec: rec.score),
+    "status": ((), lambda rec: rec.status),
+    "created_at": ((), lambda rec: rec.created_at),
+    "deleted_at": ((), lambda rec: rec.deleted_at),
+    "user_rating": ((), lambda rec: rec.user_rating),
+    "user_rating_note": ((), lambda rec: rec.user_rating_note),
+    "generation_source": (("generation_source",), lambda rec: rec.generation_source),
+    "model_name": (("model_name",), lambda rec: rec.model_name),
+    "prompt_version": (("prompt_version",), lambda rec: rec.prompt_version),
+    "questionnaire_id": (("questionnaire",), lambda rec: rec.questionnaire_id),
+    "details": (("details", "explanation"), lambda rec: rec.details or _parse_explanation(rec.explanation)),
+    "action_plan": (("action_plan",), _action_plan),
+}
+LIST_FIELDS = ("id", "career_name", "score", "status", "created_at", "deleted_at", "user_rating")
+DETAIL_FIELDS = tuple(FIELDS)
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str, **extra):
+        super().__init__(message)
+        self.status = status
+        self.payload = {"error": message, **extra}
+
+
+def _error(status: int, message: str, **extra) -> JsonResponse:
+    return JsonResponse({"error": message, **extra}, status=status)
+
+
+def _json(data, status: int = 200, etag: str = None) -> JsonResponse:
+    response = JsonResponse(data, status=status, json_dumps_params={"separators": (",", ":")})
+    return _cache_headers(response, etag)
+
+
+def _cache_headers(response, etag: str = None):
+    # Private, and revalidated on every use: the ETag makes that a cheap 304.
+    patch_cache_control(response, private=True, no_cache=True)
+    if etag is not None:
+        response["ETag"] = etag
+    return response
+
+
+def _fields(request, default: tuple) -> tuple:
+    raw = request.GET.get("fields")
+    if not raw:
+        return default
+    names = tuple(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown or not names:
+        raise ApiError(400, "Unknown fields requested.", unknown=unknown, available=list(FIELDS))
+    return names
+
+
+def _columns(fields: tuple) -> tuple:
+    return tuple(dict.fromkeys(VERSION_COLUMNS + tuple(column for name in fields for column in FIELDS[name][0])))
+
+
+def _version(rec) -> str:
+    deleted_at = rec.deleted_at.isoformat() if rec.deleted_at else ""
+    return f"{rec.pk}|{rec.created_at.isoformat()}|{deleted_at}|{rec.user_rating}|{rec.user_rating_note}|{rec.status}"
+
+
+def _etag(fields: tuple, versions) -> str:
+    # The selected fields are part of the representation, so they are part of its tag too.
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{API_VERSION}|{','.join(fields)}".encode())
+    for version in versions:
+        digest.update(b"\n" + version.encode())
+    return quote_etag(digest.hexdigest())
+
+
+def serialize(rec, fields: tuple) -> dict:
+    return {name: FIELDS[name][1](rec) for name in fields}
+
+
+def api_login_required(view):
+    """Like login_required, but answers 401 JSON instead of redirecting; ApiErrors become JSON errors."""
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def _wrapped(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return _error(401, "Authentication required.")
+            try:
+                return await view(request, *args, **kwargs)
+            except ApiError as exc:
+                return JsonResponse(exc.payload, status=exc.status)
+
+    else:
+
+        @wraps(view)
+        def _wrapped(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return _error(401, "Authentication required.")
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as exc:
+                return JsonResponse(exc.payload, status=exc.status)
+
+    return _wrapped
+
+
+def _get_recommendation(request, pk: int, fields: tuple) -> Recommendation:
+    rec = Recommendation.objects.filter(pk=pk, user=request.user).only(*_columns(fields)).first()
+    if rec is None:
+        raise ApiError(404, "Recommendation not found.")
+    return rec
+
+
+def _conditional(request, etag: str):
+    """304 (GET) or 412 (If-Match on a write) when the request's preconditions say so; None to go on."""
+
+    response = get_conditional_response(request, etag=etag)
+    return _cache_headers(response, etag) if response is not None else None
+
+
+def _written(rec, fields: tuple, status: int = 200) -> JsonResponse:
+    return _json(serialize(rec, fields), status=status, etag=_etag(fields, [_version(rec)]))
+
+
+def _payload(request) -> dict:
+    if request.content_type != "application/json":
+        return request.POST
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        raise ApiError(400, "Request body is not valid JSON.")
+    if not isinstance(payload, dict):
+        raise ApiError(400, "Request body must be a JSON object.")
+    return payload
+
+
+@require_http_methods(["GET", "HEAD"])
+@api_login_required
+@replica_reads
+def recommendations(request):
+    """A page of the user's recommendations (or, with ?deleted=1, of their recycle bin), newest first."""
+
+    fields = _fields(request, LIST_FIELDS)
+    try:
+        size = min(max(int(request.GET.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError(400, "limit must be a number.")
+    if request.GET.get("deleted") in ("1", "true"):
+        cutoff = timezone.now() - timedelta(days=settings.RECYCLE_BIN_RETENTION_DAYS)
+        queryset = Recommendation.objects.filter(user=request.user, deleted_at__isnull=False, deleted_at__gte=cutoff)
+        order_field = "deleted_at"
+    else:
+        queryset = Recommendation.objects.filter(user=request.user, deleted_at__isnull=True)
+        order_field = "created_at"
+    page = keyset_page(
+        queryset.only(*_columns(fields)),
+        order_field,
+        size,
+        after=decode_cursor(request.GET.get("after")),
+        before=decode_cursor(request.GET.get("before")),
+    )
+    etag = _etag(fields, [_version(rec) for rec in page] + [f"{page.next_cursor}|{page.previous_cursor}"])
+    not_modified = _conditional(request, etag)
+    if not_modified is not None:
+        return not_modified
+    payload = {"results": [serialize(rec, fields) for rec in page], "next": page.next_cursor, "previous": page.previous_cursor}
+    return _json(payload, etag=etag)
+
+
+@require_http_methods(["GET", "HEAD", "DELETE"])
+@api_login_required
+def recommendation(request, pk):
+    """GET: one recommendation. DELETE: move it to the recycle bin (a no-op if it is there already)."""
+
+    fields = _fields(request, DETAIL_FIELDS)
+    if request.method == "DELETE":
+        return _change(request, pk, fields, _soft_delete)
+    with replica_scope():
+        rec = _get_recommendation(request, pk, fields)
+    etag = _etag(fields, [_version(rec)])
+    return _conditional(request, etag) or _json(serialize(rec, fields), etag=etag)
+
+
+def _change(request, pk: int, fields: tuple, apply) -> JsonResponse:
+    """Runs apply(rec) on a recommendation once its If-Match (if any) has passed."""
+
+    rec = _get_recommendation(request, pk, fields)
+    failed = _conditional(request, _etag(fields, [_version(rec)]))
+    if failed is not None:
+        return failed
+    if apply(rec):
+        dashboard_cache.bump_generation(rec.user_id)
+    return _written(rec, fields)
+
+
+def _soft_delete(rec) -> bool:
+    if rec.deleted_at is not None:
+        return False
+    rec.soft_delete()
+    return True
+
+
+def _restore(rec) -> bool:
+    if rec.deleted_at is None:
+        return False
+    rec.restore()
+    return True
+
+
+@require_http_methods(["POST"])
+@api_login_required
+def restore_recommendation(request, pk):
+    """Takes a recommendation out of the recycle bin (a no-op if it isn't in it)."""
+
+    return _change(request, pk, _fields(request, DETAIL_FIELDS), _restore)
+
+
+@require_http_methods(["POST"])
+@api_login_required
+def rate_recommendation(request, pk):
+    """{"rating": 1 or -1, "note": optional text}; like the detail page, an empty note keeps the old one."""
+
+    payload = _payload(request)
+    rating = str(payload.get("rating", ""))
+    if rating not in ("1", "-1"):
+        raise ApiError(400, "rating must be 1 or -1.")
+    note = str(payload.get("note") or "").strip()
+
+    def rate(rec) -> bool:
+        if rec.deleted_at is not None:
+            raise ApiError(409, "Cannot rate items in the recycle bin.")
+        if rec.status == Recommendation.STATUS_PENDING:
+            raise ApiError(409, "This recommendation is still being generated.")
+        rec.user_rating = int(rating)
+        if note:
+            rec.user_rating_note = note
+        rec.save(update_fields=["user_rating", "user_rating_note"])
+        return True
+
+    return _change(request, pk, _fields(request, DETAIL_FIELDS), rate)
+
+
+def _submitted(job, fields: tuple, deadline: Deadline) -> JsonResponse:
+    rec = job.recommendation
+    response = _written(rec, fields, status=201)
+    response["Location"] = reverse("api_recommendation", args=[rec.pk])
+    response["Server-Timing"] = deadline.server_timing()
+    return response
+
+
+@require_http_methods(["POST"])
+@api_login_required
+def submit_questionnaire(request):
+    """
+    Saves a questionnaire and generates its recommendation, returned with 201.
+    With ASYNC_RECOMMENDATIONS it comes back pending; poll it (ETags make that cheap).
+    """
+
+    fields = _fields(request, DETAIL_FIELDS)
+    deadline = request.deadline = Deadline(settings.QUESTIONNAIRE_BUDGET)
+    with deadline.stage("form_validation"):
+        form = QuestionnaireForm(_payload(request))
+        valid = form.is_valid()
+    if not valid:
+        return _error(400, "Invalid questionnaire.", fields=form.errors.get_json_data())
+    with deadline.stage("questionnaire_insert"):
+        questionnaire = form.save(commit=False)
+        questionnaire.user = request.user
+        questionnaire.save()
+    job = submit_recommendation(questionnaire, deadline)
+    return _submitted(job, fields, deadline)
+
+
+@require_http_methods(["POST"])
+@api_login_required
+async def submit_questionnaire_async(request):
+    """ASGI variant of submit_questionnaire: the GenAI round trip is awaited instead of pinning a thread."""
+
+    fields = _fields(request, DETAIL_FIELDS)
+    deadline = request.deadline = Deadline(settings.QUESTIONNAIRE_BUDGET)
+    with deadline.stage("form_validation"):
+        form = QuestionnaireForm(await sync_to_async(_payload)(request))
+        valid = await sync_to_async(form.is_valid)()
+    if not valid:
+        return _error(400, "Invalid questionnaire.", fields=form.errors.get_json_data())
+    with deadline.stage("questionnaire_insert"):
+        questionnaire = form.save(commit=False)
+        questionnaire.user = await request.auser()
+        await questionnaire.asave()
+    job = await asubmit_recommendation(questionnaire, deadline)
+    return await sync_to_async(_submitted)(job, fields, deadline)
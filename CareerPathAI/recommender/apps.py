@@ -3,3 +3,13 @@ from django.apps import AppConfig
 
 class RecommenderConfig(AppConfig):
     name = 'recommender'
+
+    def ready(self):
+        from django.core import checks
+
+        from . import dashboard_cache, db_tuning, metrics, profiling
+
+        checks.register(dashboard_cache.check_shared_backend, checks.Tags.caches)
+        db_tuning.install()
+        metrics.install()
+        profiling.install()
@@ -0,0 +1,264 @@
+"""
+Bulk scoring of questionnaire files (`python manage.py score_questionnaires`).
+
+Partners send CSV or JSONL files with one questionnaire per row: the
+QuestionnaireForm fields plus `username`. The file is streamed in batches. Each
+batch is scored in parallel and then written with bulk_create: one Questionnaire
+and one Recommendation per row, like the questionnaire view.
+
+- Heuristic only (no GENAI_API_KEY, or heuristic_only): a process pool scores
+  the rows, because the heuristic is pure CPU.
+- GenAI: one event loop runs up to `genai_concurrency` calls at once through the
+  async client. The rate limiter, circuit breaker and heuristic fallback apply as
+  they do for the views.
+
+Progress lives in a BatchScoringRun keyed by the file's sha256. It moves forward
+in the same transaction as the batch's rows, so after a crash re-running the same
+file continues exactly after the last committed batch.
+"""
+
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import ai, dashboard_cache
+from .forms import QuestionnaireForm
+from .jobs import recommendation_fields
+from .models import ActionPlan, BatchScoringRun, Questionnaire, Recommendation
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_GENAI_CONCURRENCY = 8
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_rows(path: str):
+    """Rows of a .csv (with a header line) or .jsonl file as dicts, streamed."""
+
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+            return
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            # Bad lines are still yielded so they count as (skipped) rows and resume offsets stay right.
+            yield row if isinstance(row, dict) else {"__error__": f"line {line_number}: not a JSON object"}
+
+
+def _batches(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class ScoringReport:
+    def __init__(self, source_name: str, resumed_from: int = 0):
+        self.source_name = source_name
+        self.resumed_from = resumed_from
+        self.rows = 0
+        self.scored = 0
+        self.skipped = 0
+        self.sources = Counter()
+        self.duration = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.duration if self.duration else 0.0
+
+    def __str__(self) -> str:
+        sources = ", ".join(f"{name} {count}" for name, count in sorted(self.sources.items())) or "none"
+        resumed = f" (resumed after row {self.resumed_from})" if self.resumed_from else ""
+        return (
+            f"{self.source_name}{resumed}: {self.rows} row(s) in {self.duration:.1f}s "
+            f"({self.rows_per_second:.1f} rows/s), {self.scored} scored, {self.skipped} skipped; "
+            f"sources: {sources}"
+        )
+
+
+def _init_worker(heuristic_only: bool) -> None:
+    import django
+
+    django.setup()
+    if heuristic_only:
+        ai.GENAI_API_KEY = None
+
+
+def _score(answers: dict) -> dict:
+    return ai.generate_career_recommendation(answers)
+
+
+class HeuristicScorer:
+    """Scores batches in a process pool (in this process with one worker); nothing leaves the machine."""
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(True,))
+
+    def score(self, batch: list) -> list:
+        if self._pool is None:
+            api_key, ai.GENAI_API_KEY = ai.GENAI_API_KEY, None
+            try:
+                return [_score(answers) for answers in batch]
+            finally:
+                ai.GENAI_API_KEY = api_key
+        # A few chunks per worker: big enough to amortize the pickling, small enough to balance.
+        chunksize = max(1, len(batch) // (self.workers * 4))
+        return list(self._pool.map(_score, batch, chunksize=chunksize))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+class GenAIScorer:
+    """Scores batches on one event loop with at most `concurrency` GenAI calls in flight."""
+
+    def __init__(self, concurrency: int = DEFAULT_GENAI_CONCURRENCY):
+        self.concurrency = concurrency
+        # One loop for the whole run, so the async client's connections are reused across batches.
+        self._runner = asyncio.Runner()
+
+    async def _score_all(self, batch: list) -> list:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def score(answers):
+            async with semaphore:
+                return await ai.agenerate_career_recommendation(answers)
+
+        return await asyncio.gather(*(score(answers) for answers in batch))
+
+    def score(self, batch: list) -> list:
+        return self._runner.run(self._score_all(batch))
+
+    def close(self) -> None:
+        self._runner.close()
+
+
+class BatchScorer:
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers=None,
+        genai_concurrency: int = DEFAULT_GENAI_CONCURRENCY,
+        heuristic_only: bool = False,
+        default_username=None,
+        create_users: bool = False,
+        restart: bool = False,
+        progress=None,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.default_username = default_username
+        self.create_users = create_users
+        self.restart = restart
+        self.progress = progress
+        if heuristic_only or not ai.GENAI_API_KEY:
+            self.scorer = HeuristicScorer(workers)
+        else:
+            self.scorer = GenAIScorer(genai_concurrency)
+
+    def _users(self, usernames) -> dict:
+        User = get_user_model()
+        users = {user.username: user.pk for user in User.objects.filter(username__in=usernames)}
+        missing = set(usernames) - set(users)
+        if missing and self.create_users:
+            # Accounts for imported students; they set a password through the usual reset flow.
+            password = make_password(None)
+            User.objects.bulk_create([User(username=name, password=password) for name in missing], ignore_conflicts=True)
+            users.update(User.objects.filter(username__in=missing).values_list("username", "pk"))
+        return users
+
+    def _validate(self, rows: list):
+        """(answers, user_id) for valid rows, None for the others."""
+
+        usernames = {(row.get("username") or self.default_username or "").strip() for row in rows}
+        users = self._users(usernames - {""})
+        validated = []
+        for row in rows:
+            form = QuestionnaireForm(row) if "__error__" not in row else None
+            user_id = users.get((row.get("username") or self.default_username or "").strip())
+            if form is None or user_id is None or not form.is_valid():
+                validated.append(None)
+            else:
+                validated.append((form.cleaned_data, user_id))
+        return validated
+
+    def _write(self, run: BatchScoringRun, rows: list, validated: list, results: list, report: ScoringReport) -> None:
+        items = [(result.get("recommendations") or [{}])[0] for result in results]
+        # Plans are committed first, so building the recommendation fields below needs no queries for them.
+        ActionPlan.objects.for_contents(items)
+        valid = [entry for entry in validated if entry is not None]
+        with transaction.atomic():
+            questionnaires = Questionnaire.objects.bulk_create(
+                [Questionnaire(user_id=user_id, **answers) for answers, user_id in valid]
+            )
+            Recommendation.objects.bulk_create(
+                [
+                    Recommendation(questionnaire=questionnaire, user_id=questionnaire.user_id, **recommendation_fields(item))
+                    for questionnaire, item in zip(questionnaires, items)
+                ]
+            )
+            BatchScoringRun.objects.filter(pk=run.pk).update(
+                rows_done=run.rows_done + len(rows),
+                rows_skipped=run.rows_skipped + len(rows) - len(valid),
+                questionnaires_created=run.questionnaires_created + len(valid),
+            )
+        run.rows_done += len(rows)
+        run.rows_skipped += len(rows) - len(valid)
+        run.questionnaires_created += len(valid)
+        dashboard_cache.bump_generations(user_id for _, user_id in valid)
+
+        report.rows += len(rows)
+        report.scored += len(valid)
+        report.skipped += len(rows) - len(valid)
+        report.sources.update(item.get("generation_source", "unknown") for item in items)
+
+    def run(self) -> ScoringReport:
+        source_hash = file_digest(self.path)
+        if self.restart:
+            BatchScoringRun.objects.filter(source_hash=source_hash).delete()
+        run, _ = BatchScoringRun.objects.get_or_create(
+            source_hash=source_hash, defaults={"source_name": os.path.basename(self.path)[:255]}
+        )
+        report = ScoringReport(run.source_name, resumed_from=run.rows_done)
+        started = time.monotonic()
+        try:
+            rows = islice(read_rows(self.path), run.rows_done, None)
+            for batch in _batches(rows, self.batch_size):
+                validated = self._validate(batch)
+                results = self.scorer.score([entry[0] for entry in validated if entry is not None])
+                self._write(run, batch, validated, results, report)
+                report.duration = time.monotonic() - started
+                if self.progress:
+                    self.progress(report)
+        finally:
+            self.scorer.close()
+            report.duration = time.monotonic() - started
+        run.finished_at = timezone.now()
+        run.save(update_fields=["finished_at", "updated_at"])
+        return report
@@ -0,0 +1,162 @@
+"""
+Circuit breaker for the GenAI API.
+
+Closed: calls go through and their outcome/latency is recorded in a sliding window.
+Open: the error rate or p95 latency over the window crossed its threshold, so calls
+are refused immediately (callers fall back to the heuristic) until the cooldown ends.
+Half-open: one probe call at a time is let through; success closes the breaker,
+failure opens it again. A probe that ends without either (a 429, or a call that was
+throttled or skipped before reaching the API) must release() its slot.
+"""
+
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the breaker is open."""
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class CircuitBreaker:
+    """Per-process breaker. Thread-safe."""
+
+    def __init__(
+        self,
+        window: float = 60.0,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        cooldown: float = 30.0,
+        probe_timeout: float = 35.0,
+    ):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown = cooldown
+        # A probe that never reports back (e.g. the worker died) frees its slot after this long.
+        self.probe_timeout = probe_timeout
+
+        self._lock = threading.Lock()
+        self._calls = deque()  # (timestamp, ok, latency)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        self.rejected = 0
+        self.opened = 0
+
+    def _trim(self, now: float) -> None:
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probe_started_at = None
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _admit(self) -> tuple:
+        """(allowed, probe): probe is True for the one call let through while half-open."""
+
+        now = time.monotonic()
+        with self._lock:
+            state = self._current_state(now)
+            if state == CLOSED:
+                return True, False
+            if state == HALF_OPEN and (
+                self._probe_started_at is None or now - self._probe_started_at >= self.probe_timeout
+            ):
+                self._probe_started_at = now
+                return True, True
+            self.rejected += 1
+            return False, False
+
+    def allow(self) -> bool:
+        """Whether a call may go to the network now. Counts the call as a probe when half-open."""
+
+        return self._admit()[0]
+
+    def check(self) -> bool:
+        """Raises CircuitOpenError if the call is not allowed; returns True if the call is the probe."""
+
+        allowed, probe = self._admit()
+        if not allowed:
+            raise CircuitOpenError("GenAI circuit breaker is open")
+        return probe
+
+    def release(self) -> None:
+        """Frees the probe slot after a probe that ended without a verdict; a no-op otherwise."""
+
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_started_at = None
+
+    def record(self, ok: bool, latency: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            state = self._current_state(now)
+            if state == HALF_OPEN:
+                self._probe_started_at = None
+                if ok and latency < self.slow_call_seconds:
+                    self._state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._calls.append((now, ok, latency))
+            self._trim(now)
+            if state == CLOSED and len(self._calls) >= self.min_calls:
+                errors = sum(1 for _, call_ok, _ in self._calls if not call_ok)
+                p95 = _percentile([latency for _, _, latency in self._calls], 0.95)
+                if errors / len(self._calls) >= self.error_rate_threshold or p95 >= self.slow_call_seconds:
+                    self._open(now)
+
+    def _open(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_started_at = None
+        self.opened += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._calls.clear()
+            self._probe_started_at = None
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            state = self._current_state(now)
+            self._trim(now)
+            latencies = [latency for _, _, latency in self._calls]
+            errors = sum(1 for _, ok, _ in self._calls if not ok)
+            return {
+                "state": state,
+                "window_calls": len(self._calls),
+                "error_rate": (errors / len(self._calls)) if self._calls else 0.0,
+                "latency_p50": _percentile(latencies, 0.50),
+                "latency_p95": _percentile(latencies, 0.95),
+                "latency_p99": _percentile(latencies, 0.99),
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "retry_in": max(0.0, self.cooldown - (now - self._opened_at)) if state == OPEN else 0.0,
+            }
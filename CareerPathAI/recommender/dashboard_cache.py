@@ -0,0 +1,157 @@
+"""
+Per-user cache of the rendered dashboard fragments.
+
+Each user has a generation number in the cache. Fragment keys include it, so
+anything that changes what the dashboard shows (a new questionnaire, a finished
+job, delete/restore/rate, the recycle bin purge) just bumps the generation; old
+fragments are never read again and expire on their own.
+
+The generation and fragments live in the DASHBOARD_CACHE_ALIAS cache. Bumps come
+from other processes too (the job worker, the purge, other web workers), so it must
+be a backend they all share (Redis, memcached, files on a single host). It must not
+be a database cache in the app's own database either: every miss would write there,
+taking SQLite's write lock on a plain GET. The cache stays off on such backends.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import router
+
+from .db_router import PRIMARY_DB
+
+PER_PROCESS_BACKENDS = frozenset({"django.core.cache.backends.locmem.LocMemCache"})
+# What settings.py configures when no shared cache is set up: the dashboard is just not cached.
+NO_CACHE_BACKEND = "django.core.cache.backends.dummy.DummyCache"
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += n
+
+
+def dashboard_cache_stats() -> dict:
+    """Counters for this process: fragment hits/misses and generation bumps."""
+
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def _cache():
+    return caches[settings.DASHBOARD_CACHE_ALIAS]
+
+
+def _backend() -> str:
+    return settings.CACHES[settings.DASHBOARD_CACHE_ALIAS]["BACKEND"]
+
+
+def is_shared() -> bool:
+    """Whether every process sees the same DASHBOARD_CACHE_ALIAS cache."""
+
+    return _backend() not in PER_PROCESS_BACKENDS and _backend() != NO_CACHE_BACKEND
+
+
+def uses_app_database() -> bool:
+    """Whether DASHBOARD_CACHE_ALIAS is a database cache stored in the app's primary database."""
+
+    cache = _cache()
+    if not isinstance(cache, DatabaseCache):
+        return False
+    databases = settings.DATABASES
+    alias = router.db_for_write(cache.cache_model_class)
+    return alias == PRIMARY_DB or str(databases[alias]["NAME"]) == str(databases[PRIMARY_DB]["NAME"])
+
+
+def enabled() -> bool:
+    return settings.DASHBOARD_CACHE_ENABLED and is_shared() and not uses_app_database()
+
+
+def check_shared_backend(app_configs, **kwargs):
+    if not settings.DASHBOARD_CACHE_ENABLED:
+        return []
+    hint = "Point DASHBOARD_CACHE_ALIAS at a shared cache, or set DASHBOARD_CACHE_ENABLED=False."
+    if _backend() in PER_PROCESS_BACKENDS:
+        return [
+            checks.Warning(
+                f"The dashboard cache is off: the {settings.DASHBOARD_CACHE_ALIAS!r} cache is per process, "
+                "so changes made by other processes would not invalidate it.",
+                hint=hint,
+                id="recommender.W001",
+            )
+        ]
+    if uses_app_database():
+        return [
+            checks.Warning(
+                f"The dashboard cache is off: the {settings.DASHBOARD_CACHE_ALIAS!r} cache is stored in the app's "
+                "database, so loading the dashboard would write to it.",
+                hint=hint,
+                id="recommender.W002",
+            )
+        ]
+    return []
+
+
+def _generation_key(user_id) -> str:
+    return f"dashboard:generation:{user_id}"
+
+
+def _fresh_generation() -> int:
+    # Time-based, so a generation lost to eviction is never reused by accident.
+    return time.time_ns()
+
+
+def get_generation(user_id) -> int:
+    cache = _cache()
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _fresh_generation(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(user_id) -> None:
+    """Invalidates every cached dashboard fragment of the user."""
+
+    if not enabled() or user_id is None:
+        return
+    # A new value rather than incr(): incr is a read and a write on some backends (files),
+    # so two concurrent bumps could land on the same number. Any new value retires the old fragments.
+    _cache().set(_generation_key(user_id), _fresh_generation(), timeout=None)
+    _count("invalidations")
+
+
+def bump_generations(user_ids) -> None:
+    for user_id in set(user_ids):
+        bump_generation(user_id)
+
+
+def fragment_key(user_id, generation, name: str, *parts) -> str:
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()[:24]
+    return f"dashboard:{user_id}:{generation}:{name}:{digest}"
+
+
+def get_fragments(keys: dict) -> dict:
+    """Cached HTML for {name: key}; names without a cached fragment are left out."""
+
+    found = _cache().get_many(list(keys.values()))
+    fragments = {name: found[key] for name, key in keys.items() if key in found}
+    _count("hits", len(fragments))
+    _count("misses", len(keys) - len(fragments))
+    return fragments
+
+
+def set_fragment(key: str, html: str, timeout=None) -> None:
+    ttl = settings.DASHBOARD_CACHE_TTL
+    _cache().set(key, html, timeout=ttl if timeout is None else min(timeout, ttl))
@@ -0,0 +1,165 @@
+"""
+Primary/replica routing.
+
+Writes always go to the primary ("default"). Reads go to a replica from
+DATABASE_REPLICAS only inside a replica scope: the @replica_reads views
+(dashboard, recommendation detail) and the admin change lists. Everything else,
+including the session and user lookups done before the view runs, reads from the
+primary.
+
+Replicas lag behind the primary, so a user must not be sent to one right after a
+write, or their own change would seem to be missing. Any write during a request
+(anything routed through db_for_write, the session and login included) sets a
+cookie pinning that browser to the primary for REPLICA_STICKY_SECONDS. The rest
+of that request also reads from the primary.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PRIMARY_DB = "default"
+PIN_COOKIE = "primary_pin"
+
+
+class RoutingState:
+    def __init__(self, pinned: bool = False):
+        self.pinned = pinned
+        self.replica_ok = False
+        self.wrote = False
+
+
+_state: ContextVar = ContextVar("db_routing_state", default=None)
+
+
+def reads_from_replica() -> bool:
+    """True when reads made now would be served by a replica."""
+
+    state = _state.get()
+    return bool(
+        settings.DATABASE_REPLICAS and state is not None and state.replica_ok and not (state.pinned or state.wrote)
+    )
+
+
+@contextmanager
+def replica_scope():
+    """Lets the reads in the block go to a replica (unless pinned to the primary)."""
+
+    state = _state.get()
+    token = None
+    if state is None:
+        # Outside a request (tests, shell): a scope of its own, nothing is pinned.
+        state = RoutingState()
+        token = _state.set(state)
+    previous, state.replica_ok = state.replica_ok, True
+    try:
+        yield state
+    finally:
+        state.replica_ok = previous
+        if token is not None:
+            _state.reset(token)
+
+
+def replica_reads(view):
+    """View decorator: the view's own reads may be served by a replica."""
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def _wrapped(request, *args, **kwargs):
+            with replica_scope():
+                return await view(request, *args, **kwargs)
+
+    else:
+
+        @wraps(view)
+        def _wrapped(request, *args, **kwargs):
+            with replica_scope():
+                return view(request, *args, **kwargs)
+
+    return _wrapped
+
+
+# app_label of the model behind Django's database cache backend.
+CACHE_APP_LABEL = "django_cache"
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Cache entries (e.g. the dashboard's generation counters) must never be read stale.
+        if reads_from_replica() and model._meta.app_label != CACHE_APP_LABEL:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return PRIMARY_DB
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        # Filling a cache changes nothing the user could miss on a replica, so it doesn't pin.
+        if state is not None and model._meta.app_label != CACHE_APP_LABEL:
+            state.wrote = True
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY_DB, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary through replication.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Tracks the routing state of each request and pins the browser to the primary
+    after a write. Put it first in MIDDLEWARE so session writes are seen too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _pinned(self, request) -> bool:
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _finish(self, response, state: RoutingState):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            sticky = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, f"{time.time() + sticky:.3f}", max_age=sticky, httponly=True, samesite="Lax"
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(pinned=self._pinned(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(response, state)
+
+    async def __acall__(self, request):
+        state = RoutingState(pinned=self._pinned(request))
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(response, state)
@@ -0,0 +1,94 @@
+"""
+SQLite tuning.
+
+Django opens SQLite with its defaults: rollback journal, synchronous=FULL and a
+Python-level busy timeout. Under concurrent questionnaire submissions writers
+then block every reader and fail with "database is locked". When SQLITE_TUNING
+is on:
+
+- `migrate` switches the database file to SQLITE_JOURNAL_MODE (WAL) once: readers
+  no longer wait for the writer (and vice versa). The mode is stored in the file,
+  so connections don't set it again, and commands other than `migrate` never
+  rewrite the file (the bundled dev database stays as committed until migrated).
+
+and the connection_created hook below runs the SQLITE_PRAGMAS on every new
+connection:
+
+- synchronous=NORMAL: safe with WAL. Commits skip the fsync, so the last
+  transactions can be lost on power failure but the file is never corrupted.
+- busy_timeout: how long (ms) a writer waits for the lock before giving up.
+- mmap_size / cache_size: read pages through a memory map and keep a larger page cache.
+- temp_store=MEMORY: sorts and temporary indexes stay off disk.
+
+settings.py also makes write transactions BEGIN IMMEDIATE (so they wait on
+busy_timeout instead of failing when a read lock can't be upgraded) and keeps
+connections open for DB_CONN_MAX_AGE seconds, so the pragmas and connection setup
+are paid once per connection rather than once per request.
+"""
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+# Only these names are accepted from settings; values are validated before they reach SQL.
+PRAGMA_CHOICES = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+}
+INTEGER_PRAGMAS = {"busy_timeout", "mmap_size", "cache_size"}
+
+
+def _check_name(name: str) -> str:
+    if name not in INTEGER_PRAGMAS and name not in PRAGMA_CHOICES:
+        raise ValueError(f"Unsupported SQLite pragma: {name}")
+    return name
+
+
+def _pragma_statement(name: str, value) -> str:
+    if _check_name(name) in INTEGER_PRAGMAS:
+        return f"PRAGMA {name} = {int(value)}"
+    choices = PRAGMA_CHOICES[name]
+    value = str(value).upper()
+    if value not in choices:
+        raise ValueError(f"Unsupported value for PRAGMA {name}: {value}")
+    return f"PRAGMA {name} = {value}"
+
+
+def apply_sqlite_pragmas(connection, pragmas=None) -> None:
+    """Runs `pragmas` (default: settings.SQLITE_PRAGMAS) on a SQLite connection wrapper."""
+
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(_pragma_statement(name, value))
+
+
+def set_journal_mode(connection, mode=None) -> str:
+    """Switches the database file to `mode` (default: SQLITE_JOURNAL_MODE); returns the mode now in effect."""
+
+    mode = settings.SQLITE_JOURNAL_MODE if mode is None else mode
+    with connection.cursor() as cursor:
+        cursor.execute(_pragma_statement("journal_mode", mode))
+        return cursor.fetchone()[0]
+
+
+def sqlite_pragma_values(connection, names=None) -> dict:
+    """Current value of each pragma on the connection (what actually took effect)."""
+
+    names = ["journal_mode", *settings.SQLITE_PRAGMAS] if names is None else names
+    values = {}
+    with connection.cursor() as cursor:
+        for name in names:
+            cursor.execute(f"PRAGMA {_check_name(name)}")
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    if connection.vendor == "sqlite" and settings.SQLITE_TUNING:
+        apply_sqlite_pragmas(connection)
+
+
+def install() -> None:
+    connection_created.connect(_on_connection_created, dispatch_uid="recommender.db_tuning")
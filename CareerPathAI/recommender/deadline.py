@@ -0,0 +1,68 @@
+"""
+Per-request latency budget.
+
+A Deadline is created when a request starts and handed down the call chain. Code
+that waits (HTTP timeouts, retry sleeps, quota waits, single-flight waits) asks it
+how long it may still take, and each pipeline stage records its elapsed time so the
+breakdown can be attached to the response (Server-Timing) for later analysis.
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class Deadline:
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget
+        self.stages = {}
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, limit: float, reserve: float = 0.0) -> float:
+        """limit, capped to what is left of the budget after keeping `reserve` seconds back."""
+
+        return max(0.0, min(limit, self.remaining() - reserve))
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.monotonic() - started)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def server_timing(self) -> str:
+        """Stage timings formatted for the Server-Timing response header."""
+
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def timeout_for(deadline, limit: float, reserve: float = 0.0) -> float:
+    """Like Deadline.timeout, but also accepts deadline=None (no budget)."""
+
+    if deadline is None:
+        return limit
+    return deadline.timeout(limit, reserve)
+
+
+@contextmanager
+def stage(deadline, name: str):
+    """Deadline.stage that is a no-op when there is no deadline."""
+
+    if deadline is None:
+        yield
+    else:
+        with deadline.stage(name):
+            yield
@@ -0,0 +1,140 @@
+"""
+A tiny local stand-in for the Gemini generateContent endpoint.
+
+Used to exercise and benchmark the GenAI client offline, e.g.:
+
+    python manage.py genai_stub --port 8765 --latency 0.2
+    GENAI_BASE_URL=http://127.0.0.1:8765 GENAI_API_KEY=stub python manage.py runserver
+
+It can also misbehave like the real API does under load. A fraction of requests
+can answer 500, 429 (with Retry-After) or a 200 whose text isn't the JSON that
+was asked for, and latency can be jittered.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_RECOMMENDATIONS = {
+    "recommendations": [
+        {
+            "career": "Data Scientist",
+            "score": 9,
+            "reason": "Stubbed response.",
+            "benefits": "Stubbed benefits.",
+            "opportunities": "Stubbed opportunities.",
+            "sub_careers": ["Data Analyst"],
+        }
+    ]
+}
+
+
+class GenAIStubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive between calls.
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms per kept-alive call.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        server = self.server
+        outcome, latency = server.next_outcome()
+        if latency:
+            time.sleep(latency)
+
+        headers = {}
+        if outcome == "error":
+            status, body = 500, json.dumps({"error": {"code": 500, "message": "Stubbed internal error."}})
+        elif outcome == "rate_limited":
+            status, body = 429, json.dumps({"error": {"code": 429, "message": "Stubbed quota exceeded."}})
+            headers["Retry-After"] = f"{server.retry_after:g}"
+        else:
+            text = json.dumps(STUB_RECOMMENDATIONS) if outcome == "ok" else "Sure! Here are some careers: {recommendations: ["
+            status, body = 200, json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]})
+
+        body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        server.count(outcome)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GenAIStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed=None,
+    ):
+        super().__init__(address, GenAIStubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.outcomes = {"ok": 0, "error": 0, "rate_limited": 0, "malformed": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next_outcome(self):
+        """(outcome, latency) for the next request: ok, error, rate_limited or malformed."""
+
+        with self._lock:
+            roll = self._random.random()
+            latency = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        for outcome, rate in (
+            ("error", self.error_rate),
+            ("rate_limited", self.rate_limit_rate),
+            ("malformed", self.malformed_rate),
+        ):
+            if roll < rate:
+                # 429s come back straight away, like a quota check would.
+                return outcome, 0.0 if outcome == "rate_limited" else latency
+            roll -= rate
+        return "ok", latency
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.request_count += 1
+            self.outcomes[outcome] += 1
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def endpoint_for(self, model: str) -> str:
+        return f"{self.base_url}/v1beta/models/{model}:generateContent"
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, **behaviour) -> GenAIStubServer:
+    """
+    Starts the stub on a background thread; call .shutdown() when done.
+    `behaviour` takes the other GenAIStubServer options (jitter, error_rate, ...).
+    """
+
+    server = GenAIStubServer((host, port), latency=latency, **behaviour)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
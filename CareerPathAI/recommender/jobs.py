@@ -0,0 +1,248 @@
+"""
+DB-backed job queue for generating recommendations outside the request cycle.
+
+The questionnaire view stores a pending Recommendation plus a RecommendationJob;
+`python manage.py run_recommendation_worker` claims queued jobs and fills the
+recommendation in. With ASYNC_RECOMMENDATIONS off, jobs run inline instead.
+"""
+
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import dashboard_cache
+from .ai import agenerate_career_recommendation, generate_career_recommendation, heuristic_recommendation
+from .deadline import stage
+from .models import ActionPlan, Recommendation, RecommendationJob
+
+JOB_MAX_ATTEMPTS = 3
+# Running jobs not finished after this long are assumed to belong to a dead worker.
+JOB_STALE_AFTER = timedelta(minutes=5)
+
+PENDING_CAREER_NAME = "Generating recommendation..."
+
+_QUESTIONNAIRE_FIELDS = ("skills", "interests", "strengths", "preferred_work_style", "long_term_goal")
+
+
+def recommendation_fields(item: dict) -> dict:
+    """Maps one generated recommendation onto Recommendation model fields."""
+
+    reason = item.get("reason", "Why not provided.")
+    benefits = item.get("benefits", "Benefits not provided.")
+    opportunities = item.get("opportunities", "Opportunities not provided.")
+    subs = item.get("sub_careers") or item.get("sub_roles") or []
+    if isinstance(subs, (list, tuple)):
+        sub_paths = [str(sub).strip() for sub in subs if str(sub).strip()]
+        sub_text = ", ".join(subs)
+    else:
+        sub_paths = [sub.strip() for sub in str(subs).split(",") if sub.strip()]
+        sub_text = str(subs)
+    explanation_text = (
+        f"Why: {reason}\n"
+        f"Benefits: {benefits}\n"
+        f"Employment opportunities: {opportunities}\n"
+        f"Related sub-paths: {sub_text}"
+    )
+    return {
+        "career_name": item.get("career", "Career"),
+        "score": item.get("score", 7),
+        "explanation": explanation_text,
+        "details": {
+            "why": reason,
+            "benefits": benefits,
+            "opportunities": opportunities,
+            "sub_paths": sub_paths,
+        },
+        "action_plan": ActionPlan.objects.for_content(item),
+        "generation_source": item.get("generation_source", "unknown"),
+        "model_name": item.get("model_name", ""),
+        "prompt_version": item.get("prompt_version", ""),
+    }
+
+
+def enqueue_recommendation(questionnaire) -> RecommendationJob:
+    """Creates a pending Recommendation for the questionnaire and queues its generation."""
+
+    with transaction.atomic():
+        rec = Recommendation.objects.create(
+            questionnaire=questionnaire,
+            user_id=questionnaire.user_id,
+            career_name=PENDING_CAREER_NAME,
+            score=0,
+            explanation="",
+            status=Recommendation.STATUS_PENDING,
+        )
+        job = RecommendationJob.objects.create(recommendation=rec)
+    dashboard_cache.bump_generation(rec.user_id)
+    return job
+
+
+def submit_recommendation(questionnaire, deadline=None) -> RecommendationJob:
+    """
+    Queues generation, running it right away unless ASYNC_RECOMMENDATIONS is on.
+    Inline generation is held to `deadline` (the request's latency budget) if given.
+    """
+
+    with stage(deadline, "job_enqueue"):
+        job = enqueue_recommendation(questionnaire)
+    if not getattr(settings, "ASYNC_RECOMMENDATIONS", False):
+        if _mark_running(job.pk):
+            job = run_job(_load_job(job.pk), deadline)
+    return job
+
+
+async def asubmit_recommendation(questionnaire, deadline=None) -> RecommendationJob:
+    """Async variant of submit_recommendation; inline generation awaits the async GenAI client."""
+
+    with stage(deadline, "job_enqueue"):
+        job = await sync_to_async(enqueue_recommendation)(questionnaire)
+    if not getattr(settings, "ASYNC_RECOMMENDATIONS", False):
+        if await sync_to_async(_mark_running)(job.pk):
+            job = await arun_job(await sync_to_async(_load_job)(job.pk), deadline)
+    return job
+
+
+def _load_job(job_id) -> RecommendationJob:
+    return RecommendationJob.objects.select_related("recommendation__questionnaire").get(pk=job_id)
+
+
+def _mark_running(job_id) -> bool:
+    # Conditional UPDATE so two workers can never claim the same job.
+    return bool(
+        RecommendationJob.objects.filter(pk=job_id, status=RecommendationJob.STATUS_QUEUED).update(
+            status=RecommendationJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+    )
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Requeues jobs whose worker died mid-run. Jobs that have used all their attempts
+    (they may be what kills the worker) are failed instead. Returns the requeued count.
+    """
+
+    stale = RecommendationJob.objects.filter(
+        status=RecommendationJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - JOB_STALE_AFTER,
+    )
+    for job_id in stale.filter(attempts__gte=JOB_MAX_ATTEMPTS).values_list("pk", flat=True):
+        # Conditional UPDATE, like _mark_running, so only one worker fails the job.
+        if RecommendationJob.objects.filter(pk=job_id, status=RecommendationJob.STATUS_RUNNING).update(
+            status=RecommendationJob.STATUS_FAILED
+        ):
+            _finish_job(_load_job(job_id), error=RuntimeError("worker stopped while running the job"))
+    return stale.update(status=RecommendationJob.STATUS_QUEUED)
+
+
+def claim_next_job():
+    """Claims the oldest queued job for this worker, or returns None when idle."""
+
+    candidates = (
+        RecommendationJob.objects.filter(status=RecommendationJob.STATUS_QUEUED)
+        .order_by("created_at")
+        .values_list("pk", flat=True)[:10]
+    )
+    for job_id in list(candidates):
+        if _mark_running(job_id):
+            return _load_job(job_id)
+    return None
+
+
+def _job_answers(job: RecommendationJob) -> dict:
+    questionnaire = job.recommendation.questionnaire
+    return {field: getattr(questionnaire, field) for field in _QUESTIONNAIRE_FIELDS}
+
+
+def _fill_recommendation(rec: Recommendation, result: dict) -> None:
+    items = result.get("recommendations", [])[:1]  # limit to a single feedback per questionnaire
+    for name, value in recommendation_fields(items[0] if items else {}).items():
+        setattr(rec, name, value)
+    rec.status = Recommendation.STATUS_READY
+
+
+def _save_outcome(job: RecommendationJob, rec: Recommendation) -> None:
+    with transaction.atomic():
+        rec.save()
+        job.save(update_fields=["status", "last_error", "finished_at"])
+
+
+def _finish_job(job: RecommendationJob, result=None, error=None) -> RecommendationJob:
+    """
+    Stores a generation result (or error) on the job's recommendation. Once a job
+    has no attempts left it fails, and the user gets the heuristic result instead.
+    """
+
+    rec = job.recommendation
+    filled = None
+    if error is None:
+        _fill_recommendation(rec, result)
+        filled = result
+        job.status = RecommendationJob.STATUS_DONE
+        job.last_error = ""
+    else:
+        job.last_error = f"{type(error).__name__}: {error}"
+        if job.attempts >= JOB_MAX_ATTEMPTS:
+            job.status = RecommendationJob.STATUS_FAILED
+            try:
+                heuristic = heuristic_recommendation(_job_answers(job))
+                _fill_recommendation(rec, heuristic)
+                filled = heuristic
+            except Exception:
+                rec.status = Recommendation.STATUS_FAILED
+        else:
+            job.status = RecommendationJob.STATUS_QUEUED
+
+    job.finished_at = timezone.now()
+    try:
+        _save_outcome(job, rec)
+    except IntegrityError:
+        if filled is None:
+            raise
+        # The purge deleted the cached action plan as an orphan after this process cached it.
+        ActionPlan.objects.clear_cache()
+        _fill_recommendation(rec, filled)
+        _save_outcome(job, rec)
+    dashboard_cache.bump_generation(rec.user_id)
+    return job
+
+
+def run_job(job: RecommendationJob, deadline=None) -> RecommendationJob:
+    """Generates the recommendation for a claimed job and records the outcome."""
+
+    try:
+        result = generate_career_recommendation(_job_answers(job), deadline)
+    except Exception as exc:
+        return _finish_job(job, error=exc)
+    with stage(deadline, "recommendation_insert"):
+        return _finish_job(job, result)
+
+
+async def arun_job(job: RecommendationJob, deadline=None) -> RecommendationJob:
+    """Async variant of run_job. The job must be loaded with its recommendation and questionnaire."""
+
+    try:
+        result = await agenerate_career_recommendation(_job_answers(job), deadline)
+    except Exception as exc:
+        return await sync_to_async(_finish_job)(job, error=exc)
+    with stage(deadline, "recommendation_insert"):
+        return await sync_to_async(_finish_job)(job, result)
+
+
+def process_jobs(max_jobs=None) -> int:
+    """Runs queued jobs until the queue is empty (or max_jobs ran). Returns the count."""
+
+    requeue_stale_jobs()
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
@@ -0,0 +1,10 @@
+"""
+Offline end-to-end load test (`python manage.py loadtest`).
+
+Virtual users run scripted journeys (journeys.py) against the whole Django stack:
+middleware, views, templates and a scratch SQLite database. GenAI calls go to the
+local Gemini stub (recommender.genai_stub), configured with latency, errors, 429s
+and malformed responses. The harness (harness.py) runs each concurrency level in
+turn and reports p50/p95/p99 latency, requests/sec and DB query counts per view.
+Results go to JSON so runs from different commits can be compared.
+"""
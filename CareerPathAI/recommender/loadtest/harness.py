@@ -0,0 +1,217 @@
+"""
+Load test runner.
+
+run() is meant for a fresh process: it starts the GenAI stub, points the settings
+at it and at a scratch database through the environment, and only then sets
+Django up. The management command runs it in a spawned child for that reason.
+"""
+
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from ..genai_stub import start_stub_server
+from . import journeys
+
+
+def _percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class QueryCounter:
+    """connection.execute_wrapper hook counting the queries (and their time) of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class VirtualUser:
+    """One simulated browser: its own test client (cookies, session) and its own DB connection."""
+
+    def __init__(self, username: str):
+        from django.test import Client
+
+        self.username = username
+        self.client = Client()
+        self.samples = []  # (view, seconds, queries, query seconds, ok)
+
+    def _request(self, view: str, method: str, url: str, data=None) -> None:
+        from django.db import connection
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                response = getattr(self.client, method)(url, data or {})
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        self.samples.append((view, time.perf_counter() - started, counter.count, counter.seconds, ok))
+
+    def get(self, view: str, url: str, data=None) -> None:
+        self._request(view, "get", url, data)
+
+    def post(self, view: str, url: str, data=None) -> None:
+        self._request(view, "post", url, data)
+
+    def latest_recommendation_id(self):
+        # Bookkeeping for the next steps, not part of any measured request.
+        from ..models import Recommendation
+
+        return (
+            Recommendation.objects.filter(user__username=self.username, deleted_at__isnull=True)
+            .order_by("-created_at", "-pk")
+            .values_list("pk", flat=True)
+            .first()
+        )
+
+
+def _summarize(samples: list, wall: float) -> dict:
+    views = {}
+    for view in journeys.VIEWS:
+        mine = [sample for sample in samples if sample[0] == view]
+        if not mine:
+            continue
+        latencies = sorted(sample[1] for sample in mine)
+        views[view] = {
+            "requests": len(mine),
+            "errors": sum(1 for sample in mine if not sample[4]),
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "queries_per_request": round(sum(sample[2] for sample in mine) / len(mine), 2),
+            "query_ms_per_request": round(sum(sample[3] for sample in mine) / len(mine) * 1000, 2),
+        }
+    return {
+        "duration_s": round(wall, 3),
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if not sample[4]),
+        "requests_per_second": round(len(samples) / wall, 2) if wall else 0.0,
+        "views": views,
+    }
+
+
+def run_level(concurrency: int, rounds: int, seed: int, prefix: str) -> dict:
+    """Runs `concurrency` virtual users at once, each through one journey of `rounds` questionnaire rounds."""
+
+    from django.db import connections
+
+    users = [VirtualUser(f"{prefix}-{index}") for index in range(concurrency)]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def drive(index, user):
+        try:
+            barrier.wait()
+            journeys.run_journey(user, random.Random(seed * 100003 + index), rounds)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=drive, args=(index, user)) for index, user in enumerate(users)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return {"concurrency": concurrency, **_summarize([sample for user in users for sample in user.samples], wall)}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(config: dict) -> dict:
+    """
+    Runs every concurrency level in config["levels"] and returns the results.
+    config: levels, rounds, seed, stub (GenAIStubServer options), env (extra settings).
+    """
+
+    stub = start_stub_server(**config["stub"])
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as directory:
+        os.environ.update(
+            {
+                "SQLITE_PATH": os.path.join(directory, "loadtest.sqlite3"),
+                "GENAI_BASE_URL": stub.base_url,
+                "GENAI_API_KEY": "stub",
+                "DEBUG": "False",
+                **config.get("env", {}),
+            }
+        )
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "CareerPathAI.settings")
+        import django
+
+        django.setup()
+        from django.core.management import call_command
+        from django.db import connections
+
+        call_command("migrate", verbosity=0)
+        connections.close_all()
+        try:
+            levels = [
+                run_level(concurrency, config["rounds"], config["seed"], prefix=f"c{concurrency}")
+                for concurrency in config["levels"]
+            ]
+        finally:
+            stub.shutdown()
+            stub.server_close()
+            connections.close_all()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "config": config,
+        },
+        "genai_stub": {"requests": stub.request_count, **stub.outcomes},
+        "levels": levels,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    (level, view, metric, baseline, current, change) for every p95 latency that rose,
+    or requests/sec that fell, by more than `threshold` (a fraction) against the baseline.
+    """
+
+    regressions = []
+    baseline_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in current["levels"]:
+        before = baseline_levels.get(level["concurrency"])
+        if before is None:
+            continue
+        old, new = before["requests_per_second"], level["requests_per_second"]
+        if old and (old - new) / old > threshold:
+            regressions.append((level["concurrency"], "*", "requests_per_second", old, new, (new - old) / old))
+        for view, stats in level["views"].items():
+            old_view = before["views"].get(view)
+            if not old_view or not old_view["p95_ms"]:
+                continue
+            old, new = old_view["p95_ms"], stats["p95_ms"]
+            if (new - old) / old > threshold:
+                regressions.append((level["concurrency"], view, "p95_ms", old, new, (new - old) / old))
+    return regressions
@@ -0,0 +1,50 @@
+"""
+Scripted user journeys. Each step is a request labelled with the view it exercises.
+
+A virtual user registers once, then repeatedly fills in the questionnaire and
+goes through what people do with the result: dashboard, detail page, rating it,
+moving it to the recycle bin and restoring it.
+"""
+
+from django.urls import reverse
+
+VIEWS = ("register", "questionnaire", "dashboard", "detail", "rate", "delete", "restore")
+
+# Answers are drawn from this vocabulary so the GenAI response cache sees a realistic mix of repeats.
+VOCABULARY = (
+    "python", "sql", "java", "machine", "learning", "cloud", "data", "analytics", "product", "roadmap",
+    "devops", "marketing", "sales", "strategy", "operations", "project", "design", "ux", "research",
+    "writing", "content", "communication", "team", "people", "leadership", "security", "finance",
+)
+PASSWORD = "load-test-Pa55word"
+
+
+def questionnaire_answers(rnd) -> dict:
+    answers = {
+        field: " ".join(rnd.choice(VOCABULARY) for _ in range(rnd.randint(2, 6)))
+        for field in ("skills", "interests", "strengths", "long_term_goal")
+    }
+    answers["preferred_work_style"] = rnd.choice(["Solo", "Team", "Mixed"])
+    return answers
+
+
+def register(user) -> None:
+    user.post("register", reverse("register"), {"username": user.username, "password1": PASSWORD, "password2": PASSWORD})
+
+
+def questionnaire_round(user, rnd) -> None:
+    user.post("questionnaire", reverse("questionnaire"), questionnaire_answers(rnd))
+    user.get("dashboard", reverse("dashboard"))
+    pk = user.latest_recommendation_id()
+    if pk is None:
+        return
+    user.get("detail", reverse("recommendation_detail", args=[pk]))
+    user.post("rate", reverse("rate_recommendation", args=[pk]), {"rating": rnd.choice(["1", "-1"])})
+    user.post("delete", reverse("delete_recommendation", args=[pk]))
+    user.post("restore", reverse("restore_recommendation", args=[pk]))
+
+
+def run_journey(user, rnd, rounds: int) -> None:
+    register(user)
+    for _ in range(rounds):
+        questionnaire_round(user, rnd)
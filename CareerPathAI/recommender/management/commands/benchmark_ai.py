@@ -0,0 +1,65 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.microbench import BENCHMARKS, find_regressions, run_benchmarks
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, "microbench_baseline.json")
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark the recommender.ai hot functions and compare them against a stored baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--only", choices=BENCHMARKS, action="append", help="Run only these benchmarks.")
+        parser.add_argument("--rounds", type=int, default=5, help="Timed passes over each corpus.")
+        parser.add_argument("--corpus-size", type=int, default=300, help="Generated questionnaire answers.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against.")
+        parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline.")
+        parser.add_argument("--threshold", type=float, default=0.25, help="Relative growth reported as a regression.")
+        parser.add_argument("--output", default="", help="Also write the results to this JSON file.")
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit with an error on regressions.")
+
+    def handle(self, *args, **options):
+        if options["rounds"] < 1:
+            raise CommandError("--rounds must be at least 1.")
+        results = run_benchmarks(options["only"], options["rounds"], options["seed"], options["corpus_size"])
+
+        self.stdout.write(
+            f"{'benchmark':<26}{'inputs':>7}{'best ns':>12}{'median ns':>12}{'p50 ns':>11}{'p95 ns':>12}"
+            f"{'p99 ns':>12}{'peak B avg':>12}{'peak B max':>12}{'blocks':>8}"
+        )
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:<26}{stats['inputs']:>7}{stats['best_ns']:>12,}{stats['median_ns']:>12,}{stats['p50_ns']:>11,}"
+                f"{stats['p95_ns']:>12,}{stats['p99_ns']:>12,}{stats['peak_bytes_mean']:>12,}"
+                f"{stats['peak_bytes_max']:>12,}{stats['retained_blocks']:>8}"
+            )
+
+        if options["output"]:
+            self._write(options["output"], results)
+        baseline_path = options["baseline"]
+        if options["save_baseline"]:
+            self._write(baseline_path, results)
+            self.stdout.write(f"Baseline saved to {baseline_path}")
+            return
+        if not os.path.exists(baseline_path):
+            self.stdout.write(f"No baseline at {baseline_path}; store one with --save-baseline.")
+            return
+
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, options["threshold"])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline_path}."))
+        for name, metric, old, new, change in regressions:
+            self.stdout.write(self.style.WARNING(f"{name} {metric}: {old:,} -> {new:,} ({change:+.0%})"))
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} regression(s).")
+
+    def _write(self, path, results):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
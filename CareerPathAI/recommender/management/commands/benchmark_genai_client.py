@@ -0,0 +1,48 @@
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+
+from recommender.ai import GENAI_MODEL, GenAIClient
+from recommender.genai_stub import start_stub_server
+
+
+class Command(BaseCommand):
+    help = "Compare one-off requests.post calls against the pooled GenAI client using a local stub."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--latency", type=float, default=0.0, help="Stub latency per request in seconds.")
+        parser.add_argument("--url", default="", help="Benchmark an already running stub instead of starting one.")
+
+    def handle(self, *args, **options):
+        count = options["requests"]
+        server = None
+        if options["url"]:
+            endpoint = f"{options['url'].rstrip('/')}/v1beta/models/{GENAI_MODEL}:generateContent"
+        else:
+            server = start_stub_server(latency=options["latency"])
+            endpoint = server.endpoint_for(GENAI_MODEL)
+
+        payload = {"contents": [{"parts": [{"text": "benchmark"}]}]}
+        try:
+            start = time.perf_counter()
+            for _ in range(count):
+                requests.post(endpoint, params={"key": "stub"}, json=payload, timeout=30).raise_for_status()
+            unpooled = time.perf_counter() - start
+
+            client = GenAIClient(api_key="stub", endpoint=endpoint)
+            start = time.perf_counter()
+            for _ in range(count):
+                client.generate("benchmark")
+            pooled = time.perf_counter() - start
+            client.close()
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+        self.stdout.write(f"requests.post: {unpooled / count * 1000:.2f} ms/call ({count} calls)")
+        self.stdout.write(f"GenAIClient:   {pooled / count * 1000:.2f} ms/call ({count} calls)")
+        if pooled:
+            self.stdout.write(f"speedup:       {unpooled / pooled:.2f}x")
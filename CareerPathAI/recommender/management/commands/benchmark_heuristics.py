@@ -0,0 +1,58 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from recommender import ai
+
+# Fixed vocabulary (rule keywords plus noise) so runs stay comparable across commits.
+VOCABULARY = (
+    "python", "sql", "java", "go", "ml", "machine", "ai", "model", "models", "cloud", "engineer", "developer",
+    "data", "analytics", "analyst", "analysis", "product", "pm", "roadmap", "ops", "mlops", "devops", "platform",
+    "marketing", "sales", "business", "strategy", "consulting", "operations", "process", "project", "program",
+    "delivery", "management", "design", "ux", "research", "writing", "content", "communication", "docs",
+    "team", "people", "learning", "hello", "candidate", "solving", "problems", "remote", "growth-minded",
+)
+
+
+def _corpus(size: int, seed: int) -> list:
+    vocabulary = VOCABULARY
+    rnd = random.Random(seed)
+    answers = []
+    for _ in range(size):
+        answer = {
+            field: " ".join(rnd.choice(vocabulary) for _ in range(rnd.randint(0, 8)))
+            for field in ("skills", "interests", "strengths", "long_term_goal")
+        }
+        answer["preferred_work_style"] = rnd.choice(["Solo", "Team", "Mixed"])
+        answers.append(answer)
+    return answers
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark the heuristic (non-GenAI) recommendation path."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=2000, help="Number of generated questionnaires.")
+        parser.add_argument("--rounds", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        corpus = _corpus(options["size"], options["seed"])
+        api_key, ai.GENAI_API_KEY = ai.GENAI_API_KEY, None  # never touch the network here
+        try:
+            timings = []
+            for _ in range(options["rounds"]):
+                start = time.perf_counter()
+                for answer in corpus:
+                    ai.generate_career_recommendation(answer)
+                timings.append((time.perf_counter() - start) / len(corpus))
+        finally:
+            ai.GENAI_API_KEY = api_key
+
+        timings.sort()
+        self.stdout.write(
+            f"generate_career_recommendation (heuristic): "
+            f"best {timings[0] * 1e6:.1f} us/call, median {timings[len(timings) // 2] * 1e6:.1f} us/call "
+            f"over {options['rounds']} x {len(corpus)} calls"
+        )
@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+# Environment for each mode. "default" is Django's stock SQLite setup, "tuned" the
+# recommender.db_tuning pragmas plus BEGIN IMMEDIATE and persistent connections.
+MODES = {
+    "default": {"SQLITE_TUNING": "False"},
+    "tuned": {"SQLITE_TUNING": "True"},
+}
+# Generation stays offline and the dashboard is read from the database on every request.
+COMMON_ENV = {"GENAI_API_KEY": "", "GENAI_CACHE_BACKEND": "none", "DASHBOARD_CACHE_ENABLED": "False"}
+
+ANSWERS = {
+    "skills": "python sql statistics",
+    "interests": "data analytics machine learning",
+    "strengths": "analysis communication",
+    "preferred_work_style": "Mixed",
+    "long_term_goal": "lead a data team",
+}
+
+
+def _setup(env: dict) -> None:
+    os.environ.update(env)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "CareerPathAI.settings")
+    import django
+
+    django.setup()
+
+
+def _prepare(env: dict, users: int, seed_rows: int) -> dict:
+    """Migrates the scratch database, creates one user per worker and seeds their dashboards."""
+
+    _setup(env)
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection
+
+    from recommender.db_tuning import sqlite_pragma_values
+    from recommender.models import Questionnaire, Recommendation
+
+    call_command("migrate", verbosity=0)
+    for index in range(users):
+        user = User.objects.create_user(f"bench-{index}", password="bench")
+        questionnaire = Questionnaire.objects.create(user=user, **ANSWERS)
+        Recommendation.objects.bulk_create(
+            Recommendation(questionnaire=questionnaire, user=user, career_name=f"Career {i}", score=5, explanation="")
+            for i in range(seed_rows)
+        )
+    return sqlite_pragma_values(connection)
+
+
+def _worker(env: dict, role: str, index: int, start_at: float, duration: float) -> dict:
+    _setup(env)
+    from django.contrib.auth.models import User
+    from django.db import OperationalError
+    from django.test import Client
+    from django.urls import reverse
+
+    client = Client()
+    client.force_login(User.objects.get(username=f"bench-{index}"))
+    url = reverse("questionnaire" if role == "writer" else "dashboard")
+
+    latencies, locked, failed = [], 0, 0
+    time.sleep(max(0.0, start_at - time.time()))
+    end = time.time() + duration
+    while time.time() < end:
+        started = time.perf_counter()
+        try:
+            response = client.post(url, ANSWERS) if role == "writer" else client.get(url)
+        except OperationalError as exc:
+            if "locked" not in str(exc):
+                raise
+            locked += 1
+            continue
+        if response.status_code not in (200, 302):
+            failed += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    return {"role": role, "latencies": latencies, "locked": locked, "failed": failed}
+
+
+def _percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer questionnaire submissions and dashboard reads concurrently against a scratch "
+        "SQLite file, with Django's default SQLite settings and with the tuned ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4, help="Processes submitting questionnaires.")
+        parser.add_argument("--readers", type=int, default=4, help="Processes loading the dashboard.")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds each mode runs.")
+        parser.add_argument("--seed-rows", type=int, default=50, help="Recommendations per user before the run.")
+        parser.add_argument("--busy-timeout", type=int, default=None, help="Override SQLITE_BUSY_TIMEOUT (ms).")
+        parser.add_argument("--mode", choices=sorted(MODES), action="append", help="Run only these modes.")
+
+    def handle(self, *args, **options):
+        roles = ["writer"] * options["writers"] + ["reader"] * options["readers"]
+        context = multiprocessing.get_context("spawn")
+        for mode in options["mode"] or list(MODES):
+            with tempfile.TemporaryDirectory(prefix="sqlite-bench-") as directory:
+                env = {**COMMON_ENV, **MODES[mode], "SQLITE_PATH": os.path.join(directory, "bench.sqlite3")}
+                if options["busy_timeout"] is not None:
+                    env["SQLITE_BUSY_TIMEOUT"] = str(options["busy_timeout"])
+                # Spawned processes, so every worker opens its own connections like a real web worker.
+                with context.Pool(len(roles)) as pool:
+                    pragmas = pool.apply(_prepare, (env, len(roles), options["seed_rows"]))
+                    start_at = time.time() + 2.0
+                    results = pool.starmap(
+                        _worker,
+                        [(env, role, index, start_at, options["duration"]) for index, role in enumerate(roles)],
+                    )
+            self._report(mode, pragmas, results, options["duration"])
+
+    def _report(self, mode, pragmas, results, duration):
+        self.stdout.write(f"\n{mode}: " + ", ".join(f"{name}={value}" for name, value in pragmas.items()))
+        for role, label in (("writer", "questionnaire POST"), ("reader", "dashboard GET")):
+            mine = [result for result in results if result["role"] == role]
+            if not mine:
+                continue
+            latencies = sorted(latency for result in mine for latency in result["latencies"])
+            locked = sum(result["locked"] for result in mine)
+            failed = sum(result["failed"] for result in mine)
+            self.stdout.write(
+                f"  {label:<19} {len(latencies) / duration:8.1f} req/s  "
+                f"p50 {_percentile(latencies, 0.50) * 1000:7.1f} ms  "
+                f"p95 {_percentile(latencies, 0.95) * 1000:7.1f} ms  "
+                f"p99 {_percentile(latencies, 0.99) * 1000:7.1f} ms  "
+                f"locked {locked}  other errors {failed}"
+            )
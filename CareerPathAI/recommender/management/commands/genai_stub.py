@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from recommender.genai_stub import GenAIStubServer
+
+
+class Command(BaseCommand):
+    help = "Run a local Gemini stub server for offline testing and benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--latency", type=float, default=0.0, help="Seconds to sleep per request.")
+        parser.add_argument("--jitter", type=float, default=0.0, help="Latency varies by up to +/- this many seconds.")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500.")
+        parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered with 429.")
+        parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction answered with unparseable text.")
+        parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s.")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        server = GenAIStubServer(
+            (options["host"], options["port"]),
+            latency=options["latency"],
+            jitter=options["jitter"],
+            error_rate=options["error_rate"],
+            rate_limit_rate=options["rate_limit_rate"],
+            malformed_rate=options["malformed_rate"],
+            retry_after=options["retry_after"],
+            seed=options["seed"],
+        )
+        self.stdout.write(f"GenAI stub listening on {server.base_url} (latency {options['latency']}s)")
+        self.stdout.write(f"Use: GENAI_BASE_URL={server.base_url} GENAI_API_KEY=stub")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,93 @@
+import json
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.loadtest import harness
+
+
+class Command(BaseCommand):
+    help = (
+        "Offline end-to-end load test: virtual users register, submit questionnaires and use the dashboard "
+        "against a scratch database and the local GenAI stub, at each concurrency level."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Concurrency levels to run.")
+        parser.add_argument("--rounds", type=int, default=5, help="Questionnaire rounds per virtual user.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--latency", type=float, default=0.3, help="GenAI stub latency in seconds.")
+        parser.add_argument("--jitter", type=float, default=0.1, help="GenAI stub latency jitter in seconds.")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of GenAI calls answered with 500.")
+        parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered with 429.")
+        parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction answered with malformed JSON.")
+        parser.add_argument(
+            "--setting", action="append", default=[], metavar="NAME=VALUE",
+            help="Extra environment setting for the app under test (e.g. ASYNC_RECOMMENDATIONS=True).",
+        )
+        parser.add_argument("--output", default="", help="Write the results to this JSON file.")
+        parser.add_argument("--compare", default="", help="Previous results JSON to compare against.")
+        parser.add_argument("--threshold", type=float, default=0.2, help="Relative change reported as a regression.")
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit with an error on regressions.")
+
+    def handle(self, *args, **options):
+        try:
+            env = dict(setting.split("=", 1) for setting in options["setting"])
+        except ValueError:
+            raise CommandError("--setting takes NAME=VALUE.")
+        config = {
+            "levels": options["concurrency"],
+            "rounds": options["rounds"],
+            "seed": options["seed"],
+            "stub": {
+                "latency": options["latency"],
+                "jitter": options["jitter"],
+                "error_rate": options["error_rate"],
+                "rate_limit_rate": options["rate_limit_rate"],
+                "malformed_rate": options["malformed_rate"],
+                "retry_after": 0.2,
+                "seed": options["seed"],
+            },
+            "env": env,
+        }
+        # A fresh process, so the app under test gets its settings (scratch DB, stub URL) from the start.
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            results = pool.apply(harness.run, (config,))
+
+        self._report(results)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as f:
+                baseline = json.load(f)
+            regressions = harness.compare(results, baseline, options["threshold"])
+            commit = baseline.get("meta", {}).get("commit") or options["compare"]
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS(f"No regressions against {commit}."))
+            for level, view, metric, old, new, change in regressions:
+                self.stdout.write(
+                    self.style.WARNING(f"c={level} {view} {metric}: {old} -> {new} ({change:+.0%}) vs {commit}")
+                )
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"{len(regressions)} regression(s).")
+
+    def _report(self, results):
+        stub = results["genai_stub"]
+        self.stdout.write(
+            f"GenAI stub: {stub['requests']} calls ({stub['ok']} ok, {stub['error']} 500, "
+            f"{stub['rate_limited']} 429, {stub['malformed']} malformed)"
+        )
+        for level in results["levels"]:
+            self.stdout.write(
+                f"\nconcurrency {level['concurrency']}: {level['requests']} requests in {level['duration_s']:.1f}s, "
+                f"{level['requests_per_second']:.1f} req/s, {level['errors']} errors"
+            )
+            self.stdout.write(f"  {'view':<14}{'n':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'db ms':>8}")
+            for view, stats in level["views"].items():
+                self.stdout.write(
+                    f"  {view:<14}{stats['requests']:>6}{stats['errors']:>5}{stats['p50_ms']:>10.1f}"
+                    f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['queries_per_request']:>9.1f}"
+                    f"{stats['query_ms_per_request']:>8.1f}"
+                )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recommender.purge import purge_expired_recommendations
+
+
+class Command(BaseCommand):
+    help = "Permanently delete recycle-bin recommendations older than the retention window, then unused action plans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="Retention in days (default: RECYCLE_BIN_RETENTION_DAYS).")
+        parser.add_argument("--batch-size", type=int, default=None, help="Rows deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=None, help="Seconds to sleep between batches.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be purged.")
+
+    def handle(self, *args, **options):
+        result = purge_expired_recommendations(
+            retention_days=options["days"],
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            dry_run=options["dry_run"],
+        )
+        if options["dry_run"]:
+            self.stdout.write(
+                f"{result.purged} recommendation(s) deleted before {result.cutoff:%Y-%m-%d %H:%M} "
+                f"and {result.plans_purged} orphaned action plan(s) would be purged."
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(str(result)))
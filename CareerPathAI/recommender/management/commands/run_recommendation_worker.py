@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recommender.jobs import process_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued recommendation jobs from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when idle.")
+        parser.add_argument("--max-jobs", type=int, default=None, help="Exit after this many jobs.")
+
+    def handle(self, *args, **options):
+        remaining = options["max_jobs"]
+        total = 0
+        try:
+            while True:
+                processed = process_jobs(max_jobs=remaining)
+                total += processed
+                if processed:
+                    self.stdout.write(f"Processed {processed} job(s).")
+                if remaining is not None:
+                    remaining -= processed
+                    if remaining <= 0:
+                        break
+                if options["once"]:
+                    break
+                if not processed:
+                    time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Worker finished; {total} job(s) processed."))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.batch_scoring import DEFAULT_BATCH_SIZE, DEFAULT_GENAI_CONCURRENCY, BatchScorer
+
+
+class Command(BaseCommand):
+    help = (
+        "Score a CSV/JSONL file of questionnaires (one per row, with a `username` column) and store "
+        "the questionnaires and recommendations. Re-running the same file resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input .csv (with header) or .jsonl file.")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows scored and written per transaction.")
+        parser.add_argument("--workers", type=int, default=None, help="Processes for heuristic scoring (default: CPU count).")
+        parser.add_argument(
+            "--genai-concurrency", type=int, default=DEFAULT_GENAI_CONCURRENCY, help="GenAI calls in flight at once."
+        )
+        parser.add_argument("--heuristic-only", action="store_true", help="Never call GenAI, even if configured.")
+        parser.add_argument("--user", default=None, help="Username for rows without one.")
+        parser.add_argument("--create-users", action="store_true", help="Create accounts for unknown usernames.")
+        parser.add_argument("--restart", action="store_true", help="Ignore the saved progress and start from the first row.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        try:
+            scorer = BatchScorer(
+                options["path"],
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                genai_concurrency=options["genai_concurrency"],
+                heuristic_only=options["heuristic_only"],
+                default_username=options["user"],
+                create_users=options["create_users"],
+                restart=options["restart"],
+                progress=self._progress,
+            )
+            report = scorer.run()
+        except OSError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(str(report)))
+
+    def _progress(self, report):
+        self.stdout.write(f"{report.resumed_from + report.rows} rows done, {report.rows_per_second:.1f} rows/s")
@@ -0,0 +1,34 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.replication import ReplicationLagSimulator
+
+
+class Command(BaseCommand):
+    help = "Refresh the SQLite replica files from the primary with a simulated replication lag."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lag", type=float, default=2.0, help="Seconds the replicas trail the primary.")
+        parser.add_argument("--interval", type=float, default=0.5, help="Seconds between snapshots of the primary.")
+        parser.add_argument("--once", action="store_true", help="Copy the primary to the replicas now and exit.")
+
+    def handle(self, *args, **options):
+        databases = settings.DATABASES
+        paths = [databases[alias]["NAME"] for alias in settings.DATABASE_REPLICAS]
+        if not paths:
+            raise CommandError("No replicas configured; set REPLICA_SQLITE_PATHS.")
+        if any(databases[alias]["ENGINE"] != "django.db.backends.sqlite3" for alias in ["default", *settings.DATABASE_REPLICAS]):
+            raise CommandError("The replication simulator only works with SQLite databases.")
+
+        simulator = ReplicationLagSimulator(databases["default"]["NAME"], paths, options["lag"], options["interval"])
+        simulator.sync_now()
+        self.stdout.write(f"Replicas synced from {simulator.primary}.")
+        if options["once"]:
+            return
+        self.stdout.write(f"Replicating with {options['lag']:.1f}s lag; Ctrl-C to stop.")
+        try:
+            simulator.run(threading.Event())
+        except KeyboardInterrupt:
+            pass
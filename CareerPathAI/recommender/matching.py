@@ -0,0 +1,156 @@
+"""
+Keyword and phrase matching for the heuristic recommender.
+
+Answers are split into words (keeping "c++"/"c#" intact), each word is reduced to
+a light stem so "models"/"model" or "designing"/"design" compare equal, and a
+word-level Aho–Corasick automaton finds every keyword and multi-word phrase
+("machine learning") in a single linear pass over all answers. Each match records
+which answer it came from and where, so callers can cite it.
+"""
+
+import re
+from collections import deque, namedtuple
+
+_WORD_RE = re.compile(r"[a-zA-Z]+(?:\+\+|#)?")
+_VOWELS = frozenset("aeiouy")
+
+Match = namedtuple("Match", ["keyword", "field", "start", "end", "text"])
+
+
+def stem(word: str) -> str:
+    """Conservative suffix stripping (plurals, -ing, -ed); applied to keywords and answers alike."""
+
+    word = word.lower()
+    if not word.isalpha() or len(word) <= 3:
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            base = word[: -len(suffix)]
+            # Doubled consonants are kept on purpose: "programming" -> "programm" must not
+            # collide with "program" (coordination), while "planned"/"planning" still agree.
+            return base if _VOWELS.intersection(base) else word
+    return word
+
+
+_STEM_CACHE = {}
+_STEM_CACHE_SIZE = 8192
+
+
+def _cached_stem(word: str) -> str:
+    if len(word) > 40:
+        # Long junk "words" from pasted text are never keywords; don't let them fill the cache.
+        return stem(word)
+    cached = _STEM_CACHE.get(word)
+    if cached is None:
+        if len(_STEM_CACHE) >= _STEM_CACHE_SIZE:
+            _STEM_CACHE.clear()
+        cached = _STEM_CACHE[word] = stem(word)
+    return cached
+
+
+def tokenize(text: str):
+    """Yields (stem, start, end) for every word in text."""
+
+    for m in _WORD_RE.finditer(text or ""):
+        yield _cached_stem(m.group()), m.start(), m.end()
+
+
+class PhraseMatcher:
+    """
+    Word-level Aho–Corasick automaton over stemmed keywords and phrases.
+    Build it once per process and reuse it; matching is linear in the input size.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        self._lengths = []
+        self._max_length = 1
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for keyword_id, keyword in enumerate(self.keywords):
+            symbols = [symbol for symbol, _, _ in tokenize(keyword)]
+            self._lengths.append(len(symbols))
+            self._max_length = max(self._max_length, len(symbols))
+            if not symbols:
+                continue
+            node = 0
+            for symbol in symbols:
+                child = self._goto[node].get(symbol)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][symbol] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                node = child
+            self._output[node] += (keyword_id,)
+
+        # Breadth-first pass to wire failure links and merge outputs of suffixes.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for symbol, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and symbol not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(symbol, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] += self._output[self._fail[child]]
+                queue.append(child)
+
+    def _scan(self, fields: dict, first_only: bool):
+        """Yields (field_index, start, end, keyword_id) tuples."""
+
+        goto, fail, output, lengths = self._goto, self._fail, self._output, self._lengths
+        seen = set()
+        for field_index, text in enumerate(fields.values()):
+            node = 0
+            # Only the last few word starts are needed to locate a phrase's start.
+            starts = deque(maxlen=self._max_length)
+            for m in _WORD_RE.finditer(text or ""):
+                symbol = _cached_stem(m.group())
+                starts.append(m.start())
+                while node and symbol not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(symbol, 0)
+                for keyword_id in output[node]:
+                    if first_only:
+                        if keyword_id in seen:
+                            continue
+                        seen.add(keyword_id)
+                    yield field_index, starts[-lengths[keyword_id]], m.end(), keyword_id
+
+    def _match(self, fields: dict, names: list, hit) -> Match:
+        field_index, start, end, keyword_id = hit
+        field = names[field_index]
+        return Match(self.keywords[keyword_id], field, start, end, fields[field][start:end])
+
+    def iter_matches(self, fields: dict):
+        """Yields a Match for every keyword occurrence, field by field (phrases never span fields)."""
+
+        names = list(fields)
+        for hit in self._scan(fields, first_only=False):
+            yield self._match(fields, names, hit)
+
+    def first_matches(self, fields: dict) -> dict:
+        """
+        Maps each keyword found to its first occurrence, ordered by where it occurs
+        (field order, then position, longer phrases first).
+        """
+
+        names = list(fields)
+        # Sorting (field, start, -end) puts the longest phrase first among matches starting together.
+        hits = sorted(
+            (field_index, start, -end, keyword_id)
+            for field_index, start, end, keyword_id in self._scan(fields, first_only=True)
+        )
+        matches = {}
+        for field_index, start, neg_end, keyword_id in hits:
+            matches[self.keywords[keyword_id]] = self._match(fields, names, (field_index, start, -neg_end, keyword_id))
+        return matches
@@ -0,0 +1,344 @@
+"""
+Prometheus metrics, served at /metrics in the text exposition format.
+
+Each process keeps its metrics in memory and writes them to a JSON file of its
+own in METRICS_DIR at most every METRICS_FLUSH_INTERVAL seconds (and on exit).
+A scrape merges the files of all processes, so whichever worker answers reports
+for the whole deployment, without a push gateway or any other service. A scrape
+can therefore lag the other workers by up to one flush interval.
+
+Files of processes that have exited are kept, since their counts are still part
+of the totals; clear METRICS_DIR when deploying. Without METRICS_DIR each process
+only reports itself.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+GENAI_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+# Any other request method is labelled "other", so clients can't create new series at will.
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT"})
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics = {}  # name -> metric, in registration order
+_values = {}  # name -> {label values: [floats]}; histograms keep per-bucket counts, then the sum
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_owner_pid = None
+_file_name = None
+_last_flush = 0.0
+
+
+def _reset_if_forked() -> None:
+    # A forked child starts with a copy of its parent's values; they are the parent's to report.
+    global _owner_pid, _file_name, _last_flush
+    if _owner_pid != os.getpid():
+        _values.clear()
+        _owner_pid = os.getpid()
+        _file_name = None
+        _last_flush = time.monotonic()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _metrics[name] = self
+
+    @property
+    def size(self) -> int:
+        return 1
+
+    def _add(self, labels: dict, index: int, amount: float, total: float = None) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with _lock:
+            _reset_if_forked()
+            series = _values.setdefault(self.name, {})
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0.0] * self.size
+            values[index] += amount
+            if total is not None:
+                values[-1] += total
+        _maybe_flush()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        self._add(labels, 0, amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets)
+
+    @property
+    def size(self) -> int:
+        return len(self.buckets) + 2  # one count per bucket, +Inf, then the sum
+
+    def observe(self, value: float, **labels) -> None:
+        self._add(labels, bisect_left(self.buckets, value), 1.0, total=value)
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time spent serving a request, by view.", ("view", "method", "status")
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries made while serving a request.", ("view",), QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in database queries while serving a request.", ("view",)
+)
+GENAI_CALL_DURATION = Histogram(
+    "genai_call_duration_seconds",
+    "GenAI calls by outcome: success, timeout, http_error, json_error, empty, throttled or circuit_open.",
+    ("outcome",),
+    GENAI_LATENCY_BUCKETS,
+)
+RECOMMENDATIONS_GENERATED = Counter(
+    "recommendations_generated_total", "Recommendation sets generated, by generation_source.", ("source",)
+)
+
+
+def observe_genai_call(outcome: str, seconds: float) -> None:
+    GENAI_CALL_DURATION.observe(seconds, outcome=outcome)
+
+
+def count_recommendation(result: dict) -> None:
+    recommendations = result.get("recommendations") or [{}]
+    RECOMMENDATIONS_GENERATED.inc(source=recommendations[0].get("generation_source", "unknown"))
+
+
+def _snapshot() -> dict:
+    with _lock:
+        _reset_if_forked()
+        return {name: [[list(key), list(values)] for key, values in series.items()] for name, series in _values.items()}
+
+
+def flush(force: bool = False) -> None:
+    """Writes this process's values to METRICS_DIR (no-op without one)."""
+
+    global _file_name, _last_flush
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    if not _flush_lock.acquire(blocking=force):
+        return  # another thread is writing the same file right now
+    try:
+        snapshot = _snapshot()
+        if _file_name is None:
+            # pid plus a random suffix: a recycled pid must not overwrite a dead process's totals.
+            _file_name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, _file_name)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(f"{path}.tmp", path)
+        _last_flush = time.monotonic()
+    finally:
+        _flush_lock.release()
+
+
+def _maybe_flush() -> None:
+    if settings.METRICS_DIR and time.monotonic() - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        flush()
+
+
+def _merge(into: dict, snapshot: dict) -> None:
+    for name, series in snapshot.items():
+        metric = _metrics.get(name)
+        if metric is None:
+            continue
+        merged = into.setdefault(name, {})
+        for key, values in series:
+            if len(key) != len(metric.labelnames) or len(values) != metric.size:
+                continue  # written by a version with a different definition
+            key = tuple(key)
+            if key in merged:
+                merged[key] = [a + b for a, b in zip(merged[key], values)]
+            else:
+                merged[key] = list(values)
+
+
+def collect() -> dict:
+    """name -> {label values: values}, summed over every process that wrote to METRICS_DIR."""
+
+    merged = {}
+    if not settings.METRICS_DIR:
+        _merge(merged, _snapshot())
+        return merged
+    flush(force=True)
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, "*.json")):
+        try:
+            with open(path) as f:
+                _merge(merged, json.load(f))
+        except (OSError, ValueError):
+            continue
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(merged: dict = None) -> str:
+    """The text exposition format for the merged values of every metric."""
+
+    merged = collect() if merged is None else merged
+    lines = []
+    for name, metric in _metrics.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, values in sorted(merged.get(name, {}).items()):
+            if metric.kind == "counter":
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {_number(values[0])}")
+                continue
+            cumulative = 0.0
+            names = metric.labelnames + ("le",)
+            for bound, count in zip(metric.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(names, key + (le,))} {_number(cumulative)}")
+            lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {_number(values[-1])}")
+            lines.append(f"{name}_count{_labels(metric.labelnames, key)} {_number(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Forgets this process's values (tests)."""
+
+    with _lock:
+        _values.clear()
+
+
+class QueryTally:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_tally: ContextVar = ContextVar("metrics_query_tally", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    tally = _tally.get()
+    if tally is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        tally.count += 1
+        tally.seconds += time.perf_counter() - started
+
+
+@contextmanager
+def uncounted():
+    """Queries run inside aren't counted for the current request (diagnostics such as profiling's EXPLAINs)."""
+
+    token = _tally.set(None)
+    try:
+        yield
+    finally:
+        _tally.reset(token)
+
+
+def _on_connection_created(sender, connection, **kwargs) -> None:
+    # The signal fires again whenever a wrapper reconnects; its wrappers list outlives the connection.
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def install() -> None:
+    if settings.METRICS_ENABLED:
+        connection_created.connect(_on_connection_created, dispatch_uid="recommender.metrics")
+        atexit.register(flush, force=True)
+
+
+class MetricsMiddleware:
+    """
+    Times each request and counts its queries, by view (the URL pattern's name).
+    Put it first in MIDDLEWARE so the time spent in the other middleware counts too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _record(self, request, response, tally: QueryTally, started: float) -> None:
+        match = request.resolver_match
+        view = match.view_name if match is not None else "<unresolved>"
+        status = response.status_code if response is not None else 500
+        method = request.method if request.method in HTTP_METHODS else "other"
+        REQUEST_DURATION.observe(time.perf_counter() - started, view=view, method=method, status=status)
+        REQUEST_DB_QUERIES.observe(tally.count, view=view)
+        REQUEST_DB_SECONDS.observe(tally.seconds, view=view)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        tally = QueryTally()
+        token = _tally.set(tally)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            _tally.reset(token)
+            self._record(request, response, tally, started)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        tally = QueryTally()
+        token = _tally.set(tally)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            _tally.reset(token)
+            self._record(request, response, tally, started)
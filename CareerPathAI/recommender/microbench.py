@@ -0,0 +1,300 @@
+"""
+Micro-benchmarks for the recommender's hot functions (`python manage.py benchmark_ai`).
+
+Every benchmark runs a function over a fixed, seeded corpus. The corpus mixes
+realistic questionnaire answers with adversarial ones: 100KB pastes, unicode
+(CJK, RTL, emoji, combining marks, zero-width characters), empty and missing
+fields, and answers that hit every rule. It reports:
+
+- ns/op: best and median over several rounds of the whole corpus;
+- p50/p95/p99: one call at a time, so slow outliers (the big pastes) show up;
+- allocations: peak bytes traced by tracemalloc during a call, averaged and at
+  worst, plus the number of tracemalloc-tracked blocks still alive after the
+  corpus. A steady climb there means something is caching or leaking.
+
+Results can be saved as a baseline. Later runs flag any benchmark whose median
+time or average peak allocation grew more than the threshold. Timings depend on
+the machine, so compare baselines taken on the same one.
+"""
+
+import gc
+import json
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from . import ai
+
+BENCHMARKS = (
+    "generate_heuristic",
+    "generate_stubbed_llm",
+    "default_action_plan_for",
+    "normalize_resources",
+    "ensure_list",
+    "parse_explanation",
+)
+
+_WORDS = (
+    "python", "sql", "java", "go", "ml", "machine", "learning", "ai", "model", "cloud", "engineer", "developer",
+    "data", "analytics", "analyst", "product", "roadmap", "devops", "platform", "marketing", "sales", "strategy",
+    "consulting", "operations", "project", "program", "design", "ux", "research", "writing", "content", "team",
+    "people", "security", "finance", "teaching", "healthcare", "remote", "growth-minded", "problem-solving",
+)
+_UNICODE = (
+    "データ分析", "機械学習エンジニア", "تحليل البيانات", "מהנדס תוכנה", "аналитик данных", "\U0001f680\U0001f916\U0001f4ca",
+    "e\u0301le\u0300ve", "zero\u200bwidth\u200djoiner", "\ufb01nance \ufb02ow", "\uff30\uff59\uff54\uff48\uff4f\uff4e",
+    "\U0001d521\U0001d51e\U0001d531\U0001d51e", "\u202eesrever",
+)
+_FIELDS = ("skills", "interests", "strengths", "long_term_goal")
+PASTE_BYTES = 100 * 1024
+
+
+def _paste(rnd, size: int = PASTE_BYTES) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rnd.choice(_WORDS + _UNICODE)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def answers_corpus(size: int = 300, seed: int = 1) -> list:
+    """Questionnaire answers: ~80% realistic, the rest adversarial."""
+
+    rnd = random.Random(seed)
+    adversarial = [
+        lambda: {field: _paste(rnd) for field in _FIELDS},
+        lambda: {"skills": _paste(rnd), "interests": "", "strengths": "", "long_term_goal": ""},
+        lambda: {field: "x" * PASTE_BYTES for field in _FIELDS},  # one 100KB "word"
+        lambda: {field: " ".join(rnd.choice(_UNICODE) for _ in range(40)) for field in _FIELDS},
+        lambda: {field: " ".join(_WORDS) for field in _FIELDS},  # every rule matches
+        lambda: {field: "" for field in _FIELDS},
+        lambda: {"skills": None},  # missing and None fields
+        lambda: {field: "\n".join(rnd.choice(_WORDS) + "!?;,." for _ in range(200)) for field in _FIELDS},
+    ]
+    corpus = []
+    for index in range(size):
+        if index % 5 == 4:
+            answers = adversarial[(index // 5) % len(adversarial)]()
+        else:
+            answers = {field: " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 10))) for field in _FIELDS}
+        answers.setdefault("preferred_work_style", rnd.choice(["Solo", "Team", "Mixed", "", "\U0001f91d"]))
+        corpus.append(answers)
+    return corpus
+
+
+def career_names(seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    names = [
+        "Data Scientist", "Machine Learning Engineer", "MLOps Engineer", "AI Product Manager", "Technical Writer",
+        "UX Researcher", "Cloud Engineer", "Project / Program Coordinator", "", None,
+    ]
+    names += [" ".join(rnd.choice(_WORDS).title() for _ in range(rnd.randint(1, 4))) for _ in range(40)]
+    names += [rnd.choice(_UNICODE) + " Engineer" for _ in range(10)]
+    names += ["Senior " * 2000 + "Data Engineer", _paste(rnd)]
+    return names
+
+
+def resources_corpus(seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    corpus = [
+        None,
+        [],
+        "https://example.com/a-single-string",
+        ("tuple", "of", "titles"),
+        [{"title": "Docs", "url": "https://docs.example.com"}],
+        [{"name": "  Named only  "}, {"title": "", "url": "  "}, {"url": "https://x.example"}],
+        [rnd.choice(_UNICODE) for _ in range(50)],
+        [{"title": _paste(rnd, 10 * 1024), "url": "https://example.com/" + "a" * 2000}],
+    ]
+    corpus += [
+        [{"title": rnd.choice(_WORDS), "url": f"https://example.com/{i}"} for i in range(rnd.randint(1, 8))]
+        for _ in range(40)
+    ]
+    corpus.append([{"title": str(i), "url": ""} for i in range(5000)])
+    return corpus
+
+
+def ensure_list_corpus(seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    return [None, [], "one", 42, 3.5, ("a", "b"), {"a", "b"}, list(range(1000)), _paste(rnd), {"k": "v"}] * 5
+
+
+def explanation_corpus(seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    regular = [
+        f"Why: {' '.join(rnd.choice(_WORDS) for _ in range(12))}\n"
+        f"Benefits: {' '.join(rnd.choice(_WORDS) for _ in range(8))}\n"
+        f"Employment opportunities: {' '.join(rnd.choice(_WORDS) for _ in range(8))}\n"
+        f"Related sub-paths: {', '.join(rnd.choice(_WORDS) for _ in range(4))}"
+        for _ in range(40)
+    ]
+    return regular + [
+        "",
+        "No headers at all, just prose.",
+        "why: lower case header\nBENEFITS: shouting\nRelated sub-paths:",
+        "Why: " + _paste(rnd),
+        "\n".join(f"Related sub-paths: {rnd.choice(_UNICODE)}, {rnd.choice(_WORDS)}" for _ in range(2000)),
+        "Why: a\r\nBenefits: b\r\nEmployment opportunities: c Related sub-paths: d",
+    ]
+
+
+STUB_LLM_RESPONSES = (
+    json.dumps(
+        {
+            "recommendations": [
+                {
+                    "career": "Data Scientist",
+                    "score": 9,
+                    "reason": "Strong analytics background.",
+                    "benefits": "High demand.",
+                    "opportunities": "Tech, finance, healthcare.",
+                    "sub_careers": ["Data Analyst", "ML Engineer"],
+                    "resources": [{"title": "Course", "url": "https://example.com"}],
+                },
+                {"career": "Product Analyst", "score": 8, "sub_roles": "BI, Growth"},
+                {"career": "データサイエンティスト \U0001f680", "score": "7"},
+            ]
+        }
+    ),
+    json.dumps({"recommendations": [{"career": "Career " * 5000, "reason": "x" * PASTE_BYTES}]}),
+    '```json\n{"recommendations": []}\n```',
+    "Sure! Here are some careers: {recommendations: [",
+    json.dumps({"recommendations": "not a list"}),
+)
+
+
+@contextmanager
+def _swapped(module, **attributes):
+    saved = {name: getattr(module, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+@contextmanager
+def _stubbed_llm():
+    responses = iter(())
+
+    def call_genai(prompt, deadline=None):
+        nonlocal responses
+        try:
+            return next(responses)
+        except StopIteration:
+            responses = iter(STUB_LLM_RESPONSES)
+            return next(responses)
+
+    # No network, no response cache (every call would be a hit), no breaker.
+    with _swapped(ai, GENAI_API_KEY="stub", GENAI_CACHE_BACKEND="none", _call_genai=call_genai):
+        yield
+
+
+@contextmanager
+def _heuristic_only():
+    with _swapped(ai, GENAI_API_KEY=None):
+        yield
+
+
+def _benchmark_cases(seed: int, corpus_size: int) -> dict:
+    """name -> (function of one input, inputs, context manager factory or None)."""
+
+    from .views import _parse_explanation
+
+    answers = answers_corpus(corpus_size, seed)
+    return {
+        "generate_heuristic": (ai.generate_career_recommendation, answers, _heuristic_only),
+        "generate_stubbed_llm": (ai.generate_career_recommendation, answers, _stubbed_llm),
+        "default_action_plan_for": (ai._default_action_plan_for, career_names(seed), None),
+        "normalize_resources": (ai._normalize_resources, resources_corpus(seed), None),
+        "ensure_list": (ai._ensure_list, ensure_list_corpus(seed), None),
+        "parse_explanation": (_parse_explanation, explanation_corpus(seed), None),
+    }
+
+
+def _percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def _measure(func, inputs: list, rounds: int) -> dict:
+    for value in inputs[: min(len(inputs), 20)]:
+        func(value)  # warm up caches and lazy imports
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        per_op = []
+        for _ in range(rounds):
+            started = time.perf_counter_ns()
+            for value in inputs:
+                func(value)
+            per_op.append((time.perf_counter_ns() - started) / len(inputs))
+
+        calls = []
+        for value in inputs:
+            started = time.perf_counter_ns()
+            func(value)
+            calls.append(time.perf_counter_ns() - started)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        peaks = []
+        blocks_before = len(tracemalloc.take_snapshot().traces)
+        for value in inputs:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            func(value)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        retained_blocks = len(tracemalloc.take_snapshot().traces) - blocks_before
+    finally:
+        tracemalloc.stop()
+
+    per_op.sort()
+    calls.sort()
+    return {
+        "inputs": len(inputs),
+        "best_ns": round(per_op[0]),
+        "median_ns": round(per_op[len(per_op) // 2]),
+        "p50_ns": _percentile(calls, 0.50),
+        "p95_ns": _percentile(calls, 0.95),
+        "p99_ns": _percentile(calls, 0.99),
+        "peak_bytes_mean": round(sum(peaks) / len(peaks)),
+        "peak_bytes_max": max(peaks),
+        "retained_blocks": retained_blocks,
+    }
+
+
+def run_benchmarks(names=None, rounds: int = 5, seed: int = 1, corpus_size: int = 300) -> dict:
+    results = {}
+    for name, (func, inputs, context) in _benchmark_cases(seed, corpus_size).items():
+        if names and name not in names:
+            continue
+        if context is None:
+            results[name] = _measure(func, inputs, rounds)
+        else:
+            with context():
+                results[name] = _measure(func, inputs, rounds)
+    return results
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list:
+    """(benchmark, metric, baseline, current, change) where median ns or mean peak bytes grew past `threshold`."""
+
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for metric in ("median_ns", "peak_bytes_mean"):
+            old, new = before.get(metric), stats[metric]
+            if old and (new - old) / old > threshold:
+                regressions.append((name, metric, old, new, (new - old) / old))
+    return regressions
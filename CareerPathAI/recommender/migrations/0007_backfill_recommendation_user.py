@@ -0,0 +1,40 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 1000
+
+
+def backfill_user(apps, schema_editor):
+    """Copies questionnaire.user onto each recommendation, one committed batch at a time."""
+
+    Questionnaire = apps.get_model("recommender", "Questionnaire")
+    Recommendation = apps.get_model("recommender", "Recommendation")
+    db = schema_editor.connection.alias
+    owner = Questionnaire.objects.using(db).filter(pk=OuterRef("questionnaire_id")).values("user_id")[:1]
+
+    last_pk = 0
+    while True:
+        # Walk the primary key so each batch is an index range scan, not a rescan for NULLs.
+        ids = list(
+            Recommendation.objects.using(db)
+            .filter(pk__gt=last_pk, user__isnull=True)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        Recommendation.objects.using(db).filter(pk__in=ids).update(user_id=Subquery(owner))
+        last_pk = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # Not atomic: every batch commits on its own so writers are never locked out for long.
+    atomic = False
+
+    dependencies = [
+        ('recommender', '0006_recommendation_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user, migrations.RunPython.noop),
+    ]
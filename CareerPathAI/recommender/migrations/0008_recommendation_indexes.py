@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0007_backfill_recommendation_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['user', '-created_at'], name='rec_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['user', '-deleted_at'], name='rec_user_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='rec_deleted_idx'),
+        ),
+    ]
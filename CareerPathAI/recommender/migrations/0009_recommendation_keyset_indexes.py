@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0008_recommendation_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recommendation',
+            name='rec_user_active_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='recommendation',
+            name='rec_user_deleted_idx',
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['user', '-created_at', '-id'], name='rec_user_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['user', '-deleted_at', '-id'], name='rec_user_deleted_idx'),
+        ),
+    ]
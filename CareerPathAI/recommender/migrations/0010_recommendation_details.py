@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0009_recommendation_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recommendation',
+            name='details',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
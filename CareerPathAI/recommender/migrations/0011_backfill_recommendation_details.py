@@ -0,0 +1,70 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+# Line prefixes written by the old flattened `explanation` format, in order.
+SECTIONS = (
+    ("why:", "why"),
+    ("benefits:", "benefits"),
+    ("employment opportunities:", "opportunities"),
+    ("related sub-paths:", "sub_paths"),
+)
+
+
+def parse_explanation(text):
+    """
+    Same result as views._parse_explanation, except that lines which don't start a new
+    section (newlines inside the generated text) are kept with the section above.
+    """
+
+    parts = {"why": [], "benefits": [], "opportunities": [], "sub_paths": []}
+    current = None
+    for line in text.splitlines():
+        lower = line.lower()
+        for prefix, name in SECTIONS:
+            if lower.startswith(prefix):
+                current = name
+                parts[name] = [line[len(prefix):].strip()]
+                break
+        else:
+            if current is not None and line.strip():
+                parts[current].append(line.strip())
+
+    sub_text = ", ".join(parts.pop("sub_paths"))
+    details = {name: "\n".join(lines) for name, lines in parts.items()}
+    details["sub_paths"] = [sub.strip() for sub in sub_text.split(",") if sub.strip()]
+    return details
+
+
+def backfill_details(apps, schema_editor):
+    Recommendation = apps.get_model("recommender", "Recommendation")
+    db = schema_editor.connection.alias
+
+    last_pk = 0
+    while True:
+        batch = list(
+            Recommendation.objects.using(db)
+            .filter(pk__gt=last_pk, details__isnull=True)
+            .exclude(explanation="")
+            .order_by("pk")
+            .only("pk", "explanation")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for rec in batch:
+            rec.details = parse_explanation(rec.explanation)
+        Recommendation.objects.using(db).bulk_update(batch, ["details"])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own so the table is never locked for the whole run.
+    atomic = False
+
+    dependencies = [
+        ('recommender', '0010_recommendation_details'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_details, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0011_backfill_recommendation_details'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActionPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('getting_started', models.JSONField(blank=True, default=list)),
+                ('resources', models.JSONField(blank=True, default=list)),
+                ('interview_prep', models.JSONField(blank=True, default=list)),
+                ('how_to_apply', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recommendation',
+            name='action_plan',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='recommendations', to='recommender.actionplan'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+import hashlib
+import json
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+FIELDS = ("getting_started", "resources", "interview_prep", "how_to_apply")
+
+
+def content_hash(content):
+    # Must match ActionPlanManager.content_hash.
+    canonical = json.dumps(
+        [content.get(field) or [] for field in FIELDS],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def dedupe_action_plans(apps, schema_editor):
+    """Moves each recommendation's inline plan into a shared ActionPlan row, batch by batch."""
+
+    ActionPlan = apps.get_model("recommender", "ActionPlan")
+    Recommendation = apps.get_model("recommender", "Recommendation")
+    db = schema_editor.connection.alias
+    plan_ids = dict(ActionPlan.objects.using(db).values_list("content_hash", "pk"))
+
+    last_pk = 0
+    while True:
+        batch = list(
+            Recommendation.objects.using(db)
+            .filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", *FIELDS)[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        changed = []
+        for rec in batch:
+            content = {field: getattr(rec, field) for field in FIELDS}
+            if not any(content.values()):
+                continue
+            digest = content_hash(content)
+            if digest not in plan_ids:
+                plan_ids[digest] = ActionPlan.objects.using(db).create(
+                    content_hash=digest, **{field: content[field] or [] for field in FIELDS}
+                ).pk
+            rec.action_plan_id = plan_ids[digest]
+            changed.append(rec)
+        Recommendation.objects.using(db).bulk_update(changed, ["action_plan"])
+        last_pk = batch[-1].pk
+
+
+def restore_inline_plans(apps, schema_editor):
+    Recommendation = apps.get_model("recommender", "Recommendation")
+    db = schema_editor.connection.alias
+    for rec in Recommendation.objects.using(db).filter(action_plan__isnull=False).select_related("action_plan").iterator():
+        for field in FIELDS:
+            setattr(rec, field, getattr(rec.action_plan, field))
+        rec.save(update_fields=list(FIELDS))
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own so the table is never locked for the whole run.
+    atomic = False
+
+    dependencies = [
+        ('recommender', '0012_actionplan'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_action_plans, restore_inline_plans),
+    ]
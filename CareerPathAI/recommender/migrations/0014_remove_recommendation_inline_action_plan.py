@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:32
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0013_dedupe_action_plans'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='recommendation',
+            name='getting_started',
+        ),
+        migrations.RemoveField(
+            model_name='recommendation',
+            name='how_to_apply',
+        ),
+        migrations.RemoveField(
+            model_name='recommendation',
+            name='interview_prep',
+        ),
+        migrations.RemoveField(
+            model_name='recommendation',
+            name='resources',
+        ),
+    ]
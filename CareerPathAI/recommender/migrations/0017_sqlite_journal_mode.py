@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import migrations
+
+from recommender.db_tuning import set_journal_mode
+
+
+def switch_journal_mode(apps, schema_editor):
+    # Persistent in the database file; connections no longer set it (see recommender.db_tuning).
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite" and settings.SQLITE_TUNING:
+        set_journal_mode(connection)
+
+
+class Migration(migrations.Migration):
+    # SQLite can't change the journal mode inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('recommender', '0016_create_cache_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(switch_journal_mode, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
-from datetime import timedelta
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 
@@ -33,24 +36,190 @@ class Questionnaire(models.Model):
         return f"Questionnaire {self.id} by {self.user.username}"
 
 
+ACTION_PLAN_FIELDS = ("getting_started", "resources", "interview_prep", "how_to_apply")
+
+
+class ActionPlanManager(models.Manager):
+    """
+    Plans are immutable (their key is a hash of their content), so any copy ever
+    loaded stays valid: the detail view reads them from a per-process LRU cache.
+    The only exception is the recycle bin purge deleting plans nothing references
+    any more; a job that reuses one from another process's cache retries
+    (see jobs._finish_job).
+    """
+
+    CACHE_SIZE = 1024
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._by_id = OrderedDict()
+        self._ids_by_hash = {}
+
+    @staticmethod
+    def content_hash(content: dict) -> str:
+        canonical = json.dumps(
+            [content.get(field) or [] for field in ACTION_PLAN_FIELDS],
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _remember(self, plan) -> None:
+        # Only committed rows are cached; a rolled-back plan must not be handed out later.
+        transaction.on_commit(lambda: self._store(plan), using=self.db)
+
+    def _store(self, plan) -> None:
+        with self._lock:
+            self._by_id[plan.pk] = plan
+            self._by_id.move_to_end(plan.pk)
+            self._ids_by_hash[plan.content_hash] = plan.pk
+            while len(self._by_id) > self.CACHE_SIZE:
+                _, old = self._by_id.popitem(last=False)
+                self._ids_by_hash.pop(old.content_hash, None)
+
+    def get_cached(self, pk):
+        with self._lock:
+            plan = self._by_id.get(pk)
+            if plan is not None:
+                self._by_id.move_to_end(pk)
+                return plan
+        plan = self.get(pk=pk)
+        self._remember(plan)
+        return plan
+
+    def for_content(self, content: dict):
+        """The shared plan with exactly this content (created on first use); None if it's all empty."""
+
+        if not any(content.get(field) for field in ACTION_PLAN_FIELDS):
+            return None
+        digest = self.content_hash(content)
+        with self._lock:
+            pk = self._ids_by_hash.get(digest)
+        if pk is not None:
+            return self.get_cached(pk)
+        plan, _ = self.get_or_create(
+            content_hash=digest,
+            defaults={field: content.get(field) or [] for field in ACTION_PLAN_FIELDS},
+        )
+        self._remember(plan)
+        return plan
+
+    def for_contents(self, contents) -> list:
+        """
+        for_content for many plans at once: one lookup and one insert for all the plans
+        not cached yet. Run it outside a transaction (plans are immutable, so committing
+        them early is harmless) and for_content is a cache hit for these contents afterwards.
+        """
+
+        digests = [
+            self.content_hash(content) if any(content.get(field) for field in ACTION_PLAN_FIELDS) else None
+            for content in contents
+        ]
+        with self._lock:
+            known = {digest: self._ids_by_hash[digest] for digest in digests if digest in self._ids_by_hash}
+        plans = {pk: self.get_cached(pk) for pk in set(known.values())}
+        by_hash = {digest: plans[pk] for digest, pk in known.items()}
+
+        missing = {digest: content for digest, content in zip(digests, contents) if digest and digest not in by_hash}
+        if missing:
+            self.bulk_create(
+                [
+                    ActionPlan(content_hash=digest, **{field: content.get(field) or [] for field in ACTION_PLAN_FIELDS})
+                    for digest, content in missing.items()
+                ],
+                ignore_conflicts=True,
+            )
+            for plan in self.filter(content_hash__in=list(missing)):
+                by_hash[plan.content_hash] = plan
+                self._remember(plan)
+        return [by_hash[digest] if digest else None for digest in digests]
+
+    def forget(self, pks) -> None:
+        """Drops deleted plans from this process's cache."""
+
+        with self._lock:
+            for pk in pks:
+                plan = self._by_id.pop(pk, None)
+                if plan is not None:
+                    self._ids_by_hash.pop(plan.content_hash, None)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._by_id.clear()
+            self._ids_by_hash.clear()
+
+
+class ActionPlan(models.Model):
+    """A "getting started" plan shared by every recommendation with the same content."""
+
+    content_hash = models.CharField(max_length=64, unique=True)
+    getting_started = models.JSONField(default=list, blank=True)
+    resources = models.JSONField(default=list, blank=True)
+    interview_prep = models.JSONField(default=list, blank=True)
+    how_to_apply = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ActionPlanManager()
+
+    def __str__(self) -> str:
+        return f"Action plan {self.content_hash[:12]}"
+
+
+def _action_plan_field(name: str):
+    def getter(self):
+        plan = self.action_plan_cached
+        return getattr(plan, name) if plan is not None else []
+
+    return property(getter)
+
+
 class Recommendation(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_READY = "ready"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_READY, "Ready"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
     questionnaire = models.ForeignKey(Questionnaire, on_delete=models.CASCADE, related_name="recommendations")
+    # Copy of questionnaire.user so per-user lists and lookups don't need the join.
+    # Filled in on save; null only for rows older than the backfill migration.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="recommendations",
+        null=True,
+        editable=False,
+    )
     career_name = models.CharField(max_length=150)
     score = models.PositiveIntegerField()
     explanation = models.TextField()
+    # Structured explanation: {"why", "benefits", "opportunities", "sub_paths"}, written at
+    # generation time. Null only for legacy rows; the detail view then parses `explanation`.
+    details = models.JSONField(null=True, blank=True)
 
-    # "Action plan" fields to help the user actually get started.
-    # Stored as JSON to keep them flexible and easy to render as lists.
-    getting_started = models.JSONField(default=list, blank=True)
-    resources = models.JSONField(default=list, blank=True)
-    interview_prep = models.JSONField(default=list, blank=True)
-    how_to_apply = models.JSONField(default=list, blank=True)
+    # "Action plan" to help the user actually get started. Identical plans (e.g. every
+    # heuristic result for the same career) are stored once and shared.
+    action_plan = models.ForeignKey(
+        ActionPlan,
+        on_delete=models.PROTECT,
+        related_name="recommendations",
+        null=True,
+        blank=True,
+    )
 
     # Generation metadata (useful for demo + debugging + reliability)
-    generation_source = models.CharField(max_length=20, default="unknown")  # genai|heuristic|unknown
+    generation_source = models.CharField(max_length=20, default="unknown")  # genai|heuristic|heuristic_breaker|unknown
     model_name = models.CharField(max_length=100, blank=True, default="")
     prompt_version = models.CharField(max_length=50, blank=True, default="")
 
+    # "pending" while a background job is still generating the content.
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_READY)
+
     # Lightweight feedback loop
     user_rating = models.SmallIntegerField(null=True, blank=True)  # 1=helpful, -1=not helpful
     user_rating_note = models.TextField(blank=True, default="")
@@ -58,9 +227,56 @@ class Recommendation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Dashboard: a user's active recommendations, newest first. The trailing id
+            # matches the keyset pagination order, so pages never need a sort.
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                condition=models.Q(deleted_at__isnull=True),
+                name="rec_user_active_idx",
+            ),
+            # Dashboard recycle bin: a user's deleted recommendations, most recently deleted first.
+            models.Index(
+                fields=["user", "-deleted_at", "-id"],
+                condition=models.Q(deleted_at__isnull=False),
+                name="rec_user_deleted_idx",
+            ),
+            # Recycle bin purge (deleted_at < cutoff across all users).
+            models.Index(
+                fields=["deleted_at"],
+                condition=models.Q(deleted_at__isnull=False),
+                name="rec_deleted_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"{self.career_name} ({self.score}/10)"
 
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.questionnaire_id is not None:
+            self.user_id = self.questionnaire.user_id
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "user"}
+        super().save(*args, **kwargs)
+
+    @property
+    def action_plan_cached(self):
+        """The action plan via the in-process plan cache (no query once the plan is hot)."""
+        if self.action_plan_id is None:
+            return None
+        return ActionPlan.objects.get_cached(self.action_plan_id)
+
+    getting_started = _action_plan_field("getting_started")
+    resources = _action_plan_field("resources")
+    interview_prep = _action_plan_field("interview_prep")
+    how_to_apply = _action_plan_field("how_to_apply")
+
+    @property
+    def is_pending(self):
+        return self.status == self.STATUS_PENDING
+
     @property
     def is_deleted(self):
         return self.deleted_at is not None
@@ -77,6 +293,51 @@ class Recommendation(models.Model):
 
     @classmethod
     def cleanup_old_deleted(cls, days=30):
-        """Permanently delete items in recycle bin"""
-        cutoff_date = timezone.now() - timedelta(days=days)
-        return cls.objects.filter(deleted_at__lt=cutoff_date).delete()
+        """Permanently delete items in recycle bin (in batches; see recommender.purge)"""
+        from .purge import purge_expired_recommendations
+
+        return purge_expired_recommendations(retention_days=days).purged
+
+
+class RecommendationJob(models.Model):
+    """A queued request to generate the content of a pending Recommendation."""
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    recommendation = models.OneToOneField(Recommendation, on_delete=models.CASCADE, related_name="job")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Job {self.id} ({self.status})"
+
+
+class BatchScoringRun(models.Model):
+    """Progress of a bulk import (`manage.py score_questionnaires`), used to resume it after a crash."""
+
+    # sha256 of the input file: re-running the same file resumes the same run.
+    source_hash = models.CharField(max_length=64, unique=True)
+    source_name = models.CharField(max_length=255)
+    # Input rows handled so far (scored or skipped); advanced in the same transaction as their rows.
+    rows_done = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)
+    questionnaires_created = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.source_name} ({self.rows_done} rows)"
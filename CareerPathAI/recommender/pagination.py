@@ -0,0 +1,99 @@
+"""
+Keyset (cursor) pagination for newest-first lists.
+
+Pages are addressed by the (timestamp, id) of the row at their edge rather than
+by an OFFSET, so fetching page N costs the same as page 1: an index range scan
+that stops after `size + 1` rows. Cursors are opaque URL-safe tokens.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(value: datetime, pk: int) -> str:
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """(datetime, pk) for a cursor token; None when missing or malformed."""
+
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        value, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        # next = older rows, previous = newer rows.
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    @property
+    def has_other_pages(self) -> bool:
+        return bool(self.next_cursor or self.previous_cursor)
+
+
+def keyset_page(queryset, field: str, size: int, after=None, before=None) -> KeysetPage:
+    """
+    One page of `queryset` ordered by (field, pk) descending.
+    `after` / `before` are decoded cursors: rows strictly older / newer than that position.
+    """
+
+    if before is not None:
+        value, pk = before
+        # Walk towards newer rows in ascending order, then flip back to newest-first.
+        rows = list(
+            queryset.filter(**{f"{field}__gte": value})
+            .filter(Q(**{f"{field}__gt": value}) | Q(pk__gt=pk))
+            .order_by(field, "pk")[: size + 1]
+        )
+        if len(rows) <= size:
+            # Back at the newest rows: serve the regular first page so it is full.
+            return keyset_page(queryset, field, size)
+        has_newer = True
+        rows = rows[:size][::-1]
+        has_older = True
+    else:
+        if after is not None:
+            value, pk = after
+            # The redundant `<=` bound gives the planner a plain index range to scan.
+            queryset = queryset.filter(**{f"{field}__lte": value}).filter(
+                Q(**{f"{field}__lt": value}) | Q(pk__lt=pk)
+            )
+        rows = list(queryset.order_by(f"-{field}", "-pk")[: size + 1])
+        has_older = len(rows) > size
+        rows = rows[:size]
+        has_newer = after is not None
+
+    if not rows:
+        return KeysetPage(rows)
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(getattr(rows[-1], field), rows[-1].pk) if has_older else None,
+        previous_cursor=encode_cursor(getattr(rows[0], field), rows[0].pk) if has_newer else None,
+    )
+
+
+def capped_count(queryset, cap: int) -> tuple:
+    """(count, capped): counts at most `cap` rows, so big lists cost no more than `cap` index entries."""
+
+    count = queryset[: cap + 1].count()
+    return min(count, cap), count > cap
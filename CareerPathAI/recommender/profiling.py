@@ -0,0 +1,467 @@
+"""
+Opt-in request profiling (PROFILING_ENABLED).
+
+ProfilingMiddleware profiles a PROFILING_SAMPLE_RATE fraction of requests, plus
+any request from a staff user that carries the PROFILING_HEADER header. A
+profile records:
+
+- the call stacks, sampled every PROFILING_SAMPLE_INTERVAL seconds, and with
+  PROFILING_MODE=cprofile (the default) a cProfile run as well. cProfile gives
+  exact call counts and times per function but slows the request down;
+  PROFILING_MODE=sample only samples;
+- every SQL query with its time, and an EXPLAIN plan for the SELECTs that took
+  at least PROFILING_SLOW_QUERY_MS;
+- the GenAI call spans, with their outcome.
+
+Profiles are written to PROFILING_DIR, which keeps the newest
+PROFILING_MAX_PROFILES of them, and are browsed at /admin/profiles/. The sampled
+stacks export in the collapsed format (flamegraph.pl, speedscope, inferno).
+cProfile only keeps caller/callee totals, which can't be turned back into stacks
+through Django's recursive middleware chain, so cProfile runs export the raw .prof
+file (pstats, snakeviz) alongside.
+
+The EXPLAINs and the writes to PROFILING_DIR happen once the response has been
+sent (when the server closes it), outside MetricsMiddleware's timing and query counts,
+so profiled requests don't skew the request metrics.
+
+One request per process is profiled at a time; others run as usual meanwhile.
+Under ASGI the profile covers everything the event loop runs during the request,
+other requests included, and sync views running in the thread pool are not seen
+by the stack sampler.
+"""
+
+import cProfile
+import glob
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+MODES = ("cprofile", "sample")
+MAX_QUERIES = 1000
+MAX_EXPLAINS = 20
+MAX_STACKS = 5000
+MAX_STACK_DEPTH = 128
+TOP_FUNCTIONS = 40
+
+_PROFILE_ID = re.compile(r"^\d{20}-\d+$")
+_current: ContextVar = ContextVar("request_profile", default=None)
+_busy = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _path_prefixes() -> tuple:
+    # Longest first, so a virtualenv's site-packages wins over the stdlib directory that contains it.
+    paths = (settings.BASE_DIR, sysconfig.get_path("purelib"), sysconfig.get_path("stdlib"))
+    return tuple(sorted({os.path.join(str(path), "") for path in paths}, key=len, reverse=True))
+
+
+def _label(filename: str, lineno: int, name: str) -> str:
+    """One flame graph frame; ';' separates frames in the collapsed format."""
+
+    if filename == "~":
+        return name.replace(";", ",")  # built-ins: ('~', 0, '<built-in method ...>')
+    for prefix in _path_prefixes():
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    return f"{name} ({filename}:{lineno})".replace(";", ",")
+
+
+def _elapsed_ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread and counts the collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float, stop_codes=()):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stop_codes = set(stop_codes)
+        self.stacks = Counter()
+        self.active = False  # set while the request runs, so profiler setup and teardown aren't sampled
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        frames = []
+        while frame is not None and len(frames) < MAX_STACK_DEPTH:
+            if frame.f_code in self.stop_codes:
+                break  # the middleware and everything above it is the same in every sample
+            code = frame.f_code
+            frames.append(_label(code.co_filename, code.co_firstlineno, getattr(code, "co_qualname", code.co_name)))
+            frame = frame.f_back
+        if frames:
+            self.stacks[";".join(reversed(frames))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.active:
+                self._sample()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+class RequestProfile:
+    """What is recorded while one request is profiled."""
+
+    def __init__(self, request, trigger: str, mode: str = None):
+        self.id = f"{time.time_ns():020d}-{os.getpid()}"
+        self.request = request
+        self.trigger = trigger
+        self.mode = mode or settings.PROFILING_MODE
+        if self.mode not in MODES:
+            raise ValueError(f"PROFILING_MODE must be one of {', '.join(MODES)}, not {self.mode!r}.")
+        self.created_at = datetime.now(timezone.utc)
+        self.started = time.monotonic()
+        self.duration = 0.0
+        self.queries = []
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.spans = []
+        self.stats = None
+        self.stacks = Counter()
+        self._statements = []  # (alias, sql, params) of the recorded queries, for EXPLAIN
+
+    def record_query(self, alias: str, sql: str, params, many: bool, started: float, seconds: float) -> None:
+        self.query_count += 1
+        self.query_seconds += seconds
+        if len(self.queries) >= MAX_QUERIES:
+            return
+        self.queries.append(
+            {
+                "alias": alias,
+                "sql": sql,
+                "params": repr(params)[:500],
+                "many": many,
+                "offset_ms": _elapsed_ms(started - self.started),
+                "ms": _elapsed_ms(seconds),
+                "plan": None,
+            }
+        )
+        self._statements.append((alias, sql, params))
+
+    def record_span(self, name: str, started: float, seconds: float, **attributes) -> None:
+        self.spans.append(
+            {"name": name, "offset_ms": _elapsed_ms(started - self.started), "ms": _elapsed_ms(seconds), **attributes}
+        )
+
+    @contextmanager
+    def capture(self):
+        token = _current.set(self)
+        sampler = StackSampler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL, _STOP_CODES)
+        sampler.start()
+        profiler = None
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        self.started = time.monotonic()
+        sampler.active = True
+        try:
+            yield self
+        finally:
+            sampler.active = False
+            self.duration = time.monotonic() - self.started
+            if profiler is not None:
+                profiler.disable()
+                self.stats = pstats.Stats(profiler)
+            self.stacks = sampler.stop()
+            _current.reset(token)
+
+    def explain_slow_queries(self) -> None:
+        plans = {}
+        for query, (alias, sql, params) in zip(self.queries, self._statements):
+            if query["ms"] < settings.PROFILING_SLOW_QUERY_MS or query["many"]:
+                continue
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            if (alias, sql) not in plans:
+                if len(plans) >= MAX_EXPLAINS:
+                    continue
+                plans[alias, sql] = explain(alias, sql, params)
+            query["plan"] = plans[alias, sql]
+
+    def _functions(self) -> list:
+        if self.stats is not None:
+            rows = sorted(self.stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+            return [
+                {
+                    "function": _label(*func),
+                    "calls": calls,
+                    "primitive_calls": primitive,
+                    "self_ms": _elapsed_ms(tottime),
+                    "cumulative_ms": _elapsed_ms(cumtime),
+                }
+                for func, (primitive, calls, tottime, cumtime, _) in rows
+            ]
+        own, total = Counter(), Counter()
+        for stack, samples in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += samples
+            for frame in set(frames):
+                total[frame] += samples
+        return [
+            {"function": frame, "self_samples": own[frame], "total_samples": samples}
+            for frame, samples in total.most_common(TOP_FUNCTIONS)
+        ]
+
+    def summary(self, response) -> dict:
+        match = self.request.resolver_match
+        user = getattr(self.request, "user", None)
+        return {
+            "id": self.id,
+            "created_at": self.created_at.isoformat(timespec="milliseconds"),
+            "method": self.request.method,
+            "path": self.request.get_full_path()[:500],
+            "view": match.view_name if match is not None else None,
+            "status": response.status_code,
+            "user": user.get_username() if user is not None and user.is_authenticated else None,
+            "trigger": self.trigger,
+            "mode": self.mode,
+            "duration_ms": _elapsed_ms(self.duration),
+            "query_count": self.query_count,
+            "query_ms": _elapsed_ms(self.query_seconds),
+            "genai_ms": round(sum(span["ms"] for span in self.spans if span["name"] == "genai_call"), 3),
+        }
+
+    def finish(self, response) -> dict:
+        """Explains the slow queries and saves the profile; returns its summary."""
+
+        with metrics.uncounted():
+            self.explain_slow_queries()
+        summary = self.summary(response)
+        stacks = dict(self.stacks.most_common(MAX_STACKS))
+        profile = {
+            **summary,
+            "queries": self.queries,
+            "spans": self.spans,
+            "functions": self._functions(),
+            "stacks": stacks,
+        }
+        save(profile, summary, self.stats)
+        return summary
+
+
+def explain(alias: str, sql: str, params) -> str:
+    connection = connections[alias]
+    prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f"EXPLAIN failed: {exc}"
+
+
+def record_span(name: str, started: float, seconds: float, **attributes) -> None:
+    """Adds a span (time.monotonic() start) to the profile of the current request, if it is profiled."""
+
+    profile = _current.get()
+    if profile is not None:
+        profile.record_span(name, started, seconds, **attributes)
+
+
+def _record_queries(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.monotonic()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record_query(context["connection"].alias, sql, params, many, started, time.monotonic() - started)
+
+
+def _on_connection_created(sender, connection, **kwargs) -> None:
+    if _record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_queries)
+
+
+def install() -> None:
+    if settings.PROFILING_ENABLED:
+        connection_created.connect(_on_connection_created, dispatch_uid="recommender.profiling")
+
+
+# Ring buffer on disk: <id>.summary.json for the list, <id>.json, and <id>.prof for cProfile runs.
+
+
+def _path(profile_id: str, suffix: str) -> str:
+    return os.path.join(settings.PROFILING_DIR, f"{profile_id}{suffix}")
+
+
+def _write_json(path: str, data: dict) -> None:
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def save(profile: dict, summary: dict, stats=None) -> None:
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    if stats is not None:
+        stats.dump_stats(_path(summary["id"], ".prof"))
+    _write_json(_path(summary["id"], ".json"), profile)
+    # The summary goes last: a profile is listed only once all of its files are there.
+    _write_json(_path(summary["id"], ".summary.json"), summary)
+    prune(settings.PROFILING_MAX_PROFILES)
+
+
+def _ids() -> list:
+    """Saved profile ids, oldest first (ids start with the time they were taken)."""
+
+    suffix = ".summary.json"
+    return sorted(os.path.basename(path)[: -len(suffix)] for path in glob.glob(_path("*", suffix)))
+
+
+def prune(keep: int) -> None:
+    ids = _ids()
+    for profile_id in ids[: max(0, len(ids) - keep)]:
+        # Summary first, so a half-deleted profile is no longer listed.
+        for suffix in (".summary.json", ".json", ".prof"):
+            try:
+                os.remove(_path(profile_id, suffix))
+            except FileNotFoundError:
+                pass  # another process pruned it first
+
+
+def list_profiles() -> list:
+    """Summaries of the saved profiles, newest first."""
+
+    summaries = []
+    for profile_id in reversed(_ids()):
+        try:
+            with open(_path(profile_id, ".summary.json")) as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return summaries
+
+
+def load_profile(profile_id: str):
+    """The saved profile, or None."""
+
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(_path(profile_id, ".json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def pstats_path(profile_id: str):
+    """Path of the raw cProfile dump, or None."""
+
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = _path(profile_id, ".prof")
+    return path if os.path.exists(path) else None
+
+
+def collapsed_stacks(profile: dict) -> str:
+    """The profile's stacks in the collapsed ("folded") format flame graph tools read."""
+
+    return "".join(f"{stack} {value}\n" for stack, value in sorted(profile["stacks"].items()))
+
+
+class ProfilingMiddleware:
+    """Put it after AuthenticationMiddleware: the header is only honoured for staff users."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _requested(self, request) -> bool:
+        return bool(settings.PROFILING_HEADER and request.headers.get(settings.PROFILING_HEADER))
+
+    def _trigger(self, requested: bool, user):
+        if requested and user is not None and user.is_active and user.is_staff:
+            return "header"
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    def _finish(self, response, profile: RequestProfile):
+        response["X-Profile-Id"] = profile.id
+        # Saved when the server closes the response, i.e. after it was sent and outside the request's metrics.
+        close = response.close
+
+        def close_and_save():
+            response.close = close  # once, even if the server closes twice
+            self._save(response, profile)
+            close()
+
+        response.close = close_and_save
+        return response
+
+    def _save(self, response, profile: RequestProfile) -> None:
+        try:
+            profile.finish(response)
+        except Exception:
+            logger.exception("Saving request profile %s failed", profile.id)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+        user = getattr(request, "user", None) if self._requested(request) else None
+        trigger = self._trigger(user is not None, user)
+        if trigger is None or not _busy.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profile = RequestProfile(request, trigger)
+            with profile.capture():
+                response = self.get_response(request)
+        finally:
+            _busy.release()
+        return self._finish(response, profile)
+
+    async def __acall__(self, request):
+        if not settings.PROFILING_ENABLED:
+            return await self.get_response(request)
+        user = await request.auser() if self._requested(request) else None
+        trigger = self._trigger(user is not None, user)
+        if trigger is None or not _busy.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            profile = RequestProfile(request, trigger)
+            with profile.capture():
+                response = await self.get_response(request)
+        finally:
+            _busy.release()
+        return self._finish(response, profile)
+
+
+_STOP_CODES = (ProfilingMiddleware.__call__.__code__, ProfilingMiddleware.__acall__.__code__)
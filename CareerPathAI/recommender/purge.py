@@ -0,0 +1,156 @@
+"""
+Permanent removal of expired recycle-bin items.
+
+Recommendations soft-deleted more than RECYCLE_BIN_RETENTION_DAYS ago are deleted
+in chunks of RECYCLE_BIN_PURGE_BATCH_SIZE with a short pause between chunks, so
+each write transaction stays small and concurrent inserts (which on SQLite wait
+for the same write lock) are never held up for long. Action plans that no
+recommendation references any more (ActionPlan is shared and PROTECTed, so
+deleting recommendations never removes it) are then deleted the same way.
+
+Run it with `python manage.py purge_recycle_bin` (cron, systemd timer, ...), or
+set RECYCLE_BIN_PURGE_INTERVAL to have each web process run it periodically in a
+background thread.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from . import dashboard_cache
+from .models import ActionPlan, Recommendation
+
+logger = logging.getLogger(__name__)
+
+
+class PurgeResult:
+    def __init__(self, cutoff):
+        self.cutoff = cutoff
+        self.purged = 0
+        self.plans_purged = 0
+        self.batches = 0
+        self.duration = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"Purged {self.purged} recommendation(s) deleted before {self.cutoff:%Y-%m-%d %H:%M} "
+            f"and {self.plans_purged} orphaned action plan(s) in {self.batches} batch(es), {self.duration:.2f}s."
+        )
+
+
+def purge_expired_recommendations(retention_days=None, batch_size=None, pause=None, dry_run=False) -> PurgeResult:
+    """
+    Deletes recycle-bin items older than the retention window, batch by batch, then
+    the action plans left without recommendations. Arguments default to the
+    RECYCLE_BIN_* settings. With dry_run, only counts them.
+    """
+
+    retention_days = settings.RECYCLE_BIN_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = settings.RECYCLE_BIN_PURGE_BATCH_SIZE if batch_size is None else batch_size
+    pause = settings.RECYCLE_BIN_PURGE_PAUSE if pause is None else pause
+
+    result = PurgeResult(timezone.now() - timedelta(days=retention_days))
+    started = time.monotonic()
+    expired = Recommendation.objects.filter(deleted_at__lt=result.cutoff)
+    if dry_run:
+        result.purged = expired.count()
+    else:
+        while True:
+            rows = list(expired.order_by("deleted_at").values_list("pk", "user_id")[:batch_size])
+            if not rows:
+                break
+            ids = [pk for pk, _ in rows]
+            # Deleting by primary key keeps each statement (and its lock) bounded; related jobs cascade.
+            _, per_model = Recommendation.objects.filter(pk__in=ids).delete()
+            dashboard_cache.bump_generations(user_id for _, user_id in rows)
+            result.purged += per_model.get(Recommendation._meta.label, 0)
+            result.batches += 1
+            if len(rows) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+    _purge_orphaned_action_plans(result, batch_size, pause, dry_run)
+    result.duration = time.monotonic() - started
+    return result
+
+
+def _purge_orphaned_action_plans(result: PurgeResult, batch_size: int, pause: float, dry_run: bool) -> None:
+    orphans = ActionPlan.objects.filter(recommendations__isnull=True)
+    if dry_run:
+        result.plans_purged = orphans.count()
+        return
+    while True:
+        ids = list(orphans.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        try:
+            with transaction.atomic():
+                # Re-checked right before the delete: a plan reused since the SELECT is kept.
+                _, per_model = orphans.filter(pk__in=ids).delete()
+        except IntegrityError:
+            # A recommendation picked one of them up in between; the next SELECT skips it.
+            per_model = {}
+        ActionPlan.objects.forget(ids)
+        result.plans_purged += per_model.get(ActionPlan._meta.label, 0)
+        result.batches += 1
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+
+class PurgeRunner:
+    """Daemon thread that runs the purge every `interval` seconds in this process."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.runs = 0
+        self.total_purged = 0
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="recycle-bin-purge", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                result = purge_expired_recommendations()
+            except Exception:
+                logger.exception("Recycle bin purge failed")
+            else:
+                self.runs += 1
+                self.total_purged += result.purged
+                self.last_result = result
+                if result.purged or result.plans_purged:
+                    logger.info("%s", result)
+            finally:
+                close_old_connections()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def start_purge_runner(interval=None):
+    """Starts this process's purge thread once; returns it (None when the interval is 0)."""
+
+    global _runner
+    interval = settings.RECYCLE_BIN_PURGE_INTERVAL if interval is None else interval
+    if not interval:
+        return None
+    with _runner_lock:
+        if _runner is None:
+            _runner = PurgeRunner(interval)
+            _runner.start()
+        return _runner
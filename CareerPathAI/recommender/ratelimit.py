@@ -0,0 +1,171 @@
+"""
+Client-side rate limiting for the GenAI API.
+
+RateLimiter keeps two token buckets (requests/min and tokens/min). Their state
+lives in a store: MemoryBucketStore for one process, FileBucketStore to share the
+quota between worker processes on one host (fcntl-locked JSON file). A 429 from
+the API can pause every worker sharing the store until its Retry-After passes.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class MemoryBucketStore:
+    """Bucket state for a single process. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            yield self._state
+
+
+class FileBucketStore:
+    """Bucket state shared by every process that points at the same file."""
+
+    def __init__(self, path: str):
+        if fcntl is None:
+            raise RuntimeError("FileBucketStore requires fcntl (POSIX).")
+        self.path = path
+        self._thread_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @contextmanager
+    def locked(self):
+        with self._thread_lock, open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    state = {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter over requests/min and (estimated) tokens/min.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, store=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.store = store or MemoryBucketStore()
+
+    def _buckets(self, cost: int):
+        # (name, capacity, refill per second, amount needed)
+        for name, per_minute, amount in (
+            ("requests", self.requests_per_minute, 1),
+            ("tokens", self.tokens_per_minute, cost),
+        ):
+            if per_minute:
+                # A single oversized call may still go through once the bucket is full.
+                yield name, per_minute, per_minute / 60.0, min(amount, per_minute)
+
+    def reserve(self, cost: int) -> float:
+        """Takes capacity for one call and returns 0, or returns the seconds to wait (taking nothing)."""
+
+        now = time.time()
+        with self.store.locked() as state:
+            paused_until = state.get("paused_until", 0)
+            if paused_until > now:
+                return paused_until - now
+
+            levels = {}
+            wait = 0.0
+            for name, capacity, rate, amount in self._buckets(cost):
+                level, updated = state.get(name, (capacity, now))
+                level = min(capacity, level + (now - updated) * rate)
+                levels[name] = (level, amount)
+                if level < amount:
+                    wait = max(wait, (amount - level) / rate)
+
+            for name, (level, amount) in levels.items():
+                state[name] = (level - amount if not wait else level, now)
+            return wait
+
+    def acquire(self, cost: int, max_wait: float) -> tuple:
+        """
+        Blocks until the call fits the quota or max_wait would be exceeded.
+        Returns (acquired, throttled) where throttled means it had to wait or gave up.
+        """
+
+        deadline = time.monotonic() + max_wait
+        throttled = False
+        while True:
+            wait = self.reserve(cost)
+            if not wait:
+                return True, throttled
+            throttled = True
+            if time.monotonic() + wait > deadline:
+                return False, throttled
+            time.sleep(wait)
+
+    async def aacquire(self, cost: int, max_wait: float) -> tuple:
+        """Async variant of acquire."""
+
+        deadline = time.monotonic() + max_wait
+        throttled = False
+        while True:
+            wait = self.reserve(cost)
+            if not wait:
+                return True, throttled
+            throttled = True
+            if time.monotonic() + wait > deadline:
+                return False, throttled
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Holds every caller sharing this limiter back for `seconds` (e.g. after a 429)."""
+
+        until = time.time() + seconds
+        with self.store.locked() as state:
+            state["paused_until"] = max(state.get("paused_until", 0), until)
+
+
+def parse_retry_after(value):
+    """Retry-After in seconds (accepts delta-seconds or an HTTP date); None if absent/invalid."""
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after=None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        # Small jitter on top so workers released by the same Retry-After don't stampede.
+        delay = max(delay, retry_after + random.uniform(0, base))
+    return delay
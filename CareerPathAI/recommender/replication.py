@@ -0,0 +1,83 @@
+"""
+Replication lag simulator for local primary/replica setups with SQLite files.
+
+SQLite has no replication, so for development the replica files are refreshed
+from the primary: every `interval` seconds a snapshot of the primary is taken
+(sqlite3 backup API, consistent even while the app writes), and a snapshot is
+copied over the replicas once it is `lag` seconds old. Replicas therefore serve
+the primary's contents as of `lag` seconds ago, which is what makes stale reads
+(and the read-your-writes pinning in recommender.db_router) observable.
+
+Pending snapshots are kept in memory, so this is meant for development-sized databases.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicationLagSimulator:
+    def __init__(self, primary: str, replicas, lag: float = 2.0, interval: float = 0.5):
+        self.primary = str(primary)
+        self.replicas = [str(path) for path in replicas]
+        self.lag = lag
+        self.interval = interval
+        self.applied_at = None  # when the snapshot now on the replicas was taken
+        self._snapshots = deque()
+
+    def snapshot(self, now: float = None) -> None:
+        """Takes a snapshot of the primary."""
+
+        memory = sqlite3.connect(":memory:")
+        source = sqlite3.connect(self.primary)
+        try:
+            source.backup(memory)
+        finally:
+            source.close()
+        self._snapshots.append((time.time() if now is None else now, memory))
+
+    def apply_due(self, now: float = None) -> bool:
+        """Copies the newest snapshot that is at least `lag` old to the replicas; False if none was due."""
+
+        now = time.time() if now is None else now
+        due = None
+        while self._snapshots and self._snapshots[0][0] + self.lag <= now:
+            if due is not None:
+                due[1].close()
+            due = self._snapshots.popleft()
+        if due is None:
+            return False
+        taken_at, memory = due
+        try:
+            for path in self.replicas:
+                target = sqlite3.connect(path, timeout=30)
+                try:
+                    memory.backup(target)
+                finally:
+                    target.close()
+        finally:
+            memory.close()
+        self.applied_at = taken_at
+        return True
+
+    def tick(self, now: float = None) -> bool:
+        self.snapshot(now)
+        return self.apply_due(now)
+
+    def sync_now(self) -> None:
+        """Brings the replicas up to date immediately (no lag)."""
+
+        now = time.time()
+        self.snapshot(now)
+        self.apply_due(now + self.lag)
+
+    def run(self, stop: threading.Event) -> None:
+        while not stop.wait(self.interval):
+            try:
+                self.tick()
+            except sqlite3.Error:
+                logger.exception("Replica refresh failed")
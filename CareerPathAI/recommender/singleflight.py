@@ -0,0 +1,260 @@
+"""
+Single-flight call deduplication.
+
+When several callers ask for the same key at the same time, only one of them (the
+"leader") runs the function; the others wait for it and share its result. Used to
+collapse identical concurrent GenAI prompts into one API call.
+
+- SingleFlight: threads within one process.
+- AsyncSingleFlight: coroutines on one event loop.
+- FileLockSingleFlight: across worker processes on one host, via fcntl file locks.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """In-process single flight for threads. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, func, timeout: float = None):
+        """
+        Runs func (or waits for the identical call already running) and returns its result.
+        A follower that waits longer than `timeout` gets TimeoutError; the leader is unaffected.
+        """
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"single-flight wait for {key} timed out")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """Single flight for coroutines sharing one event loop."""
+
+    def __init__(self):
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func, timeout: float = None):
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield() so a cancelled or timed-out follower doesn't cancel the leader's call.
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"single-flight wait for {key} timed out") from None
+
+        self.executed += 1
+        future = self._calls[key] = asyncio.ensure_future(func())
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._calls.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self._calls.pop(key, None))
+
+    def stats(self) -> dict:
+        return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class FileLockSingleFlight:
+    """
+    Cross-process single flight using one lock file per key.
+
+    The leader holds an exclusive flock while calling func and then writes the
+    result next to the lock. Callers that were blocked on the lock find that
+    result (newer than their own start time) and return it instead of calling
+    again. Later callers never see stale results; long-term reuse is the
+    response cache's job. Results must be JSON-serializable.
+
+    Results are only needed by the callers already waiting, so they expire after
+    `result_ttl` seconds; expired results and idle lock files are swept on later
+    calls. Results can hold user data, so the directory is private to its owner.
+    """
+
+    def __init__(self, directory: str, timeout: float = 60.0, poll_interval: float = 0.05, result_ttl: float = 10.0):
+        if fcntl is None:
+            raise RuntimeError("FileLockSingleFlight requires fcntl (POSIX).")
+        self.directory = directory
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self.executed = 0
+        self.coalesced = 0
+        self._last_sweep = 0.0
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if os.stat(directory).st_uid == os.getuid():
+            os.chmod(directory, 0o700)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def _read_result(self, key: str, since: float):
+        try:
+            with open(self._path(key, ".result"), encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return False, None
+        if stored.get("finished_at", 0) < since:
+            return False, None
+        return True, stored.get("result")
+
+    def _write_result(self, key: str, result) -> None:
+        path = self._path(key, ".result")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+            json.dump({"finished_at": time.time(), "result": result}, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _is_current(fd: int, path: str) -> bool:
+        # False once the sweep has unlinked the file this descriptor locks.
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            return False
+        locked = os.fstat(fd)
+        return (locked.st_dev, locked.st_ino) == (current.st_dev, current.st_ino)
+
+    def _sweep(self) -> None:
+        """Removes expired results and lock files no one holds (at most once per result_ttl)."""
+
+        now = time.time()
+        if now - self._last_sweep < self.result_ttl:
+            return
+        self._last_sweep = now
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.stat(path).st_mtime < self.result_ttl:
+                    continue
+                if name.endswith((".result", ".tmp")):
+                    os.unlink(path)
+                elif name.endswith(".lock"):
+                    self._unlink_idle_lock(path)
+            except OSError:
+                continue
+
+    def _unlink_idle_lock(self, path: str) -> None:
+        fd = os.open(path, os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return  # a leader is running
+        try:
+            if self._is_current(fd, path):
+                os.unlink(path)
+        finally:
+            os.close(fd)
+
+    def _acquire(self, fd: int, deadline: float) -> tuple:
+        """(acquired, waited): acquired is False once `deadline` passes."""
+
+        waited = False
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True, waited
+            except BlockingIOError:
+                waited = True
+                if time.monotonic() >= deadline:
+                    return False, waited
+                time.sleep(self.poll_interval)
+
+    def do(self, key: str, func, timeout: float = None):
+        """`timeout` overrides the instance's lock wait for this call."""
+
+        started_at = time.time()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        self._sweep()
+        path = self._path(key, ".lock")
+        waited = False
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                acquired, blocked = self._acquire(fd, deadline)
+                current = acquired and self._is_current(fd, path)
+            except BaseException:
+                os.close(fd)
+                raise
+            waited = waited or blocked
+            if current:
+                break
+            os.close(fd)  # also releases the lock
+            if not acquired:
+                # The leader is taking too long; don't let this request hang on it.
+                self.executed += 1
+                return func()
+            # The file was swept while we waited on it; lock the one that replaced it.
+
+        try:
+            if waited:
+                found, result = self._read_result(key, since=started_at)
+                if found:
+                    self.coalesced += 1
+                    return result
+            self.executed += 1
+            result = func()
+            self._write_result(key, result)
+            return result
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def stats(self) -> dict:
+        return {"executed": self.executed, "coalesced": self.coalesced}
@@ -1,3 +1,1371 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import IntegrityError, connection
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import action_plan_catalog, ai, api, breaker, dashboard_cache, jobs, metrics, profiling, ratelimit, views
+from .batch_scoring import BatchScorer
+from .db_router import PIN_COOKIE, PrimaryReplicaRouter, replica_scope
+from .db_tuning import apply_sqlite_pragmas, set_journal_mode, sqlite_pragma_values
+from .deadline import Deadline
+from .genai_stub import start_stub_server
+from .jobs import recommendation_fields, submit_recommendation
+from .loadtest.harness import compare
+from .matching import PhraseMatcher, stem
+from .microbench import find_regressions, run_benchmarks
+from .models import ActionPlan, BatchScoringRun, Questionnaire, Recommendation, RecommendationJob
+from .pagination import decode_cursor, encode_cursor
+from .purge import purge_expired_recommendations
+from .replication import ReplicationLagSimulator
+from .singleflight import FileLockSingleFlight, SingleFlight
+
+# Row counts the planner is told the tables have (via sqlite_stat1), so plans are
+# the ones SQLite would choose for a large production table.
+SIMULATED_ROWS = 2_000_000
+SIMULATED_USERS = 50_000
+
+
+def make_questionnaire(user, **overrides):
+    answers = {
+        "skills": "python",
+        "interests": "data",
+        "strengths": "analysis",
+        "preferred_work_style": "Solo",
+        "long_term_goal": "lead",
+        **overrides,
+    }
+    return Questionnaire.objects.create(user=user, **answers)
+
+
+ANSWERS = {
+    "skills": "Python, SQL",
+    "interests": "data",
+    "strengths": "analysis",
+    "preferred_work_style": "Solo",
+    "long_term_goal": "lead",
+}
+
+
+class GenAITestMixin:
+    """Configures GenAI with a key and the given cache backend, and resets the per-process clients."""
+
+    cache_backend = "memory"
+
+    def setUp(self):
+        super().setUp()
+        for name, value in {"GENAI_API_KEY": "key", "GENAI_CACHE_BACKEND": self.cache_backend}.items():
+            patcher = mock.patch.object(ai, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        ai.set_recommendation_cache(None)
+        self.addCleanup(ai.set_recommendation_cache, None)
+
+    def genai_reply(self, career="Data Engineer"):
+        return json.dumps({"recommendations": [{"career": career, "score": 9}]})
+
+
+class SharedDashboardCacheMixin:
+    """Keeps the dashboard fragments in a file-based cache: shared between processes, outside the app's database."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory}
+        settings_override = override_settings(CACHES={**settings.CACHES, "dashboard": cache})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class RecommendationCacheTests(GenAITestMixin, SimpleTestCase):
+    def test_key_ignores_case_and_spacing_but_not_the_prompt_version(self):
+        key = ai.recommendation_cache_key(ANSWERS)
+        self.assertEqual(ai.recommendation_cache_key({**ANSWERS, "skills": "  python,   sql "}), key)
+        with mock.patch.object(ai, "PROMPT_VERSION", "next"):
+            self.assertNotEqual(ai.recommendation_cache_key(ANSWERS), key)
+
+    def test_second_identical_questionnaire_is_served_from_cache(self):
+        with mock.patch.object(ai, "_call_genai", return_value=self.genai_reply()) as call:
+            first = ai.generate_career_recommendation(ANSWERS)
+            first["recommendations"][0]["career"] = "Changed by the caller"
+            second = ai.generate_career_recommendation({**ANSWERS, "skills": "python,  SQL"})
+        call.assert_called_once()
+        self.assertEqual(second["recommendations"][0]["career"], "Data Engineer")
+        self.assertEqual(ai.get_recommendation_cache().stats()["hits"], 1)
+
+    def test_heuristic_fallbacks_are_not_cached(self):
+        with mock.patch.object(ai, "_call_genai", return_value=None) as call:
+            ai.generate_career_recommendation(ANSWERS)
+            ai.generate_career_recommendation(ANSWERS)
+        self.assertEqual(call.call_count, 2)
+        self.assertEqual(ai.get_recommendation_cache().stats()["misses"], 2)
+
+
+@override_settings(
+    CACHES={
+        **settings.CACHES,
+        "genai": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "missing_cache_table"},
+    }
+)
+class DjangoRecommendationCacheTests(GenAITestMixin, TestCase):
+    cache_backend = "django"
+
+    def test_backend_errors_are_treated_as_misses(self):
+        with mock.patch.object(ai, "_call_genai", return_value=self.genai_reply()), self.assertLogs(
+            "recommender.ai", "ERROR"
+        ):
+            result = ai.generate_career_recommendation(ANSWERS)
+        self.assertEqual(result["recommendations"][0]["generation_source"], "genai")
+        self.assertEqual(ai.get_recommendation_cache().stats()["errors"], 2)
+
+
+class PooledGenAIClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = start_stub_server()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.connections = []
+        get_request = self.server.get_request
+
+        def counting_get_request():
+            self.connections.append(1)
+            return get_request()
+
+        self.server.get_request = counting_get_request
+        self.client = ai.GenAIClient(api_key="stub", endpoint=self.server.endpoint_for("stub"), pool_size=2)
+        self.addCleanup(self.client.close)
+
+    def test_calls_reuse_kept_alive_connections(self):
+        texts = [self.client.generate("prompt") for _ in range(3)]
+        self.assertEqual(json.loads(texts[0])["recommendations"][0]["career"], "Data Scientist")
+
+        def call_twice():
+            self.client.generate("prompt")
+            self.client.generate("prompt")
+
+        threads = [threading.Thread(target=call_twice) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.server.request_count, 7)
+        self.assertLessEqual(len(self.connections), 2)
+
+
+@override_settings(ASYNC_RECOMMENDATIONS=True)
+class RecommendationJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("queued", password="x")
+
+    def setUp(self):
+        self.job = submit_recommendation(make_questionnaire(self.user))
+
+    def _refresh(self):
+        self.job.refresh_from_db()
+        self.job.recommendation.refresh_from_db()
+        return self.job, self.job.recommendation
+
+    def test_failed_attempts_are_retried(self):
+        result = ai.heuristic_recommendation(ANSWERS)
+        with mock.patch.object(jobs, "generate_career_recommendation", side_effect=[RuntimeError("boom"), result]):
+            self.assertEqual(jobs.process_jobs(), 2)
+        job, rec = self._refresh()
+        self.assertEqual((job.status, job.attempts, job.last_error), (RecommendationJob.STATUS_DONE, 2, ""))
+        self.assertEqual(rec.status, Recommendation.STATUS_READY)
+
+    def test_exhausted_jobs_fail_with_the_heuristic_result(self):
+        with mock.patch.object(jobs, "generate_career_recommendation", side_effect=RuntimeError("boom")):
+            self.assertEqual(jobs.process_jobs(), jobs.JOB_MAX_ATTEMPTS)
+        job, rec = self._refresh()
+        self.assertEqual((job.status, job.last_error), (RecommendationJob.STATUS_FAILED, "RuntimeError: boom"))
+        self.assertEqual((rec.status, rec.generation_source), (Recommendation.STATUS_READY, "heuristic"))
+
+    def test_stale_jobs_are_requeued_until_their_attempts_run_out(self):
+        stale = {"status": RecommendationJob.STATUS_RUNNING, "started_at": timezone.now() - timedelta(hours=1)}
+        RecommendationJob.objects.filter(pk=self.job.pk).update(attempts=1, **stale)
+        self.assertEqual(jobs.requeue_stale_jobs(), 1)
+        self.assertEqual(self._refresh()[0].status, RecommendationJob.STATUS_QUEUED)
+
+        RecommendationJob.objects.filter(pk=self.job.pk).update(attempts=jobs.JOB_MAX_ATTEMPTS, **stale)
+        self.assertEqual(jobs.requeue_stale_jobs(), 0)
+        job, rec = self._refresh()
+        self.assertEqual(job.status, RecommendationJob.STATUS_FAILED)
+        self.assertEqual((rec.status, rec.generation_source), (Recommendation.STATUS_READY, "heuristic"))
+        self.assertEqual(jobs.process_jobs(), 0)
+
+    def test_action_plan_purged_by_another_process_is_recreated(self):
+        result = ai.heuristic_recommendation(ANSWERS)
+        with self.captureOnCommitCallbacks(execute=True):
+            stale = ActionPlan.objects.for_content(result["recommendations"][0])
+        # Deleted as an orphan elsewhere; this process still has it cached.
+        ActionPlan.objects.filter(pk=stale.pk).delete()
+        plan_ids = []
+
+        def save_outcome(job, rec):
+            plan_ids.append(rec.action_plan_id)
+            if rec.action_plan_id == stale.pk:
+                raise IntegrityError("FOREIGN KEY constraint failed")
+            save(job, rec)
+
+        save = jobs._save_outcome
+        with mock.patch.object(jobs, "generate_career_recommendation", return_value=result):
+            with mock.patch.object(jobs, "_save_outcome", side_effect=save_outcome):
+                self.assertEqual(jobs.process_jobs(), 1)
+        job, rec = self._refresh()
+        self.assertEqual((job.status, plan_ids[0]), (RecommendationJob.STATUS_DONE, stale.pk))
+        self.assertNotEqual(rec.action_plan_id, stale.pk)
+        self.assertEqual(rec.getting_started, result["recommendations"][0]["getting_started"])
+
+
+@mock.patch.object(views, "SSE_POLL_INTERVAL", 0)
+class RecommendationStatusStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("streamed", password="x")
+        cls.rec = Recommendation.objects.create(
+            questionnaire=make_questionnaire(cls.user),
+            career_name=jobs.PENDING_CAREER_NAME,
+            score=0,
+            status=Recommendation.STATUS_PENDING,
+        )
+
+    async def _events(self, between_polls):
+        request = AsyncRequestFactory().get(f"/recommendation/{self.rec.pk}/status/stream/")
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        response = await views.recommendation_status_stream(request, pk=self.rec.pk)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = []
+        async for chunk in response.streaming_content:
+            events.append(chunk.decode().split("\n")[0])
+            await sync_to_async(between_polls)()
+        return events
+
+    async def test_stream_ends_once_the_recommendation_is_ready(self):
+        def finish():
+            Recommendation.objects.filter(pk=self.rec.pk).update(status=Recommendation.STATUS_READY)
+
+        self.assertEqual(await self._events(finish), ["event: status", "event: status"])
+
+    async def test_stream_ends_cleanly_when_the_recommendation_is_gone(self):
+        def purge():
+            Recommendation.objects.filter(pk=self.rec.pk).delete()
+
+        self.assertEqual(await self._events(purge), ["event: status", "event: gone"])
+
+
+class AsyncQuestionnaireTests(GenAITestMixin, TestCase):
+    cache_backend = "none"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("awaited", password="x")
+
+    async def _submit(self):
+        request = AsyncRequestFactory().post(reverse("questionnaire"), ANSWERS)
+        request.user = self.user
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        return await views.questionnaire_async(request)
+
+    async def test_async_view_uses_the_async_genai_client(self):
+        server = start_stub_server()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = ai.AsyncGenAIClient(api_key="stub", endpoint=server.endpoint_for("stub"))
+        ai.set_async_genai_client(client)
+        try:
+            with mock.patch.object(ai, "_call_genai") as sync_call:
+                response = await self._submit()
+        finally:
+            ai.set_async_genai_client(None)
+            await client.aclose()
+        sync_call.assert_not_called()
+        self.assertEqual((response.status_code, response.url), (302, reverse("dashboard")))
+        self.assertIn("llm_call;dur=", response["Server-Timing"])
+        rec = await Recommendation.objects.aget(user=self.user)
+        self.assertEqual((rec.career_name, rec.generation_source), ("Data Scientist", "genai"))
+        self.assertEqual(server.request_count, 1)
+
+    async def test_async_and_sync_pipelines_agree(self):
+        with mock.patch.object(ai, "GENAI_API_KEY", None):
+            self.assertEqual(
+                await ai.agenerate_career_recommendation(ANSWERS), ai.generate_career_recommendation(ANSWERS)
+            )
+
+
+class HeuristicRecommendationTests(SimpleTestCase):
+    # What the original hand-written any_token cascade returned for these answers.
+    EXPECTED = [
+        (
+            {**ANSWERS, "skills": "Python, SQL, machine learning"},
+            [("Data Scientist", 9), ("Machine Learning Engineer", 8), ("Business Analyst / Strategy Analyst", 7)],
+        ),
+        (
+            {
+                "skills": "drawing, figma",
+                "interests": "design and marketing",
+                "strengths": "communication",
+                "preferred_work_style": "Team",
+                "long_term_goal": "start a business",
+            },
+            [
+                ("AI Solutions / Sales Engineer", 7),
+                ("Business Analyst / Strategy Analyst", 7),
+                ("AI UX Designer / Researcher", 7),
+            ],
+        ),
+        ({}, [("AI Product Specialist", 7), ("Technical Writer (AI)", 7), ("AI Project Coordinator", 7)]),
+    ]
+
+    def test_output_is_pinned(self):
+        for answers, expected in self.EXPECTED:
+            with self.subTest(answers=answers):
+                recommendations = ai.heuristic_recommendation(answers)["recommendations"]
+                self.assertEqual([(item["career"], item["score"]) for item in recommendations], expected)
+                self.assertEqual(
+                    {(item["generation_source"], item["model_name"], item["prompt_version"]) for item in recommendations},
+                    {("heuristic", "local", ai.PROMPT_VERSION)},
+                )
+                self.assertTrue(all(item["getting_started"] for item in recommendations))
+
+    def test_matches_the_result_without_a_key(self):
+        with mock.patch.object(ai, "GENAI_API_KEY", None):
+            self.assertEqual(ai.generate_career_recommendation(ANSWERS), ai.heuristic_recommendation(ANSWERS))
+
+
+class PhraseMatcherTests(SimpleTestCase):
+    def test_phrases_and_stems_match_with_their_source(self):
+        matcher = PhraseMatcher(["machine learning", "learning", "model", "c++", "design"])
+        matches = matcher.first_matches({"skills": "C++ and Machine-Learning models", "interests": "designing things"})
+        self.assertEqual(list(matches), ["c++", "machine learning", "learning", "model", "design"])
+        self.assertEqual(matches["machine learning"].text, "Machine-Learning")
+        self.assertEqual((matches["design"].field, matches["design"].text), ("interests", "designing"))
+        self.assertEqual(len(list(matcher.iter_matches({"skills": "learning, more learning"}))), 2)
+
+    def test_stems_keep_distinct_words_apart(self):
+        stems = [stem(word) for word in ("models", "studies", "planned", "planning")]
+        self.assertEqual(stems, ["model", "study", "plann", "plann"])
+        self.assertNotEqual(stem("programming"), stem("program"))
+
+    def test_reasons_cite_the_triggering_answer(self):
+        answers = HeuristicRecommendationTests.EXPECTED[0][0]
+        reasons = [item["reason"] for item in ai.heuristic_recommendation(answers)["recommendations"]]
+        self.assertEqual(
+            reasons,
+            [
+                'Strong data interest detected. Based on "data" in your interests.',
+                'Machine learning keywords found. Based on "machine learning" in your skills.',
+                'Business/strategy focus detected. Based on "analysis" in your strengths.',
+            ],
+        )
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = os.path.join(tempfile.mkdtemp(), "flights")
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.directory))
+
+    def test_threads_share_one_call(self):
+        flight, calls, release = SingleFlight(), [], threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(3)]
+        threads[0].start()
+        while not calls:
+            time.sleep(0.001)
+        for thread in threads[1:]:
+            thread.start()
+        while flight.coalesced < 2:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((len(calls), results), (1, ["result"] * 3))
+
+    def test_processes_share_one_call_through_private_files(self):
+        # One instance per simulated worker process.
+        leader, follower = FileLockSingleFlight(self.directory), FileLockSingleFlight(self.directory)
+        started, results = threading.Event(), []
+
+        def slow():
+            started.set()
+            time.sleep(0.2)
+            return {"text": "result"}
+
+        thread = threading.Thread(target=lambda: results.append(leader.do("key", slow)))
+        thread.start()
+        started.wait(5)
+        results.append(follower.do("key", lambda: self.fail("the follower should reuse the leader's result")))
+        thread.join()
+        self.assertEqual(results, [{"text": "result"}] * 2)
+        self.assertEqual(os.stat(self.directory).st_mode & 0o777, 0o700)
+        for name in os.listdir(self.directory):
+            self.assertEqual(os.stat(os.path.join(self.directory, name)).st_mode & 0o777, 0o600, name)
+
+    def test_expired_results_and_idle_locks_are_swept(self):
+        flight = FileLockSingleFlight(self.directory, result_ttl=10)
+        flight.do("old", lambda: "result")
+        self.assertEqual(sorted(os.listdir(self.directory)), ["old.lock", "old.result"])
+        for name in os.listdir(self.directory):
+            os.utime(os.path.join(self.directory, name), (0, 0))
+
+        flight._last_sweep = 0.0
+        self.assertEqual(flight.do("new", lambda: "other"), "other")
+        self.assertEqual(sorted(os.listdir(self.directory)), ["new.lock", "new.result"])
+
+
+class FakeClock:
+    """Stands in for the time module: sleeping advances the clock instead of blocking."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(ratelimit, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_buckets_refill_at_the_configured_rate(self):
+        limiter = ratelimit.RateLimiter(requests_per_minute=60, tokens_per_minute=1200)
+        self.assertEqual([limiter.reserve(100) for _ in range(12)], [0.0] * 12)
+        self.assertAlmostEqual(limiter.reserve(100), 5.0)  # the token bucket is empty; 20 tokens/s
+        self.clock.now += 2.5
+        self.assertAlmostEqual(limiter.reserve(100), 2.5)
+        self.clock.now += 2.5
+        self.assertEqual(limiter.reserve(100), 0.0)
+
+    def test_acquire_waits_within_max_wait_only(self):
+        limiter = ratelimit.RateLimiter(requests_per_minute=1, tokens_per_minute=0)
+        self.assertEqual(limiter.acquire(1, max_wait=0), (True, False))
+        self.assertEqual(limiter.acquire(1, max_wait=30), (False, True))
+        started = self.clock.now
+        self.assertEqual(limiter.acquire(1, max_wait=60), (True, True))
+        self.assertAlmostEqual(self.clock.now - started, 60)
+
+    def test_pause_is_shared_through_the_file_store(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "buckets.json")
+        first, second = (ratelimit.RateLimiter(60, 0, ratelimit.FileBucketStore(path)) for _ in range(2))
+        first.pause(5)
+        self.assertAlmostEqual(second.reserve(1), 5.0)
+        self.clock.now += 5
+        self.assertEqual(second.reserve(1), 0.0)
+
+    def test_retry_after_and_backoff(self):
+        self.assertEqual(ratelimit.parse_retry_after("3"), 3.0)
+        self.assertAlmostEqual(ratelimit.parse_retry_after("Thu, 01 Jan 1970 00:16:50 GMT"), 10.0)
+        self.assertIsNone(ratelimit.parse_retry_after("soon"))
+        for attempt in range(5):
+            self.assertLessEqual(ratelimit.backoff_delay(attempt, 0.5, 8), 8)
+            self.assertGreaterEqual(ratelimit.backoff_delay(attempt, 0.5, 8, retry_after=3), 3)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(breaker, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = breaker.CircuitBreaker(window=60, min_calls=3, error_rate=0.5, cooldown=30)
+
+    def _open(self):
+        for _ in range(3):
+            self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+
+    def test_closed_open_half_open_closed(self):
+        self.breaker.record(True, 0.1)
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+        self._open()
+        with self.assertRaises(breaker.CircuitOpenError):
+            self.breaker.check()
+
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, breaker.HALF_OPEN)
+        self.assertTrue(self.breaker.check())
+        self.assertFalse(self.breaker.allow())  # one probe at a time
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+        self.assertFalse(self.breaker.check())
+
+    def test_failed_probe_reopens(self):
+        self._open()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.check())
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, breaker.OPEN)
+
+    def test_probe_without_a_verdict_frees_its_slot(self):
+        server = start_stub_server(rate_limit_rate=1)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        patches = {
+            "genai_breaker": self.breaker,
+            "GENAI_API_KEY": "key",
+            "GENAI_MAX_RETRIES": 0,
+            "GENAI_SINGLEFLIGHT": "none",
+        }
+        for name, value in patches.items():
+            patcher = mock.patch.object(ai, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        ai.set_genai_client(ai.GenAIClient(endpoint=server.endpoint_for("stub")))
+        self.addCleanup(ai.set_genai_client, None)
+        ai.set_rate_limiter(None)
+        self.addCleanup(ai.set_rate_limiter, None)
+
+        self._open()
+        self.clock.now += 30
+        self.assertIsNone(ai._call_genai("prompt"))  # the probe got a 429
+        self.assertEqual(server.outcomes["rate_limited"], 1)
+        self.assertEqual(self.breaker.state, breaker.HALF_OPEN)
+
+        server.rate_limit_rate = 0
+        self.assertIsNotNone(ai._call_genai("prompt"))
+        self.assertEqual(self.breaker.state, breaker.CLOSED)
+
+    def test_async_probe_without_a_verdict_frees_its_slot(self):
+        self._open()
+        self.clock.now += 30
+        with mock.patch.object(ai, "genai_breaker", self.breaker), mock.patch.object(ai, "GENAI_API_KEY", "key"):
+            with mock.patch.object(ai, "_acoalesced_call", return_value=None):
+                asyncio.run(ai._acall_genai("prompt"))
+        self.assertTrue(self.breaker.allow())
+
+
+class DeadlineTests(GenAITestMixin, TestCase):
+    cache_backend = "none"
+
+    def setUp(self):
+        super().setUp()
+        self.server = start_stub_server(latency=1.0)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        ai.set_genai_client(ai.GenAIClient(endpoint=self.server.endpoint_for("stub")))
+        self.addCleanup(ai.set_genai_client, None)
+
+    def test_expired_deadline_skips_genai(self):
+        skipped = ai.genai_call_stats()["deadline_exceeded"]
+        result = ai.generate_career_recommendation(ANSWERS, Deadline(0))
+        self.assertEqual(result, ai.heuristic_recommendation(ANSWERS))
+        self.assertEqual(self.server.request_count, 0)
+        self.assertEqual(ai.genai_call_stats()["deadline_exceeded"], skipped + 1)
+
+    def test_call_timeouts_come_from_the_remaining_budget(self):
+        connect, read = ai._attempt_timeouts((5.0, 30.0), Deadline(1.0))
+        self.assertLessEqual(read, 1.0 - ai.GENAI_DEADLINE_RESERVE)
+        self.assertLessEqual(connect, read)
+
+    @override_settings(QUESTIONNAIRE_BUDGET=0.6)
+    def test_slow_genai_call_is_cut_off_within_the_budget(self):
+        user = User.objects.create_user("hurried", password="x")
+        self.client.force_login(user)
+        started = time.monotonic()
+        response = self.client.post(reverse("questionnaire"), ANSWERS)
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+        self.assertIn("llm_call;dur=", response["Server-Timing"])
+        self.assertEqual(Recommendation.objects.get(user=user).generation_source, "heuristic")
+
+
+class RecycleBinPurgeTests(SharedDashboardCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("binned", password="x")
+        questionnaire = make_questionnaire(cls.user)
+        now = timezone.now()
+        for days in (40, 40, 35, 31, 31, 5):
+            Recommendation.objects.create(
+                questionnaire=questionnaire, career_name="Old", score=5, deleted_at=now - timedelta(days=days)
+            )
+        Recommendation.objects.create(questionnaire=questionnaire, career_name="Kept", score=5)
+
+    def test_dashboard_no_longer_purges(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("dashboard"))
+        self.assertEqual(Recommendation.objects.count(), 7)
+
+    def test_purges_expired_items_in_batches(self):
+        self.assertEqual(purge_expired_recommendations(retention_days=30, dry_run=True).purged, 5)
+        generation = dashboard_cache.get_generation(self.user.pk)
+        result = purge_expired_recommendations(retention_days=30, batch_size=2, pause=0)
+        self.assertEqual((result.purged, result.batches), (5, 3))
+        self.assertEqual(sorted(Recommendation.objects.values_list("career_name", flat=True)), ["Kept", "Old"])
+        self.assertNotEqual(dashboard_cache.get_generation(self.user.pk), generation)
+
+    def test_purges_action_plans_left_without_recommendations(self):
+        ActionPlan.objects.clear_cache()
+        questionnaire = make_questionnaire(self.user)
+        shared = {"career": "Analyst", "getting_started": ["Learn SQL"]}
+        with self.captureOnCommitCallbacks(execute=True):
+            last = Recommendation.objects.create(
+                questionnaire=questionnaire, **recommendation_fields({"career": "Writer", "getting_started": ["Write"]})
+            )
+            kept = Recommendation.objects.create(questionnaire=questionnaire, **recommendation_fields(shared))
+            Recommendation.objects.create(questionnaire=questionnaire, **recommendation_fields(shared)).soft_delete()
+        Recommendation.objects.filter(pk=last.pk).update(deleted_at=timezone.now() - timedelta(days=40))
+
+        self.assertEqual(purge_expired_recommendations(retention_days=30, dry_run=True).plans_purged, 0)
+        result = purge_expired_recommendations(retention_days=30, pause=0)
+        self.assertEqual((result.purged, result.plans_purged), (6, 1))
+        self.assertEqual(list(ActionPlan.objects.values_list("pk", flat=True)), [kept.action_plan_id])
+        with self.captureOnCommitCallbacks(execute=True):
+            replacement = ActionPlan.objects.for_content({"getting_started": ["Write"]})
+        self.assertNotEqual(replacement.pk, last.action_plan_id)
+        self.assertIn("and 1 orphaned action plan(s)", str(result))
+
+
+@skipUnless(connection.vendor == "sqlite", "query plans are checked with SQLite's EXPLAIN QUERY PLAN")
+class RecommendationQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("planner", password="x")
+        questionnaire = make_questionnaire(cls.user)
+        cls.rec = Recommendation.objects.create(questionnaire=questionnaire, career_name="Data Analyst", score=8, explanation="")
+        Recommendation.objects.create(
+            questionnaire=questionnaire,
+            career_name="Data Engineer",
+            score=7,
+            explanation="",
+            deleted_at=timezone.now() - timedelta(days=1),
+        )
+
+    def setUp(self):
+        caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+        self._simulate_large_tables()
+        self.client.force_login(self.user)
+
+    def _simulate_large_tables(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+            cursor.execute("SELECT tbl, idx FROM sqlite_stat1 WHERE tbl LIKE 'recommender_%%'")
+            for table, index in cursor.fetchall():
+                if index is None:
+                    stat = str(SIMULATED_ROWS)
+                else:
+                    # "<rows> <rows per first column value> 1 ...": user columns are selective, the rest unique.
+                    cursor.execute(f'PRAGMA index_info("{index}")')
+                    columns = [row[2] for row in cursor.fetchall()]
+                    per_value = [SIMULATED_ROWS // SIMULATED_USERS if column == "user_id" else 1 for column in columns]
+                    stat = " ".join(str(n) for n in [SIMULATED_ROWS, *per_value])
+                cursor.execute("UPDATE sqlite_stat1 SET stat = %s WHERE tbl = %s AND idx IS %s", [stat, table, index])
+            # Makes SQLite reload the statistics.
+            cursor.execute("ANALYZE sqlite_schema")
+
+    def _plans(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query["sql"]
+                if 'FROM "recommender_recommendation"' not in sql:
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plans[sql] = "\n".join(row[-1] for row in cursor.fetchall())
+        return response, plans
+
+    def assertNoJoinOrSort(self, plans):
+        self.assertTrue(plans)
+        for sql, plan in plans.items():
+            self.assertNotIn("recommender_questionnaire", plan, sql)
+            self.assertNotIn("TEMP B-TREE", plan, sql)
+            self.assertNotRegex(plan, r"SCAN recommender_recommendation(?! USING)", sql)
+
+    def test_dashboard_uses_user_indexes(self):
+        response, plans = self._plans(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNoJoinOrSort(plans)
+        combined = "\n".join(plans.values())
+        self.assertIn("rec_user_active_idx", combined)
+        self.assertIn("rec_user_deleted_idx", combined)
+
+    def test_dashboard_older_pages_use_user_indexes(self):
+        cursor = encode_cursor(timezone.now(), 10**6)
+        response, plans = self._plans(f"{reverse('dashboard')}?after={cursor}&bin_after={cursor}")
+        self.assertEqual(response.status_code, 200)
+        self.assertNoJoinOrSort(plans)
+        self.assertNotIn("OFFSET", "\n".join(plans))
+
+    def test_detail_is_a_primary_key_lookup(self):
+        response, plans = self._plans(reverse("recommendation_detail", args=[self.rec.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNoJoinOrSort(plans)
+        self.assertIn("INTEGER PRIMARY KEY", "\n".join(plans.values()))
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite tuning")
+class SQLiteTuningTests(TestCase):
+    def test_pragmas_are_applied_to_new_connections(self):
+        expected = {name: settings.SQLITE_PRAGMAS[name] for name in ("busy_timeout", "cache_size")}
+        self.assertEqual(sqlite_pragma_values(connection, list(expected)), expected)
+
+    def test_journal_mode_is_set_once_on_the_file_not_per_connection(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        scratch = ConnectionHandler({"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(directory, "db")}})[
+            "default"
+        ]
+        self.addCleanup(scratch.close)
+        # Connecting runs the tuning hook, which leaves the file's journal mode alone.
+        values = sqlite_pragma_values(scratch, ["journal_mode", "synchronous"])
+        self.assertEqual(values, {"journal_mode": "delete", "synchronous": 1})
+        self.assertEqual(set_journal_mode(scratch, "WAL"), "wal")
+        scratch.close()
+        self.assertEqual(sqlite_pragma_values(scratch, ["journal_mode"]), {"journal_mode": "wal"})
+
+    def test_rejects_unknown_pragmas_and_values(self):
+        for pragmas in ({"journal_mode": "WAL; DROP TABLE auth_user"}, {"writable_schema": "ON"}):
+            with self.assertRaises(ValueError):
+                apply_sqlite_pragmas(connection, pragmas)
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("routed", password="x")
+        questionnaire = make_questionnaire(cls.user)
+        cls.rec = Recommendation.objects.create(questionnaire=questionnaire, career_name="Data Analyst", score=8, explanation="")
+
+    def test_reads_use_a_replica_only_in_scope_and_until_a_write(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Recommendation), "default")
+        with replica_scope():
+            self.assertEqual(router.db_for_read(Recommendation), "replica1")
+            self.assertEqual(router.db_for_write(Recommendation), "default")
+            self.assertEqual(router.db_for_read(Recommendation), "default")
+        self.assertFalse(router.allow_migrate("replica1", "recommender"))
+
+    def test_write_pins_the_browser_to_the_primary(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse("delete_recommendation", args=[self.rec.pk]))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], 10)
+        # Pinned: the dashboard reads from the primary (there is no replica1 connection here).
+        self.assertEqual(self.client.get(reverse("dashboard")).status_code, 200)
+
+    def test_reads_do_not_pin(self):
+        self.client.force_login(self.user)
+        self.client.cookies[PIN_COOKIE] = "4102444800"
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+class ReplicationLagSimulatorTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.primary = os.path.join(directory.name, "primary.sqlite3")
+        self.replica = os.path.join(directory.name, "replica.sqlite3")
+        self._execute(self.primary, "CREATE TABLE item (name TEXT)")
+
+    def _execute(self, path, sql):
+        db = sqlite3.connect(path)
+        try:
+            with db:
+                return db.execute(sql).fetchall()
+        finally:
+            db.close()
+
+    def test_replica_trails_the_primary_by_the_lag(self):
+        simulator = ReplicationLagSimulator(self.primary, [self.replica], lag=2.0)
+        simulator.sync_now()
+        self._execute(self.primary, "INSERT INTO item VALUES ('new')")
+        self.assertFalse(simulator.tick(now=100.0))
+        self.assertFalse(simulator.tick(now=101.0))
+        self.assertEqual(self._execute(self.replica, "SELECT name FROM item"), [])
+        self.assertTrue(simulator.tick(now=102.0))
+        self.assertEqual(self._execute(self.replica, "SELECT name FROM item"), [("new",)])
+        self.assertEqual(simulator.applied_at, 100.0)
+
+
+class DashboardPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("pager", password="x")
+        questionnaire = make_questionnaire(cls.user)
+        created_at = timezone.now()
+        recs = [
+            Recommendation.objects.create(questionnaire=questionnaire, career_name=f"Career {i}", score=5, explanation="")
+            for i in range(12)
+        ]
+        # Some rows share a timestamp so the id tiebreak is exercised.
+        for i, rec in enumerate(recs):
+            Recommendation.objects.filter(pk=rec.pk).update(created_at=created_at - timedelta(minutes=i // 2))
+
+    def setUp(self):
+        caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+        self.client.force_login(self.user)
+
+    def test_walks_pages_both_ways(self):
+        expected = list(
+            Recommendation.objects.filter(user=self.user).order_by("-created_at", "-pk").values_list("pk", flat=True)
+        )
+        url, pages = reverse("dashboard"), []
+        while url:
+            page = self.client.get(url).context["recommendations"]
+            pages.append([rec.pk for rec in page])
+            url = page.next_url
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+
+        url = page.previous_url
+        back = []
+        while url:
+            page = self.client.get(url).context["recommendations"]
+            back.append([rec.pk for rec in page])
+            url = page.previous_url
+        self.assertEqual(back, pages[-2::-1])
+
+    def test_malformed_cursor_is_ignored(self):
+        self.assertIsNone(decode_cursor("not-a-cursor"))
+        response = self.client.get(f"{reverse('dashboard')}?after=not-a-cursor")
+        self.assertEqual(len(response.context["recommendations"]), 5)
+
+
+class DashboardCacheTests(SharedDashboardCacheMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cached", password="x")
+        questionnaire = make_questionnaire(cls.user)
+        cls.rec = Recommendation.objects.create(questionnaire=questionnaire, career_name="Data Analyst", score=8, explanation="")
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def _recommendation_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [q for q in ctx.captured_queries if "recommender_recommendation" in q["sql"]]
+
+    def test_unchanged_dashboard_renders_from_cache(self):
+        before = dashboard_cache.dashboard_cache_stats()
+        _, queries = self._recommendation_queries(reverse("dashboard"))
+        self.assertTrue(queries)
+        response, queries = self._recommendation_queries(reverse("dashboard"))
+        self.assertEqual(queries, [])
+        self.assertContains(response, "Data Analyst")
+        after = dashboard_cache.dashboard_cache_stats()
+        self.assertEqual(after["hits"] - before["hits"], 2)
+        self.assertEqual(after["misses"] - before["misses"], 2)
+
+    def test_delete_invalidates_cached_dashboard(self):
+        self.client.get(reverse("dashboard"))
+        invalidations = dashboard_cache.dashboard_cache_stats()["invalidations"]
+        self.client.post(reverse("delete_recommendation", args=[self.rec.pk]))
+        self.assertEqual(dashboard_cache.dashboard_cache_stats()["invalidations"], invalidations + 1)
+
+        response, queries = self._recommendation_queries(reverse("dashboard"))
+        self.assertTrue(queries)
+        self.assertContains(response, "No recommendations yet")
+        self.assertContains(response, "Restore")
+
+    @override_settings(ASYNC_RECOMMENDATIONS=True)
+    def test_finished_job_shows_on_the_cached_dashboard(self):
+        self.client.post(reverse("questionnaire"), ANSWERS)
+        self.assertContains(self.client.get(reverse("dashboard")), jobs.PENDING_CAREER_NAME)
+        with mock.patch.object(ai, "GENAI_API_KEY", None):
+            self.assertEqual(jobs.process_jobs(), 1)
+        response, queries = self._recommendation_queries(reverse("dashboard"))
+        self.assertTrue(queries)
+        self.assertNotContains(response, jobs.PENDING_CAREER_NAME)
+        self.assertContains(response, "Data Scientist")
+
+    def test_dashboard_gets_never_write_to_the_database(self):
+        for _ in range(2):  # a miss, then a hit
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(reverse("dashboard"))
+            writes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))]
+            self.assertEqual(writes, [])
+
+    def test_per_process_and_app_database_backends_turn_the_cache_off(self):
+        for backend, warning in (
+            ("django.core.cache.backends.locmem.LocMemCache", "recommender.W001"),
+            ("django.core.cache.backends.db.DatabaseCache", "recommender.W002"),
+        ):
+            with self.subTest(backend), override_settings(
+                CACHES={**settings.CACHES, "dashboard": {"BACKEND": backend, "LOCATION": "dashboard_fragments"}}
+            ):
+                self.assertEqual([error.id for error in dashboard_cache.check_shared_backend(None)], [warning])
+                for _ in range(2):
+                    _, queries = self._recommendation_queries(reverse("dashboard"))
+                    self.assertTrue(queries)
+
+    @override_settings(CACHES={**settings.CACHES, "dashboard": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+    def test_no_shared_cache_configured_renders_uncached_without_warning(self):
+        self.assertEqual(dashboard_cache.check_shared_backend(None), [])
+        self.assertFalse(dashboard_cache.enabled())
+        for _ in range(2):
+            _, queries = self._recommendation_queries(reverse("dashboard"))
+            self.assertTrue(queries)
+
+
+class RecommendationDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reader", password="x")
+        cls.questionnaire = make_questionnaire(cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_structured_details_are_rendered_without_parsing(self):
+        rec = Recommendation.objects.create(
+            questionnaire=self.questionnaire,
+            career_name="Data Analyst",
+            score=8,
+            explanation="Why: stale text",
+            details={"why": "First line\nBenefits: not a header", "benefits": "", "opportunities": "", "sub_paths": ["BI"]},
+        )
+        with mock.patch("recommender.views._parse_explanation") as parse:
+            response = self.client.get(reverse("recommendation_detail", args=[rec.pk]))
+        parse.assert_not_called()
+        self.assertContains(response, "First line<br>Benefits: not a header")
+        self.assertNotContains(response, "stale text")
+
+    def test_legacy_rows_fall_back_to_parsing_explanation(self):
+        rec = Recommendation.objects.create(
+            questionnaire=self.questionnaire,
+            career_name="Data Analyst",
+            score=8,
+            explanation="Why: legacy reason\nRelated sub-paths: BI, Reporting",
+        )
+        response = self.client.get(reverse("recommendation_detail", args=[rec.pk]))
+        self.assertEqual(response.context["details"]["sub_paths"], ["BI", "Reporting"])
+        self.assertContains(response, "legacy reason")
+
+
+class ActionPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("planned", password="x")
+        cls.questionnaire = make_questionnaire(cls.user)
+
+    def setUp(self):
+        ActionPlan.objects.clear_cache()
+        self.client.force_login(self.user)
+
+    def _create(self, item):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Recommendation.objects.create(questionnaire=self.questionnaire, **recommendation_fields(item))
+
+    def test_identical_plans_are_stored_once(self):
+        item = {"career": "Data Analyst", "getting_started": ["Learn SQL"], "resources": [{"title": "Docs", "url": ""}]}
+        first, second = self._create(item), self._create(dict(item))
+        other = self._create({**item, "how_to_apply": ["Apply"]})
+        self.assertEqual(first.action_plan_id, second.action_plan_id)
+        self.assertNotEqual(first.action_plan_id, other.action_plan_id)
+        self.assertEqual(ActionPlan.objects.count(), 2)
+        self.assertIsNone(self._create({"career": "Empty"}).action_plan_id)
+
+    def test_detail_reads_hot_plans_without_querying_them(self):
+        rec = self._create({"career": "Data Analyst", "getting_started": ["Learn SQL"]})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("recommendation_detail", args=[rec.pk]))
+        self.assertContains(response, "Learn SQL")
+        self.assertFalse([q for q in ctx.captured_queries if "recommender_actionplan" in q["sql"]])
+
+
+class ActionPlanCatalogTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self._write(["Learn SQL"])
+        for name, value in {"ACTION_PLAN_CATALOG": self.path, "ACTION_PLAN_CATALOG_CHECK_INTERVAL": 0, "_catalog": None}.items():
+            patcher = mock.patch.object(action_plan_catalog, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _write(self, getting_started, mtime=None):
+        data = {
+            "default": "generic",
+            "names": {"Data Analyst": "data"},
+            "aliases": [{"all": ["data"], "any": ["engineer"], "plan": "data"}],
+            "plans": {"generic": {"getting_started": ["Explore"]}, "data": {"getting_started": getting_started}},
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data) if getting_started is not None else "{not json")
+        if mtime is not None:
+            os.utime(self.path, ns=(mtime, mtime))
+
+    def test_lookup_by_name_alias_and_default(self):
+        self.assertEqual(action_plan_catalog.action_plan_for("data analyst")["getting_started"], ["Learn SQL"])
+        self.assertEqual(action_plan_catalog.action_plan_for("Big Data Engineer")["getting_started"], ["Learn SQL"])
+        self.assertEqual(action_plan_catalog.action_plan_for("Chef")["getting_started"], ["Explore"])
+
+    def test_plans_are_read_only_and_copies_are_independent(self):
+        with self.assertRaises(TypeError):
+            action_plan_catalog.action_plan_view("Data Analyst")["resources"] = []
+        action_plan_catalog.action_plan_for("Data Analyst")["getting_started"].append("Changed")
+        self.assertEqual(action_plan_catalog.action_plan_for("Data Analyst")["getting_started"], ["Learn SQL"])
+
+    def test_changed_file_is_reloaded_and_broken_file_ignored(self):
+        action_plan_catalog.get_catalog()
+        self._write(["Learn dbt"], mtime=10**18)
+        self.assertEqual(action_plan_catalog.action_plan_for("Data Analyst")["getting_started"], ["Learn dbt"])
+        self._write(None, mtime=2 * 10**18)
+        self.assertEqual(action_plan_catalog.action_plan_for("Data Analyst")["getting_started"], ["Learn dbt"])
+
+
+class BatchScoringTests(TestCase):
+    def setUp(self):
+        User.objects.create_user("student", password="x")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cohort.jsonl")
+        row = {
+            "username": "student",
+            "skills": "python sql",
+            "interests": "data",
+            "strengths": "analysis",
+            "preferred_work_style": "Solo",
+            "long_term_goal": "lead",
+        }
+        with open(self.path, "w", encoding="utf-8") as f:
+            for line in [row, {**row, "preferred_work_style": "Never"}, row, "not json", {**row, "username": "nobody"}, row]:
+                f.write((json.dumps(line) if isinstance(line, dict) else line) + "\n")
+
+    def _score(self):
+        return BatchScorer(self.path, batch_size=2, workers=1).run()
+
+    def test_scores_valid_rows_and_skips_the_rest(self):
+        report = self._score()
+        self.assertEqual((report.rows, report.scored, report.skipped), (6, 3, 3))
+        self.assertEqual(Recommendation.objects.filter(user__username="student").count(), 3)
+        self.assertEqual(self._score().rows, 0)
+
+    def test_resumes_after_the_last_committed_batch(self):
+        original = BatchScorer._write
+        calls = []
+
+        def crash_on_second_batch(scorer, *args):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("crash")
+            return original(scorer, *args)
+
+        with mock.patch.object(BatchScorer, "_write", crash_on_second_batch), self.assertRaises(RuntimeError):
+            self._score()
+        self.assertEqual(BatchScoringRun.objects.get().rows_done, 2)
+
+        report = self._score()
+        self.assertEqual((report.resumed_from, report.rows), (2, 4))
+        self.assertEqual(Questionnaire.objects.count(), 3)
+        self.assertEqual(Recommendation.objects.count(), 3)
+
+
+@override_settings(METRICS_TOKEN="s3cret")
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("scraped", password="x")
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def _scrape(self, **headers):
+        response = self.client.get(reverse("metrics"), headers={"Authorization": "Bearer s3cret", **headers})
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_requests_are_timed_and_their_queries_counted_by_view(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("dashboard"))
+        text = self._scrape()
+        self.assertIn('http_request_duration_seconds_count{view="dashboard",method="GET",status="200"} 1', text)
+        self.assertIn('http_request_duration_seconds_bucket{view="dashboard",method="GET",status="200",le="+Inf"} 1', text)
+        queries = next(line for line in text.splitlines() if line.startswith('http_request_db_queries_sum{view="dashboard"}'))
+        self.assertGreater(float(queries.split()[-1]), 0)
+
+    def test_scrape_sums_every_process_and_labels_genai_outcomes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = {"recommendations_generated_total": [[["genai"], [2.0]]]}
+        with open(os.path.join(directory, "1-other.json"), "w") as f:
+            json.dump(other, f)
+
+        answers = {"skills": "python", "interests": "data"}
+        with override_settings(METRICS_DIR=directory), mock.patch.object(ai, "GENAI_API_KEY", "key"), mock.patch.object(
+            ai, "GENAI_CACHE_BACKEND", "none"
+        ):
+            for reply in ("not json", '{"recommendations": []}', json.dumps({"recommendations": [{"career": "Chef"}]})):
+                with mock.patch.object(ai, "_call_genai", return_value=reply):
+                    ai.generate_career_recommendation(answers)
+            text = self._scrape()
+        for outcome in ("json_error", "empty", "success"):
+            self.assertIn(f'genai_call_duration_seconds_count{{outcome="{outcome}"}} 1', text)
+        self.assertIn('recommendations_generated_total{source="genai"} 3', text)
+        self.assertIn('recommendations_generated_total{source="heuristic"} 2', text)
+
+    def test_client_failures_are_labelled(self):
+        self.assertEqual(ai._response_text(503, dict), (None, "http_error"))
+        self.assertEqual(ai._response_text(200, lambda: json.loads("<html>")), (None, "json_error"))
+        self.assertEqual(ai._response_text(200, dict), (None, "empty"))
+
+    def test_scrapes_need_the_token_or_a_staff_login(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, headers={"Authorization": "Bearer wrong"}).status_code, 401)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertIn("# TYPE genai_call_duration_seconds histogram", self._scrape())
+
+        self.client.force_login(User.objects.create_user("operator", password="x", is_staff=True))
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.client.logout()
+            self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_unknown_methods_share_one_label(self):
+        self.client.generic("BREW", reverse("landing"))
+        text = self._scrape()
+        self.assertIn('method="other"', text)
+        self.assertNotIn("BREW", text)
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("profiler", password="x", is_staff=True)
+        cls.student = User.objects.create_user("profiled", password="x")
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=directory, PROFILING_SLOW_QUERY_MS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # The test connection was opened before profiling was switched on.
+        profiling._on_connection_created(None, connection)
+
+    def test_staff_header_profiles_the_request(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse("dashboard"), headers={"X-Profile": "1"})
+        profile = profiling.load_profile(response["X-Profile-Id"])
+        self.assertEqual((profile["view"], profile["trigger"], profile["mode"]), ("dashboard", "header", "cprofile"))
+        selects = [query for query in profile["queries"] if query["sql"].startswith("SELECT")]
+        self.assertTrue(selects and all(query["plan"] for query in selects))
+        self.assertTrue(profile["functions"])
+
+        self.assertContains(self.client.get(reverse("request_profiles")), response["X-Profile-Id"])
+        self.assertEqual(self.client.get(reverse("request_profile", args=[profile["id"]])).status_code, 200)
+        stacks = self.client.get(reverse("request_profile_stacks", args=[profile["id"]])).content.decode()
+        self.assertRegex(stacks.splitlines()[0], r"^\S.*;.* \d+$")
+        self.assertEqual(self.client.get(reverse("request_profile_pstats", args=[profile["id"]])).status_code, 200)
+
+    def test_explains_and_saving_are_left_out_of_the_request_metrics(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.client.force_login(self.staff)
+        counts = []
+        for headers in ({}, {"X-Profile": "1"}):
+            caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+            with mock.patch.object(profiling, "save", wraps=profiling.save) as save:
+                self.client.get(reverse("dashboard"), headers=headers)
+            text = metrics.render()
+            line = next(line for line in text.splitlines() if line.startswith('http_request_db_queries_sum{view="dashboard"}'))
+            counts.append(float(line.split()[-1]) - sum(counts))
+        save.assert_called_once()
+        self.assertTrue(any(query["plan"] for query in save.call_args.args[0]["queries"]))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_profile_is_saved_once_when_the_response_is_closed(self):
+        request = RequestFactory().get("/", headers={"X-Profile": "1"})
+        request.user = self.staff
+        middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse("ok"))
+        with mock.patch.object(profiling, "save") as save:
+            response = middleware(request)
+            save.assert_not_called()
+            response.close()
+            response.close()
+        save.assert_called_once()
+
+    def test_header_is_ignored_for_non_staff(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse("dashboard"), headers={"X-Profile": "1"})
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(profiling.list_profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_MAX_PROFILES=2, PROFILING_MODE="sample")
+    def test_sampled_profiles_are_kept_in_a_ring_buffer(self):
+        ids = [self.client.get(reverse("landing"))["X-Profile-Id"] for _ in range(3)]
+        self.assertEqual([summary["id"] for summary in profiling.list_profiles()], ids[:0:-1])
+        self.assertIsNone(profiling.pstats_path(ids[-1]))
+
+    def test_genai_calls_are_recorded_as_spans(self):
+        profile = profiling.RequestProfile(RequestFactory().get("/"), "header", mode="sample")
+        reply = json.dumps({"recommendations": [{"career": "Chef"}]})
+        with mock.patch.object(ai, "GENAI_API_KEY", "key"), mock.patch.object(
+            ai, "GENAI_CACHE_BACKEND", "none"
+        ), mock.patch.object(ai, "_call_genai", return_value=reply):
+            with profile.capture():
+                ai.generate_career_recommendation({"skills": "python"})
+        self.assertEqual([(span["name"], span["outcome"]) for span in profile.spans], [("genai_call", "success")])
+
+    async def test_async_requests_are_profiled(self):
+        await sync_to_async(self.async_client.force_login)(self.staff)
+        response = await self.async_client.get(reverse("dashboard"), headers={"X-Profile": "1"})
+        profile = await sync_to_async(profiling.load_profile)(response["X-Profile-Id"])
+        self.assertGreater(profile["query_count"], 0)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("mobile", password="x")
+        cls.questionnaire = make_questionnaire(cls.user)
+        cls.rec = Recommendation.objects.create(questionnaire=cls.questionnaire, career_name="Data Analyst", score=8)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse("api_recommendation", args=[self.rec.pk])
+
+    def _rate(self, rating, **headers):
+        return self.client.post(
+            reverse("api_rate_recommendation", args=[self.rec.pk]),
+            json.dumps({"rating": rating}),
+            content_type="application/json",
+            headers=headers,
+        )
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("api_recommendations")).status_code, 401)
+
+    def test_field_selection(self):
+        response = self.client.get(reverse("api_recommendations"), {"fields": "id,score"})
+        self.assertEqual(response.json()["results"], [{"id": self.rec.pk, "score": 8}])
+        response = self.client.get(reverse("api_recommendations"), {"fields": "id,password"})
+        self.assertEqual((response.status_code, response.json()["unknown"]), (400, ["password"]))
+
+    def test_unchanged_resources_are_not_serialized_again(self):
+        etag = self.client.get(self.url)["ETag"]
+        with mock.patch.object(api, "serialize") as serialize:
+            response = self.client.get(self.url, headers={"If-None-Match": etag})
+        serialize.assert_not_called()
+        self.assertEqual((response.status_code, response["ETag"]), (304, etag))
+
+        self.assertEqual(self._rate(1).status_code, 200)
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user_rating"], 1)
+
+    def test_if_match_guards_writes(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.delete(self.url, headers={"If-Match": etag})
+        self.assertIsNotNone(response.json()["deleted_at"])
+        self.assertEqual(self._rate(1).status_code, 409)
+
+        response = self.client.post(reverse("api_restore_recommendation", args=[self.rec.pk]), headers={"If-Match": etag})
+        self.assertEqual(response.status_code, 412)
+        response = self.client.post(
+            reverse("api_restore_recommendation", args=[self.rec.pk]), headers={"If-Match": response["ETag"]}
+        )
+        self.assertIsNone(response.json()["deleted_at"])
+
+    def test_submit_questionnaire(self):
+        response = self.client.post(
+            reverse("api_questionnaires") + "?fields=id,status",
+            {
+                "skills": "python, sql",
+                "interests": "data",
+                "strengths": "analysis",
+                "preferred_work_style": "Solo",
+                "long_term_goal": "lead",
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Location"], reverse("api_recommendation", args=[response.json()["id"]]))
+        self.assertEqual(self.client.post(reverse("api_questionnaires"), {}).status_code, 400)
+
+
+class GenAIStubTests(SimpleTestCase):
+    def _post(self, **behaviour):
+        import requests
+
+        server = start_stub_server(**behaviour)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return requests.post(server.endpoint_for("stub"), json={}, timeout=5)
+
+    def test_failure_modes(self):
+        self.assertEqual(self._post(error_rate=1).status_code, 500)
+        response = self._post(rate_limit_rate=1, retry_after=2)
+        self.assertEqual((response.status_code, response.headers["Retry-After"]), (429, "2"))
+        text = self._post(malformed_rate=1).json()["candidates"][0]["content"]["parts"][0]["text"]
+        with self.assertRaises(ValueError):
+            json.loads(text)
+
+
+class LoadTestCompareTests(SimpleTestCase):
+    def _results(self, rps, p95):
+        return {"levels": [{"concurrency": 4, "requests_per_second": rps, "views": {"dashboard": {"p95_ms": p95}}}]}
+
+    def test_reports_only_changes_beyond_the_threshold(self):
+        self.assertEqual(compare(self._results(100, 10), self._results(110, 9), 0.2), [])
+        regressions = compare(self._results(70, 15), self._results(100, 10), 0.2)
+        self.assertEqual(
+            [(view, metric) for _, view, metric, *_ in regressions],
+            [("*", "requests_per_second"), ("dashboard", "p95_ms")],
+        )
+
+
+class MicrobenchTests(SimpleTestCase):
+    def test_runs_and_flags_growth_against_the_baseline(self):
+        results = run_benchmarks(["ensure_list", "default_action_plan_for"], rounds=1)
+        self.assertEqual(set(results), {"ensure_list", "default_action_plan_for"})
+        self.assertGreater(results["ensure_list"]["median_ns"], 0)
+
+        baseline = {"ensure_list": {**results["ensure_list"], "median_ns": results["ensure_list"]["median_ns"] / 2}}
+        regressions = find_regressions(results, baseline, 0.25)
+        self.assertEqual([(name, metric) for name, metric, *_ in regressions], [("ensure_list", "median_ns")])
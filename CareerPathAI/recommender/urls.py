@@ -1,18 +1,51 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import api, views
+
+# Under ASGI the GenAI-bound views are served by their native async variants.
+if settings.ASYNC_VIEWS:
+    questionnaire_view = views.questionnaire_async
+    recommendation_detail_view = views.recommendation_detail_async
+    api_submit_view = api.submit_questionnaire_async
+else:
+    questionnaire_view = views.questionnaire
+    recommendation_detail_view = views.recommendation_detail
+    api_submit_view = api.submit_questionnaire
 
 urlpatterns = [
     path("", views.landing, name="landing"),
     path("dashboard/", views.dashboard, name="dashboard"),
+    path("dashboard/cache/status/", views.dashboard_cache_status, name="dashboard_cache_status"),
     path("profile/", views.profile, name="profile"),
-    path("questionnaire/", views.questionnaire, name="questionnaire"),
-    path("recommendation/<int:pk>/", views.recommendation_detail, name="recommendation_detail"),
+    path("questionnaire/", questionnaire_view, name="questionnaire"),
+    path("recommendation/<int:pk>/", recommendation_detail_view, name="recommendation_detail"),
+    path("recommendation/<int:pk>/status/", views.recommendation_status, name="recommendation_status"),
     path("recommendation/<int:pk>/rate/", views.rate_recommendation, name="rate_recommendation"),
     path("recommendation/<int:pk>/delete/", views.delete_recommendation, name="delete_recommendation"),
     path("recommendation/<int:pk>/restore/", views.restore_recommendation, name="restore_recommendation"),
+    path("genai/status/", views.genai_status, name="genai_status"),
+    path("metrics", views.metrics_view, name="metrics"),
+    path("api/v1/recommendations/", api.recommendations, name="api_recommendations"),
+    path("api/v1/recommendations/<int:pk>/", api.recommendation, name="api_recommendation"),
+    path(
+        "api/v1/recommendations/<int:pk>/restore/",
+        api.restore_recommendation,
+        name="api_restore_recommendation",
+    ),
+    path("api/v1/recommendations/<int:pk>/rating/", api.rate_recommendation, name="api_rate_recommendation"),
+    path("api/v1/questionnaires/", api_submit_view, name="api_questionnaires"),
     path("auth/register/", views.register, name="register"),
     path("auth/login/", views.login_view, name="login"),
     path("auth/logout/", views.logout_view, name="logout"),
 ]
 
+if settings.ASYNC_VIEWS:
+    # An open stream would pin a WSGI worker thread for its whole duration; WSGI clients poll the JSON status.
+    urlpatterns.append(
+        path(
+            "recommendation/<int:pk>/status/stream/",
+            views.recommendation_status_stream,
+            name="recommendation_status_stream",
+        )
+    )
@@ -1,19 +1,37 @@
+import asyncio
+import json
+import time
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
-from django.shortcuts import get_object_or_404, redirect, render
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.utils.crypto import constant_time_compare
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import require_GET, require_POST
 
-from .ai import generate_career_recommendation
+from . import ai, dashboard_cache, metrics
+from .db_router import reads_from_replica, replica_reads
+from .deadline import Deadline
 from .forms import QuestionnaireForm, UserProfileForm
+from .jobs import asubmit_recommendation, submit_recommendation
 from .models import Questionnaire, Recommendation, UserProfile
+from .pagination import capped_count, decode_cursor, keyset_page
 
 
 def _parse_explanation(text: str) -> dict:
+    """Splits a legacy flattened `explanation` back into its parts (rows without `details`)."""
+
     parsed = {"why": "", "benefits": "", "opportunities": "", "sub_paths": []}
     if not text:
         return parsed
@@ -84,29 +102,108 @@ def logout_view(request):
     return redirect("login")
 
 
+# Columns the dashboard lists actually render.
+DASHBOARD_FIELDS = ("id", "career_name", "score", "status", "created_at", "deleted_at")
+DASHBOARD_PAGE_SIZE = 5
+RECYCLE_BIN_PAGE_SIZE = 10
+# Counts stop here ("1000+") so a huge list never costs a full count.
+DASHBOARD_COUNT_CAP = 1000
+
+
+def _page_url(request, **params) -> str:
+    query = request.GET.copy()
+    for key, value in params.items():
+        query.pop(key, None)
+        if value:
+            query[key] = value
+    return f"{request.path}?{query.urlencode()}" if query else request.path
+
+
+def _paged_list(request, queryset, field, size, prefix=""):
+    page = keyset_page(
+        queryset.only(*DASHBOARD_FIELDS),
+        field,
+        size,
+        after=decode_cursor(request.GET.get(f"{prefix}after")),
+        before=decode_cursor(request.GET.get(f"{prefix}before")),
+    )
+    page.next_url = page.next_cursor and _page_url(
+        request, **{f"{prefix}after": page.next_cursor, f"{prefix}before": None}
+    )
+    page.previous_url = page.previous_cursor and _page_url(
+        request, **{f"{prefix}before": page.previous_cursor, f"{prefix}after": None}
+    )
+    if page.has_other_pages:
+        page.total, page.total_capped = capped_count(queryset, DASHBOARD_COUNT_CAP)
+    else:
+        page.total, page.total_capped = len(page), False
+    return page
+
+
 @login_required
+@replica_reads
 def dashboard(request):
-    # Get active recommendations (not deleted)
-    recs = Recommendation.objects.filter(
-        questionnaire__user=request.user,
-        deleted_at__isnull=True
-    ).order_by("-created_at")[:5]
-    
-    # Get recycle bin items (deleted within last 30 days)
-    cutoff_date = timezone.now() - timedelta(days=30)
-    recycle_bin = Recommendation.objects.filter(
-        questionnaire__user=request.user,
-        deleted_at__isnull=False,
-        deleted_at__gte=cutoff_date
-    ).order_by("-deleted_at")
-    
-    # Auto-cleanup old deleted items (older than 30 days)
-    Recommendation.cleanup_old_deleted(days=30)
-    
-    return render(request, "recommender/dashboard.html", {
-        "recommendations": recs,
-        "recycle_bin": recycle_bin
-    })
+    retention_days = settings.RECYCLE_BIN_RETENTION_DAYS
+
+    def recommendations():
+        # Get active recommendations (not deleted)
+        recs = Recommendation.objects.filter(
+            user=request.user,
+            deleted_at__isnull=True
+        )
+        return {"recommendations": _paged_list(request, recs, "created_at", DASHBOARD_PAGE_SIZE)}
+
+    def recycle_bin():
+        # Get recycle bin items (deleted within the retention window)
+        cutoff_date = timezone.now() - timedelta(days=retention_days)
+        recycle_bin = Recommendation.objects.filter(
+            user=request.user,
+            deleted_at__isnull=False,
+            deleted_at__gte=cutoff_date
+        )
+        # Expired items are removed by the purge job (recommender.purge), never on this GET.
+        return {"recycle_bin": _paged_list(request, recycle_bin, "deleted_at", RECYCLE_BIN_PAGE_SIZE, prefix="bin_")}
+
+    fragments = _render_fragments(
+        request,
+        {
+            "recommendations_html": ("recommender/_dashboard_recommendations.html", recommendations),
+            "recycle_bin_html": ("recommender/_dashboard_recycle_bin.html", recycle_bin),
+        },
+        retention_days,
+    )
+    return render(request, "recommender/dashboard.html", {**fragments, "retention_days": retention_days})
+
+
+def _render_fragments(request, fragments: dict, *vary) -> dict:
+    """
+    HTML for each {name: (template, context builder)}, from the user's dashboard cache
+    when possible. Builders (and their queries) only run for fragments not cached.
+    """
+
+    def render_fragment(template, build):
+        return render_to_string(template, build(), request=request)
+
+    if not dashboard_cache.enabled():
+        return {name: render_fragment(*spec) for name, spec in fragments.items()}
+
+    # The fragments embed CSRF tokens, so they are keyed on the CSRF secret too
+    # (it changes on login).
+    get_token(request)
+    user_id = request.user.pk
+    generation = dashboard_cache.get_generation(user_id)
+    parts = (request.GET.urlencode(), request.META.get("CSRF_COOKIE", ""), *vary)
+    keys = {name: dashboard_cache.fragment_key(user_id, generation, name, *parts) for name in fragments}
+
+    # A replica may not have caught up with the change behind the current generation
+    # yet, so what it renders is only kept for the sticky window rather than the full TTL.
+    timeout = settings.REPLICA_STICKY_SECONDS if reads_from_replica() else None
+    html = dashboard_cache.get_fragments(keys)
+    for name, spec in fragments.items():
+        if name not in html:
+            html[name] = render_fragment(*spec)
+            dashboard_cache.set_fragment(keys[name], html[name], timeout)
+    return {name: mark_safe(value) for name, value in html.items()}
 
 
 @login_required
@@ -120,55 +217,58 @@ def profile(request):
     return render(request, "recommender/profile.html", {"form": form})
 
 
+def _with_server_timing(response, deadline: Deadline):
+    response["Server-Timing"] = deadline.server_timing()
+    return response
+
+
 @login_required
 def questionnaire(request):
+    # The whole submission, GenAI call included, is held to QUESTIONNAIRE_BUDGET seconds.
+    deadline = request.deadline = Deadline(settings.QUESTIONNAIRE_BUDGET)
     form = QuestionnaireForm(request.POST or None)
-    if request.method == "POST" and form.is_valid():
-        questionnaire = form.save(commit=False)
-        questionnaire.user = request.user
-        questionnaire.save()
-
-        ai_result = generate_career_recommendation(form.cleaned_data)
-        recs = ai_result.get("recommendations", [])[:1]  # limit to a single feedback per questionnaire
-        for item in recs:
-            reason = item.get("reason", "Why not provided.")
-            benefits = item.get("benefits", "Benefits not provided.")
-            opportunities = item.get("opportunities", "Opportunities not provided.")
-            subs = item.get("sub_careers") or item.get("sub_roles") or []
-            if isinstance(subs, (list, tuple)):
-                sub_text = ", ".join(subs)
-            else:
-                sub_text = str(subs)
-            explanation_text = (
-                f"Why: {reason}\n"
-                f"Benefits: {benefits}\n"
-                f"Employment opportunities: {opportunities}\n"
-                f"Related sub-paths: {sub_text}"
-            )
-            Recommendation.objects.create(
-                questionnaire=questionnaire,
-                career_name=item.get("career", "Career"),
-                score=item.get("score", 7),
-                explanation=explanation_text,
-                getting_started=item.get("getting_started") or [],
-                resources=item.get("resources") or [],
-                interview_prep=item.get("interview_prep") or [],
-                how_to_apply=item.get("how_to_apply") or [],
-                generation_source=item.get("generation_source", "unknown"),
-                model_name=item.get("model_name", ""),
-                prompt_version=item.get("prompt_version", ""),
-            )
-        return redirect("dashboard")
+    with deadline.stage("form_validation"):
+        valid = request.method == "POST" and form.is_valid()
+    if valid:
+        with deadline.stage("questionnaire_insert"):
+            questionnaire = form.save(commit=False)
+            questionnaire.user = request.user
+            questionnaire.save()
+
+        submit_recommendation(questionnaire, deadline)
+        return _with_server_timing(redirect("dashboard"), deadline)
     return render(request, "recommender/questionnaire.html", {"form": form})
 
 
 @login_required
+async def questionnaire_async(request):
+    """ASGI variant of questionnaire: the GenAI round trip is awaited instead of pinning a thread."""
+    deadline = request.deadline = Deadline(settings.QUESTIONNAIRE_BUDGET)
+    form = QuestionnaireForm(request.POST or None)
+    with deadline.stage("form_validation"):
+        valid = request.method == "POST" and await sync_to_async(form.is_valid)()
+    if valid:
+        with deadline.stage("questionnaire_insert"):
+            questionnaire = form.save(commit=False)
+            questionnaire.user = await request.auser()
+            await questionnaire.asave()
+
+        await asubmit_recommendation(questionnaire, deadline)
+        return _with_server_timing(redirect("dashboard"), deadline)
+    return await sync_to_async(render)(request, "recommender/questionnaire.html", {"form": form})
+
+
+@login_required
+@replica_reads
 def recommendation_detail(request, pk):
-    rec = get_object_or_404(Recommendation, pk=pk, questionnaire__user=request.user)
+    rec = get_object_or_404(Recommendation, pk=pk, user=request.user)
     if rec.deleted_at is not None:
         messages.warning(request, "This recommendation is in the recycle bin.")
         return redirect("dashboard")
-    parsed = _parse_explanation(rec.explanation)
+    if rec.is_pending:
+        messages.info(request, "This recommendation is still being generated.")
+        return redirect("dashboard")
+    parsed = rec.details or _parse_explanation(rec.explanation)
     return render(
         request,
         "recommender/recommendation_detail.html",
@@ -179,12 +279,36 @@ def recommendation_detail(request, pk):
     )
 
 
+@login_required
+@replica_reads
+async def recommendation_detail_async(request, pk):
+    """ASGI variant of recommendation_detail."""
+    user = await request.auser()
+    rec = await aget_object_or_404(Recommendation, pk=pk, user=user)
+    if rec.deleted_at is not None:
+        messages.warning(request, "This recommendation is in the recycle bin.")
+        return redirect("dashboard")
+    if rec.is_pending:
+        messages.info(request, "This recommendation is still being generated.")
+        return redirect("dashboard")
+    parsed = rec.details or _parse_explanation(rec.explanation)
+    return await sync_to_async(render)(
+        request,
+        "recommender/recommendation_detail.html",
+        {
+            "rec": rec,
+            "details": parsed,
+        },
+    )
+
+
 @login_required
 def delete_recommendation(request, pk):
     """Move recommendation to recycle bin"""
-    rec = get_object_or_404(Recommendation, pk=pk, questionnaire__user=request.user)
+    rec = get_object_or_404(Recommendation, pk=pk, user=request.user)
     if rec.deleted_at is None:
         rec.soft_delete()
+        dashboard_cache.bump_generation(rec.user_id)
         messages.success(request, f"'{rec.career_name}' moved to recycle bin.")
     return redirect("dashboard")
 
@@ -192,9 +316,10 @@ def delete_recommendation(request, pk):
 @login_required
 def restore_recommendation(request, pk):
     """Restore recommendation from recycle bin"""
-    rec = get_object_or_404(Recommendation, pk=pk, questionnaire__user=request.user)
+    rec = get_object_or_404(Recommendation, pk=pk, user=request.user)
     if rec.deleted_at is not None:
         rec.restore()
+        dashboard_cache.bump_generation(rec.user_id)
         messages.success(request, f"'{rec.career_name}' restored from recycle bin.")
     return redirect("dashboard")
 
@@ -202,10 +327,13 @@ def restore_recommendation(request, pk):
 @require_POST
 @login_required
 def rate_recommendation(request, pk):
-    rec = get_object_or_404(Recommendation, pk=pk, questionnaire__user=request.user)
+    rec = get_object_or_404(Recommendation, pk=pk, user=request.user)
     if rec.deleted_at is not None:
         messages.warning(request, "Cannot rate items in the recycle bin.")
         return redirect("dashboard")
+    if rec.is_pending:
+        messages.warning(request, "This recommendation is still being generated.")
+        return redirect("dashboard")
 
     rating = request.POST.get("rating")
     note = (request.POST.get("note") or "").strip()
@@ -218,6 +346,104 @@ def rate_recommendation(request, pk):
     if note:
         rec.user_rating_note = note
     rec.save(update_fields=["user_rating", "user_rating_note"])
+    dashboard_cache.bump_generation(rec.user_id)
 
     messages.success(request, "Thanks for the feedback!")
     return redirect("recommendation_detail", pk=rec.id)
+
+
+SSE_POLL_INTERVAL = 1.0
+SSE_MAX_DURATION = 30.0
+
+
+def _status_payload(rec) -> dict:
+    return {
+        "id": rec.id,
+        "status": rec.status,
+        "career_name": rec.career_name,
+        "score": rec.score,
+        "detail_url": reverse("recommendation_detail", args=[rec.id]),
+    }
+
+
+@login_required
+def recommendation_status(request, pk):
+    """JSON generation status, polled by the dashboard while a recommendation is pending."""
+    rec = get_object_or_404(Recommendation, pk=pk, user=request.user)
+    return JsonResponse(_status_payload(rec))
+
+
+@login_required
+async def recommendation_status_stream(request, pk):
+    """
+    Server-sent events version of recommendation_status; closes once the job finishes
+    or the recommendation is gone. Only routed under ASGI, where an open stream costs
+    the event loop a timer instead of a worker thread.
+    """
+    user = await request.auser()
+    rec = await aget_object_or_404(Recommendation, pk=pk, user=user)
+
+    async def events():
+        current = rec
+        deadline = time.monotonic() + SSE_MAX_DURATION
+        while True:
+            yield f"event: status\ndata: {json.dumps(_status_payload(current))}\n\n"
+            if not current.is_pending or time.monotonic() >= deadline:
+                return
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+            current = await Recommendation.objects.filter(pk=rec.pk, user=user).afirst()
+            if current is None:
+                # Deleted for good (e.g. purged) while the client was waiting.
+                yield f"event: gone\ndata: {json.dumps({'id': rec.pk})}\n\n"
+                return
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@staff_member_required
+def genai_status(request):
+    """Staff-only snapshot of the GenAI integration: breaker state, call counters, cache."""
+    cache = ai.get_recommendation_cache()
+    return JsonResponse(
+        {
+            "configured": bool(ai.GENAI_API_KEY),
+            "model": ai.GENAI_MODEL,
+            "prompt_version": ai.PROMPT_VERSION,
+            "breaker": ai.genai_breaker.snapshot(),
+            "calls": ai.genai_call_stats(),
+            "singleflight": ai.singleflight_stats(),
+            "cache": cache.stats() if cache is not None else None,
+        }
+    )
+
+
+@staff_member_required
+def dashboard_cache_status(request):
+    """Staff-only dashboard cache counters for this process (hit ratio, invalidations)."""
+    return JsonResponse(
+        {
+            "enabled": dashboard_cache.enabled(),
+            "alias": settings.DASHBOARD_CACHE_ALIAS,
+            "shared": dashboard_cache.is_shared(),
+            "in_app_database": dashboard_cache.uses_app_database(),
+            "ttl": settings.DASHBOARD_CACHE_TTL,
+            **dashboard_cache.dashboard_cache_stats(),
+        }
+    )
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape endpoint: metrics of every worker process, in the text exposition format."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    # Latency, query counts and GenAI outcomes are operational data: scrapers send
+    # METRICS_TOKEN, people need a staff login. Nobody else can read them.
+    token = settings.METRICS_TOKEN
+    has_token = bool(token) and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not has_token and not (request.user.is_active and request.user.is_staff):
+        return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
@@ -23,6 +23,27 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // Poll pending recommendations (dashboard) and reload once they are generated
+    const pending = document.querySelectorAll('[data-status-url]');
+    if (pending.length) {
+        const poll = setInterval(async function() {
+            for (const el of pending) {
+                try {
+                    const resp = await fetch(el.getAttribute('data-status-url'), { headers: { 'Accept': 'application/json' } });
+                    if (!resp.ok) continue;
+                    const data = await resp.json();
+                    if (data.status !== 'pending') {
+                        clearInterval(poll);
+                        window.location.reload();
+                        return;
+                    }
+                } catch (e) {
+                    // Network hiccup; try again on the next tick
+                }
+            }
+        }, 2000);
+    }
+
     // Copy share summary (recommendation detail)
     document.querySelectorAll('[data-copy-share]').forEach(btn => {
         btn.addEventListener('click', async function() {